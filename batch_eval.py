@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 19:20:33
+@Path: /batch_eval.py
+"""
+
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from perception.birdseye import BirdsEyeLaneDetector
+from perception.frame_context import FrameContext
+from perception.lane_detection import LaneDetector
+from perception.sign_cascades import CASCADES, SignCascades
+from perception.sliding_window_lane import SlidingWindowLaneDetector
+from utils.buffer_pool import BufferPool
+from utils.config import LANE_CONFIG, TRACKING_CONFIG
+from utils.run_log import RunLog
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+DETECTORS = ('lane', 'stop_sign', 'light')
+
+
+def list_images(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def is_run_log(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, 'run.json'))
+
+
+def count_frames(source):
+    """Number of frames in a video, image directory or run log; None if a video does not say."""
+    if is_run_log(source):
+        return len(RunLog(source))
+    if os.path.isdir(source):
+        return len(list_images(source))
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise IOError(f"Cannot open video file: {source}")
+    count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+    return count if count > 0 else None
+
+
+def read_frames(source, start, stop, pool=None):
+    """Yield (index, timestamp, FrameContext) for frames start..stop-1 (stop=None: to the end).
+    timestamp is the video position or recorded capture time in seconds, None for images.
+    """
+    if is_run_log(source):
+        log = RunLog(source)
+        wrap = {'bgr': FrameContext, 'yuv420': FrameContext.from_yuv420, 'y': FrameContext.from_gray}[log.stream]
+        for index in range(start, len(log) if stop is None else min(stop, len(log))):
+            yield index, float(log.index[index]['timestamp']), wrap(log.frame(index), pool=pool)
+    elif os.path.isdir(source):
+        for index, path in enumerate(list_images(source)[start:stop], start):
+            yield index, None, FrameContext(cv2.imread(path), pool=pool)
+    else:
+        capture = cv2.VideoCapture(source)
+        capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+        index = start
+        try:
+            while stop is None or index < stop:
+                ret, frame = capture.read()
+                if not ret:
+                    break
+                yield index, capture.get(cv2.CAP_PROP_POS_MSEC) / 1000, FrameContext(frame, pool=pool)
+                index += 1
+        finally:
+            capture.release()
+
+
+def create_lane_detector(engine, mode):
+    if engine == 'sliding_window':
+        return SlidingWindowLaneDetector()
+    if engine == 'birdseye':
+        return BirdsEyeLaneDetector()
+    return LaneDetector(mode=mode)
+
+
+def evaluate_chunk(source, start, stop, warmup=0, detectors=DETECTORS,
+                   lane_engine=LANE_CONFIG['ENGINE'], lane_mode=LANE_CONFIG['MODE']):
+    """Run the detectors on frames start..stop-1 of source.
+
+    The first warmup frames before start are processed and discarded, so trackers and the
+    lane fits of stateful engines have settled when the chunk begins. The lane EMA restarts
+    from 0 at start; stitch_steering() adds the contribution of the previous chunk.
+    Returns:
+        list of per-frame result dicts
+    """
+    pool = BufferPool()
+    lane_detector = create_lane_detector(lane_engine, lane_mode) if 'lane' in detectors else None
+    cascades = [name for name in CASCADES if name in detectors]
+    sign_cascades = SignCascades() if cascades else None
+
+    rows = []
+    for index, timestamp, ctx in read_frames(source, max(0, start - warmup), stop, pool):
+        row = {'frame': index, 'timestamp': timestamp}
+        if lane_detector:
+            if index == start:
+                lane_detector.prev_steering = 0
+            t0 = time.perf_counter()
+            steering, lines = lane_detector.detect(ctx)
+            row['lane_ms'] = (time.perf_counter() - t0) * 1000
+            row['steering'] = float(steering)
+            row['lane_lines'] = [[int(v) for v in line] for line in lines]
+        if sign_cascades:
+            results, timings = sign_cascades.detect_tracked(ctx, cascades)
+            for name, seconds in timings.items():
+                row[f'{name}_ms'] = seconds * 1000
+        if 'stop_sign' in cascades:
+            is_stop_sign, is_stop_sign_close, stop_bbox, _ = results['stop_sign']
+            row['is_stop_sign'] = bool(is_stop_sign)
+            row['is_stop_sign_close'] = bool(is_stop_sign_close)
+            row['stop_bbox'] = _bbox(stop_bbox)
+        if 'light' in cascades:
+            light_color, light_box, _ = results['light']
+            row['light_color'] = light_color
+            row['light_box'] = _bbox(light_box)
+        ctx.release()
+        if index >= start:
+            rows.append(row)
+    return rows
+
+
+def stitch_steering(chunks, smoothing=LANE_CONFIG['SMOOTHING']):
+    """Turn per-chunk steering (EMA restarted at 0) into the sequential EMA, in place.
+
+    The EMA is linear, so the state carried in from the previous chunk only adds
+    smoothing ** k * carry to the k-th frame of the next chunk.
+    """
+    carry = 0.0
+    for rows in chunks:
+        decay = 1.0
+        for row in rows:
+            decay *= smoothing
+            row['steering'] += decay * carry
+        if rows:
+            carry = rows[-1]['steering']
+
+
+def evaluate(source, workers=os.cpu_count(), chunk_size=250, warmup=None, detectors=DETECTORS,
+             lane_engine=LANE_CONFIG['ENGINE'], lane_mode=LANE_CONFIG['MODE']):
+    """Evaluate every frame of source across a process pool.
+    Args:
+        warmup: Frames replayed before each chunk; by default only when state outlives the EMA
+            (sliding-window fits, sign tracking)
+    Returns:
+        (list of per-frame result dicts in frame order, elapsed seconds)
+    """
+    if warmup is None:
+        warmup = 0 if lane_engine == 'hough' and not TRACKING_CONFIG['ENABLED'] else 30
+    count = count_frames(source)
+    if count is None:
+        # Unknown length: one sequential chunk
+        bounds = [(0, None)]
+    else:
+        bounds = [(start, min(start + chunk_size, count)) for start in range(0, count, chunk_size)]
+    args = [(source, start, stop, warmup, detectors, lane_engine, lane_mode) for start, stop in bounds]
+
+    t0 = time.perf_counter()
+    if workers <= 1:
+        chunks = [evaluate_chunk(*chunk_args) for chunk_args in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            chunks = list(executor.map(evaluate_chunk, *zip(*args)))
+    if 'lane' in detectors:
+        stitch_steering(chunks)
+    elapsed = time.perf_counter() - t0
+    return [row for rows in chunks for row in rows], elapsed
+
+
+def write_jsonl(rows, path):
+    with open(path, 'w') as f:
+        for row in rows:
+            f.write(json.dumps(row) + '\n')
+
+
+def write_columns(rows, path):
+    """One array per column in an .npz; bboxes are (N, 4) with -1 for no detection."""
+    columns = {}
+    for key in rows[0] if rows else ():
+        values = [row[key] for row in rows]
+        if key == 'lane_lines':
+            columns['lane_line_count'] = np.array([len(v) for v in values], dtype=np.int32)
+        elif key in ('stop_bbox', 'light_box'):
+            columns[key] = np.array([v if v is not None else [-1] * 4 for v in values], dtype=np.int32)
+        elif key == 'timestamp':
+            columns[key] = np.array(values, dtype=np.float64)  # None -> NaN
+        elif key == 'light_color':
+            columns[key] = np.array([v or '' for v in values], dtype='<U6')
+        else:
+            columns[key] = np.array(values)
+    np.savez(path, **columns)
+
+
+def _bbox(bbox):
+    return None if bbox is None or len(bbox) == 0 else [int(v) for v in bbox]
+
+
+def _init_worker():
+    # One OpenCV thread per process, so throughput scales with the number of workers
+    cv2.setNumThreads(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the detectors over a video, image directory or run log "
+                                                 "in parallel and write per-frame results")
+    parser.add_argument('source', help="Video file, directory of images, or run log directory")
+    parser.add_argument('--output', help="Results file, .jsonl (default) or .npz for columnar arrays")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes, 1 runs in-process")
+    parser.add_argument('--chunk-size', type=int, default=250, help="Frames per task")
+    parser.add_argument('--warmup', type=int, help="Frames replayed before each chunk to settle tracker state")
+    parser.add_argument('--detectors', default=','.join(DETECTORS), help="Comma-separated subset of "
+                                                                         + ', '.join(DETECTORS))
+    parser.add_argument('--engine', default=LANE_CONFIG['ENGINE'], choices=('hough', 'sliding_window', 'birdseye'))
+    parser.add_argument('--mode', default=LANE_CONFIG['MODE'], choices=('full', 'fast'))
+    args = parser.parse_args()
+
+    detectors = tuple(name for name in args.detectors.split(',') if name)
+    unknown = set(detectors) - set(DETECTORS)
+    if unknown:
+        parser.error(f"Unknown detectors: {', '.join(sorted(unknown))}")
+    output = args.output or os.path.join('output', f"batch_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.jsonl")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+
+    if args.workers <= 1:
+        # Same single-threaded OpenCV as the pool workers, so runs compare cores, not threads
+        _init_worker()
+    rows, elapsed = evaluate(args.source, args.workers, args.chunk_size, args.warmup, detectors,
+                             args.engine, args.mode)
+    if output.endswith('.npz'):
+        write_columns(rows, output)
+    else:
+        write_jsonl(rows, output)
+
+    print(f"{len(rows)} frames in {elapsed:.2f}s: {len(rows) / elapsed:.1f} frames/sec "
+          f"with {args.workers} workers, chunks of {args.chunk_size} -> {output}")
+    for name in detectors:
+        times = [row[f'{name}_ms'] for row in rows]
+        if times:
+            print(f"  {name}: {np.mean(times):.2f} ms/frame mean, {np.percentile(times, 95):.2f} ms p95")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 22:06:35
+@Path: /benchmarks/bench_control.py
+"""
+
+
+import argparse
+import contextlib
+import logging
+import os
+import tempfile
+import time
+
+import cv2
+
+from benchmarks.bench_perception import bundled_frames
+from control.backends import SimulatedPigpio
+from control.vehicle_control import VehicleController
+from main import METRIC_STAGES, AutoDriver
+
+
+def write_test_video(path, frame_count, size=(640, 480), fps=30):
+    """MJPG video cycling through the bundled lane, stop and turn sign images."""
+    frames = bundled_frames('mixed', size)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, size)
+    for i in range(frame_count):
+        writer.write(frames[i // 10 % len(frames)])
+    writer.release()
+
+
+def run_control(source, latency, jitter, pipelined=False, seed=0):
+    """Drive AutoDriver over source with a SimulatedPigpio backend.
+    Returns:
+        (SimulatedPigpio, total metrics snapshot, frames, elapsed seconds)
+    """
+    pi = SimulatedPigpio(latency, jitter, seed)
+    t0 = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        with AutoDriver(video_path=source, pipelined=pipelined,
+                        vehicle=VehicleController(backend=pi)) as driver:
+            driver.start()
+    elapsed = time.perf_counter() - t0
+    return pi, driver.metrics.snapshot(window=False), driver.frame_counter, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Command rate and end-to-end timing of AutoDriver "
+                                                 "on a simulated pigpio backend")
+    parser.add_argument('--source', help="Video file (default: a generated video of the bundled images)")
+    parser.add_argument('--frames', type=int, default=300, help="Length of the generated video")
+    parser.add_argument('--latency-ms', type=float, default=0.5, help="Simulated pigpiod round trip")
+    parser.add_argument('--jitter-ms', type=float, default=0.2, help="Random extra delay per call, up to")
+    parser.add_argument('--pipelined', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.source
+        if source is None:
+            source = os.path.join(tmp, 'control.avi')
+            write_test_video(source, args.frames)
+        pi, snapshot, frames, elapsed = run_control(source, args.latency_ms / 1000, args.jitter_ms / 1000,
+                                                    args.pipelined, args.seed)
+
+    print(f"{frames} frames in {elapsed:.2f}s ({frames / elapsed:.1f} fps)")
+    print(pi.summary())
+    print(f"{len(pi.commands) / frames:.2f} duty commands per frame")
+    for name in METRIC_STAGES:
+        stats = snapshot['timers'].get(name)
+        if stats and stats['count']:
+            print(f"  {name:<12} p50 {stats['p50_ms']:7.2f} ms  p95 {stats['p95_ms']:7.2f} ms  "
+                  f"p99 {stats['p99_ms']:7.2f} ms  max {stats['max_ms']:7.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 15:08:41
+@Path: /benchmarks/bench_lane_fit.py
+"""
+
+
+import argparse
+import timeit
+
+import numpy as np
+
+from perception.lane_detection import LaneDetector
+
+
+def legacy_fit(lines, height, roi_offset):
+    """Per-segment Python loop and np.polyfit, as LaneDetector did before vectorization."""
+    left_lines = []
+    right_lines = []
+    for line in lines:
+        x1, y1, x2, y2 = line[0]
+        if x2 - x1 == 0:
+            continue
+        slope = (y2 - y1) / (x2 - x1)
+        if abs(slope) < 0.5:
+            continue
+        if slope < 0:
+            left_lines.append((x1, y1, x2, y2))
+        else:
+            right_lines.append((x1, y1, x2, y2))
+
+    def average(segments):
+        if len(segments) == 0:
+            return None
+        x_coords = []
+        y_coords = []
+        for x1, y1, x2, y2 in segments:
+            x_coords += [x1, x2]
+            y_coords += [y1, y2]
+        poly = np.polyfit(y_coords, x_coords, deg=1)
+        return (int(np.polyval(poly, height)), height, int(np.polyval(poly, roi_offset)), roi_offset)
+
+    return average(left_lines), average(right_lines)
+
+
+def vectorized_fit(detector, lines, height, roi_offset):
+    left_lines, right_lines = detector._split_lanes(lines)
+    return (detector._average_line(left_lines, height, roi_offset),
+            detector._average_line(right_lines, height, roi_offset))
+
+
+def synthetic_segments(count, width=640, height=480, roi_offset=288, seed=0):
+    """Hough-like output (count, 1, 4): noisy pieces of two lane lines plus random clutter."""
+    rng = np.random.default_rng(seed)
+    y1 = rng.integers(roi_offset, height, count)
+    y2 = rng.integers(roi_offset, height, count)
+    # Left line x = 700 - 1.2 y, right line x = 1.2 y - 60
+    right = rng.random(count) < 0.5
+    x1 = np.where(right, 1.2 * y1 - 60, 700 - 1.2 * y1) + rng.normal(0, 3, count)
+    x2 = np.where(right, 1.2 * y2 - 60, 700 - 1.2 * y2) + rng.normal(0, 3, count)
+    clutter = rng.random(count) < 0.2
+    x1[clutter] = rng.integers(0, width, clutter.sum())
+    x2[clutter] = rng.integers(0, width, clutter.sum())
+    lines = np.stack([x1, y1, x2, y2], axis=1).clip(0, width - 1)
+    return np.rint(lines).astype(np.int32).reshape(-1, 1, 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-frame cost of lane segment classification and fitting")
+    parser.add_argument('--counts', type=int, nargs='+', default=[10, 50, 100, 200, 500, 1000])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    detector = LaneDetector()
+    height, roi_offset = 480, 288
+    print(f"{'segments':>8}  {'loop (us)':>10}  {'vectorized (us)':>15}  {'speedup':>7}")
+    for count in args.counts:
+        lines = synthetic_segments(count, height=height, roi_offset=roi_offset)
+        loop = min(timeit.repeat(lambda: legacy_fit(lines, height, roi_offset),
+                                 number=args.repeat, repeat=3)) / args.repeat
+        vectorized = min(timeit.repeat(lambda: vectorized_fit(detector, lines, height, roi_offset),
+                                       number=args.repeat, repeat=3)) / args.repeat
+        print(f"{count:>8}  {loop * 1e6:>10.1f}  {vectorized * 1e6:>15.1f}  {loop / vectorized:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 19:58:14
+@Path: /benchmarks/bench_perception.py
+"""
+
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from logic.decision import DecisionMaker
+from logic.perception_memory import MultiChannelTracker, PerceptionTracker
+from perception.lane_detection import LaneDetector
+from perception.sign_cascades import SignCascades
+from perception.traffic_light_detection import TrafficLightDetector
+from perception.traffic_sign_detection import MultiSignDetector, TrafficSignDetector, scale_policy
+from utils.config import MIN_STOP_SIGN_WIDTH
+from utils.telemetry import Telemetry
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'models')
+CONTENTS = ('lane', 'stop', 'turn_signs', 'mixed', 'synthetic_road', 'noise')
+RESOLUTIONS = ('320x240', '640x480')
+
+# name: '<target>/<content>/<resolution>', run(i) processes input i, batch: calls per timed sample
+Case = namedtuple('Case', ['name', 'run', 'batch'])
+
+
+def bundled_frames(content, size):
+    folders = {'lane': ['lane'], 'stop': ['stop'], 'turn_signs': ['left', 'right'],
+               'mixed': ['lane', 'stop', 'left', 'right']}[content]
+    paths = sorted(path for folder in folders for path in glob.glob(os.path.join(MODEL_DIR, folder, '*.png')))
+    return [cv2.resize(cv2.imread(path), size) for path in paths]
+
+
+def synthetic_road(size, count=8, seed=0):
+    """Gray asphalt with noise and two white lane lines of varying offset and curvature."""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    frames = []
+    for _ in range(count):
+        frame = rng.normal(90, 12, (height, width, 3)).clip(0, 255).astype(np.uint8)
+        y = np.arange(height // 3, height)
+        t = (y - height // 3) / (height - height // 3)
+        shift, bend = rng.uniform(-0.1, 0.1) * width, rng.uniform(-0.15, 0.15) * width
+        for x0 in (0.3 * width, 0.7 * width):
+            x = x0 + shift + (x0 - width / 2) * t + bend * (1 - t) ** 2
+            points = np.stack([x, y], axis=1).astype(np.int32)
+            cv2.polylines(frame, [points], False, (245, 245, 245), max(2, width // 100))
+        frames.append(frame)
+    return frames
+
+
+def noise_frames(size, count=4, seed=0):
+    """Uniform noise: no lane lines, and a busy worst case for the cascades."""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    return [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def content_frames(content, size):
+    if content == 'synthetic_road':
+        return synthetic_road(size)
+    if content == 'noise':
+        return noise_frames(size)
+    return bundled_frames(content, size)
+
+
+def build_cases(resolutions=RESOLUTIONS, contents=CONTENTS):
+    cases = []
+    cascades = sorted(os.path.splitext(os.path.basename(path))[0]
+                      for path in glob.glob(os.path.join(MODEL_DIR, '*.xml')))
+    for resolution in resolutions:
+        size = tuple(int(v) for v in resolution.split('x'))
+        for content in contents:
+            frames = content_frames(content, size)
+
+            def cycle(method):
+                return lambda i: method(frames[i % len(frames)])
+
+            suffix = f"{content}/{resolution}"
+            for mode in ('full', 'fast'):
+                cases.append(Case(f"lane_{mode}/{suffix}", cycle(LaneDetector(mode=mode).detect), 1))
+            separate = {}
+            for sign_type in cascades:
+                detector = separate[sign_type] = TrafficSignDetector(sign_type, tracked=False)
+                cases.append(Case(f"sign_{sign_type}/{suffix}", cycle(detector.detect), 1))
+            # Every cascade on its own pyramid against all of them on one shared pyramid
+            cases.append(Case(f"signs_separate/{suffix}",
+                              cycle(lambda frame: [d.detect(frame) for d in separate.values()]), 1))
+            cases.append(Case(f"signs_shared/{suffix}", cycle(MultiSignDetector(cascades).detect), 1))
+            # What AutoDriver runs when the stop sign and light detectors are both due
+            for mode, shared in (('separate', False), ('shared', True)):
+                cases.append(Case(f"cascades_{mode}/{suffix}", cycle(SignCascades(shared).detect_tracked), 1))
+            cases.append(Case(f"light/{suffix}",
+                              cycle(TrafficLightDetector().detect_by_sign_and_color), 1))
+
+    # Per-frame bookkeeping, independent of resolution: a stream of mostly negative detections
+    values = np.random.default_rng(0).random(256)
+    tracker = PerceptionTracker()
+
+    def track(i):
+        tracker.update(values[i % 256] > 0.8)
+        tracker.recently_true(min_count=3)
+        tracker.most_common(min_count=2)
+    cases.append(Case('tracker/update', track, 100))
+
+    channels = MultiChannelTracker(('stop', 'red', 'yellow', 'green', 'left', 'right'))
+
+    def track_channels(i):
+        value = values[i % 256]
+        channels.update({'stop': value > 0.8, 'red': value > 0.9, 'left': value < 0.1}, timestamp=i / 30)
+        channels.recently_true('stop', min_count=3)
+        channels.most_common(('red', 'yellow', 'green'), min_count=2)
+    cases.append(Case('tracker/multi_channel', track_channels, 100))
+
+    decision_maker = DecisionMaker(clock=lambda: 0.0, telemetry=Telemetry(enabled=False))
+
+    def decide(i):
+        value = values[i % 256]
+        decision_maker.reset()
+        decision_maker.make_decision(90 * value - 45, value > 0.9, 'red' if value > 0.95 else None)
+    cases.append(Case('decision/make_decision', decide, 100))
+    return cases
+
+
+def stop_scale_policies():
+    """Stop detector scale policies compared by scale_sweep(), derived from the configured one."""
+    base = scale_policy('stop')
+    return {
+        'configured': base,
+        'scale_1.2': base._replace(scale_factor=1.2),
+        'downscale_0.5': base._replace(downscale=0.5),
+        'near': base._replace(near_only=True),
+        'near_scale_1.2': base._replace(near_only=True, scale_factor=1.2),
+        'near_downscale_0.5': base._replace(near_only=True, downscale=0.5),
+        'near_max_480': base._replace(near_only=True, max_size=(480, 480)),
+    }
+
+
+def scale_sweep(policies, iterations, warmup):
+    """Latency against recall of stop detector scale policies on the bundled models/stop images.
+
+    Every image holds one stop sign. recall counts the images where the sign is found at all;
+    close_recall only counts the images where the sign is close (at least MIN_STOP_SIGN_WIDTH
+    wide, as measured by the configured policy), since only those make the car stop.
+    Returns:
+        dict: policy name -> latency stats (ms per image) plus recall and close_recall
+    """
+    images = [cv2.imread(path) for path in sorted(glob.glob(os.path.join(MODEL_DIR, 'stop', '*.png')))]
+    reference = TrafficSignDetector('stop', tracked=False, policy=scale_policy('stop'))
+    close = [reference.detect(image)[1] for image in images]
+    results = {}
+    for name, policy in policies.items():
+        detector = TrafficSignDetector('stop', tracked=False, policy=policy)
+        detections = [detector.detect(image) for image in images]
+        case = Case(name, lambda i: detector.detect(images[i % len(images)]), len(images))
+        stats = summarize(time_case(case, iterations, warmup))
+        stats['recall'] = sum(is_sign for is_sign, _, _ in detections) / len(images)
+        stats['close_recall'] = sum(is_close for (_, is_close, _), c in zip(detections, close) if c) / max(1, sum(close))
+        results[name] = stats
+        print(f"{name:<24} p50 {stats['p50_ms']:8.3f} ms  p95 {stats['p95_ms']:8.3f} ms  "
+              f"recall {stats['recall']:.2f}  close recall {stats['close_recall']:.2f}")
+    return results
+
+
+def time_case(case, iterations, warmup):
+    """Returns per-call latencies in ms, one sample per batch of calls."""
+    for i in range(warmup * case.batch):
+        case.run(i)
+    samples = []
+    i = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        for _ in range(case.batch):
+            case.run(i)
+            i += 1
+        samples.append((time.perf_counter() - start) * 1000 / case.batch)
+    return samples
+
+
+def summarize(samples):
+    samples = np.asarray(samples)
+    return {
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'mean_ms': float(samples.mean()),
+        'min_ms': float(samples.min()),
+        'samples': len(samples),
+    }
+
+
+def run_suite(cases, iterations, warmup):
+    results = {}
+    # Keep the table readable and the timing honest if anything under test prints
+    with open(os.devnull, 'w') as devnull:
+        for case in cases:
+            with contextlib.redirect_stdout(devnull):
+                stats = summarize(time_case(case, iterations, warmup))
+            results[case.name] = stats
+            print(f"{case.name:<40} p50 {stats['p50_ms']:8.3f} ms  p95 {stats['p95_ms']:8.3f} ms")
+    return results
+
+
+def environment():
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'opencv_threads': cv2.getNumThreads(),
+    }
+
+
+def compare(baseline, results, threshold=0.15, min_delta_ms=0.05):
+    """Cases whose p50 or p95 got slower than baseline by more than threshold (relative)
+    and min_delta_ms (absolute, so microsecond-level jitter does not count).
+    Returns:
+        list of (case, metric, baseline ms, current ms)
+    """
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            delta = stats[metric] - base[metric]
+            if delta > threshold * base[metric] and delta > min_delta_ms:
+                regressions.append((name, metric, base[metric], stats[metric]))
+    return regressions
+
+
+def print_comparison(baseline, results, regressions):
+    regressed = {name for name, *_ in regressions}
+    print(f"\n{'case':<40} {'p50 base':>9} {'p50 now':>9} {'p95 base':>9} {'p95 now':>9}")
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<40} {'-':>9} {stats['p50_ms']:9.3f} {'-':>9} {stats['p95_ms']:9.3f}  new")
+            continue
+        status = 'REGRESSED' if name in regressed else ''
+        print(f"{name:<40} {base['p50_ms']:9.3f} {stats['p50_ms']:9.3f} "
+              f"{base['p95_ms']:9.3f} {stats['p95_ms']:9.3f}  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of the perception, tracking and decision steps")
+    parser.add_argument('--resolutions', nargs='+', default=list(RESOLUTIONS), help="WIDTHxHEIGHT")
+    parser.add_argument('--contents', nargs='+', default=list(CONTENTS), choices=CONTENTS)
+    parser.add_argument('--filter', help="Only run cases whose name contains this string")
+    parser.add_argument('--iterations', type=int, default=20, help="Timed samples per case")
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--save', help="Write the results to this JSON baseline")
+    parser.add_argument('--compare', help="Baseline JSON to compare against; exits 1 on a regression")
+    parser.add_argument('--threshold', type=float, default=0.15, help="Allowed relative p50/p95 slowdown")
+    parser.add_argument('--min-delta-ms', type=float, default=0.05, help="Ignore slowdowns smaller than this")
+    parser.add_argument('--scale-sweep', action='store_true',
+                        help="Compare stop detector scale policies (latency vs recall) instead")
+    args = parser.parse_args()
+
+    if args.scale_sweep:
+        print(f"Stop sign scale policies, close = at least {MIN_STOP_SIGN_WIDTH} px wide")
+        scale_sweep(stop_scale_policies(), args.iterations, args.warmup)
+        return
+
+    cases = [case for case in build_cases(args.resolutions, args.contents)
+             if not args.filter or args.filter in case.name]
+    results = run_suite(cases, args.iterations, args.warmup)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or '.', exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump({'environment': environment(), 'iterations': args.iterations, 'cases': results}, f, indent=2)
+        print(f"Saved {len(results)} cases to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline['environment']['machine'] != platform.machine():
+            print(f"Warning: baseline was recorded on {baseline['environment']['machine']}")
+        regressions = compare(baseline['cases'], results, args.threshold, args.min_delta_ms)
+        print_comparison(baseline['cases'], results, regressions)
+        for name, metric, base, now in regressions:
+            print(f"REGRESSION {name} {metric}: {base:.3f} -> {now:.3f} ms (+{(now / base - 1) * 100:.0f}%)")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
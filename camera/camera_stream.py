@@ -7,25 +7,63 @@
 
 
 import os
+import threading
+import time
 from datetime import datetime
 
 import picamera2.encoders
 from picamera2 import Picamera2
 
+from camera.frame_buffer import CapturedFrame, FrameRingBuffer, StreamFrames
+from utils.config import CAPTURE_CONFIG
+from utils.telemetry import WARNING, get_telemetry
+
 
 class CameraStream:
     """A class to manage camera streaming and recording using Picamera2."""
-    def __init__(self, resolution=(640, 480)):
+    def __init__(self, resolution=(640, 480), threaded=False,
+                 buffer_size=CAPTURE_CONFIG['BUFFER_SIZE'],
+                 drop_policy=CAPTURE_CONFIG['DROP_POLICY'],
+                 lores_size=None, lores_format=CAPTURE_CONFIG['LORES_FORMAT']):
+        """
+        Args:
+            resolution: (width, height) of the main stream
+            threaded: Capture on a background thread into a ring buffer instead of
+                calling capture_array() from capture_frame()
+            buffer_size: Number of ring buffer slots in threaded mode
+            drop_policy: 'drop_oldest' or 'block' when the ring buffer is full
+            lores_size: (width, height) of a second, low resolution YUV420 stream for
+                perception, read together with main through capture_frames(). None for main only.
+            lores_format: 'YUV420' keeps the whole lores frame, 'Y' only its luma plane
+        """
+        if lores_format not in ('YUV420', 'Y'):
+            raise ValueError(f"Unknown lores format: {lores_format}")
         self.camera = Picamera2()
-        self.camera_config = self.camera.create_video_configuration(
-            main={"size": resolution, "format": "XRGB8888"}
-        )
+        streams = {'main': {"size": resolution, "format": "XRGB8888"}}
+        if lores_size is not None:
+            # The ISP only produces YUV420 on the lores stream; the Y plane is the grayscale image
+            streams['lores'] = {"size": lores_size, "format": "YUV420"}
+        self.camera_config = self.camera.create_video_configuration(**streams)
         self.width = resolution[0]
         self.height = resolution[1]
+        self.lores_size = lores_size
+        self.lores_format = lores_format
         self.camera.configure(self.camera_config)
         self.save_directory = os.path.expanduser("~/Videos")
         self.is_recording = False
 
+        self.threaded = threaded
+        self.buffer_size = buffer_size
+        self.drop_policy = drop_policy
+        self.buffer = None
+        self.lores_buffer = None
+        self.capture_errors = 0
+        self.telemetry = get_telemetry()
+        self._buffer_ready = threading.Event()
+        self._stop_event = threading.Event()
+        self._capture_thread = None
+        self._last_seq = -1
+
         os.makedirs(self.save_directory, exist_ok=True)
 
     def __enter__(self):
@@ -38,18 +76,142 @@ class CameraStream:
 
     def start(self):
         self.camera.start()
+        if self.threaded:
+            self._stop_event.clear()
+            self._capture_thread = threading.Thread(
+                target=self._capture_loop, name='CameraCapture', daemon=True
+            )
+            self._capture_thread.start()
 
     def stop(self):
+        if self._capture_thread is not None:
+            self._stop_event.set()
+            for buffer in (self.buffer, self.lores_buffer):
+                if buffer is not None:
+                    buffer.close()
+            self._capture_thread.join(timeout=2)
+            self._capture_thread = None
         if self.is_recording:
             self.stop_recording()
         self.camera.stop()
 
-    def capture_frame(self):
+    def capture_frame(self, out=None):
+        """Return the next frame. In threaded mode, waits for a frame newer than the last one returned.
+        Args:
+            out: Optional array the frame is copied into in threaded mode
+        """
+        return self.capture_next(out).frame
+
+    def capture_next(self, out=None):
+        """Same as capture_frame(), with the frame's sequence number and capture time.
+        Returns:
+            CapturedFrame(frame, seq, timestamp), frame is None on a capture error or timeout.
+            timestamp is time.monotonic() when the frame was captured, in seconds.
+        """
+        if self.threaded:
+            timeout = CAPTURE_CONFIG['READ_TIMEOUT']
+            if not self._buffer_ready.wait(timeout):
+                return CapturedFrame(None, -1, None)
+            if not self.buffer.wait_for_newer(self._last_seq, timeout):
+                return CapturedFrame(None, -1, None)
+            return self.read_latest(out)
+        try:
+            frame = self.camera.capture_array()
+        except Exception as e:
+            self.telemetry.publish('capture_error', "Frame capture error: {error}", WARNING, error=e)
+            return CapturedFrame(None, -1, None)
+        self._last_seq += 1
+        return CapturedFrame(frame, self._last_seq, time.monotonic())
+
+    def capture_frames(self):
+        """Return the next main + lores pair (dual-stream mode only).
+        Returns:
+            StreamFrames(main, lores, seq, timestamp) from the same sensor frame, or None.
+            timestamp is the sensor timestamp in seconds.
+        """
+        if self.threaded:
+            timeout = CAPTURE_CONFIG['READ_TIMEOUT']
+            if not self._buffer_ready.wait(timeout):
+                return None
+            if not self.lores_buffer.wait_for_newer(self._last_seq, timeout):
+                return None
+            return self.read_latest_frames()
         try:
-            return self.camera.capture_array()
+            main, lores, timestamp = self._capture_streams()
         except Exception as e:
-            print(f"Frame capture error: {e}")
+            self.telemetry.publish('capture_error', "Frame capture error: {error}", WARNING, error=e)
             return None
+        self._last_seq += 1
+        return StreamFrames(main, lores, self._last_seq, timestamp)
+
+    def read_latest_frames(self, main_out=None, lores_out=None):
+        """Non-blocking read of the newest main + lores pair (threaded dual-stream mode only).
+        Returns:
+            StreamFrames, lores is None if nothing was captured yet. main is None if the
+            matching main frame was already overwritten.
+        """
+        if not self._buffer_ready.is_set():
+            return StreamFrames(None, None, -1, None)
+        # The capture loop writes main before lores, so the main frame of the newest lores
+        # frame is always in the buffer unless the consumer fell a whole buffer behind
+        lores = self.lores_buffer.read_latest(lores_out)
+        if lores.frame is None:
+            return StreamFrames(None, None, -1, None)
+        main = self.buffer.read_seq(lores.seq, timeout=0, out=main_out)
+        self._last_seq = lores.seq
+        return StreamFrames(main.frame, lores.frame, lores.seq, lores.timestamp)
+
+    def read_latest(self, out=None):
+        """Non-blocking read of the newest captured frame (threaded mode only).
+        Returns:
+            CapturedFrame(frame, seq, timestamp), frame is None if nothing was captured yet
+        """
+        if not self._buffer_ready.is_set():
+            return CapturedFrame(None, -1, None)
+        captured = self.buffer.read_latest(out)
+        if captured.frame is not None:
+            self._last_seq = captured.seq
+        return captured
+
+    def capture_stats(self):
+        stats = {'errors': self.capture_errors}
+        if self.buffer is not None:
+            stats.update(self.buffer.stats())
+        if self.lores_buffer is not None:
+            stats['lores'] = self.lores_buffer.stats()
+        return stats
+
+    def _capture_streams(self):
+        """Capture main and lores from one request. Returns (main, lores, timestamp)."""
+        (main, lores), metadata = self.camera.capture_arrays(["main", "lores"])
+        if self.lores_format == 'Y':
+            lores = lores[:self.lores_size[1]]
+        timestamp = metadata.get('SensorTimestamp')
+        return main, lores, timestamp / 1e9 if timestamp is not None else time.monotonic()
+
+    def _capture_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                if self.lores_size is not None:
+                    frame, lores, timestamp = self._capture_streams()
+                else:
+                    frame, lores, timestamp = self.camera.capture_array(), None, time.monotonic()
+            except Exception as e:
+                self.capture_errors += 1
+                self.telemetry.publish('capture_error', "Frame capture error: {error}", WARNING, error=e)
+                time.sleep(0.01)
+                continue
+            if self.buffer is None:
+                self.buffer = FrameRingBuffer(frame.shape, frame.dtype,
+                                              self.buffer_size, self.drop_policy)
+                if lores is not None:
+                    self.lores_buffer = FrameRingBuffer(lores.shape, lores.dtype,
+                                                        self.buffer_size, self.drop_policy)
+                self._buffer_ready.set()
+            # Both buffers advance together, so equal sequence numbers mean the same sensor frame
+            self.buffer.put(frame, timestamp)
+            if lores is not None:
+                self.lores_buffer.put(lores, timestamp)
 
     def generate_filename(self):
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
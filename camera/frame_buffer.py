@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 09:12:40
+@Path: /camera/frame_buffer.py
+"""
+
+
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+CapturedFrame = namedtuple('CapturedFrame', ['frame', 'seq', 'timestamp'])
+# main: full-resolution frame for recording/preview (None if it was not kept),
+# lores: YUV420 (or Y only) perception frame, both from the same sensor frame
+StreamFrames = namedtuple('StreamFrames', ['main', 'lores', 'seq', 'timestamp'])
+
+DROP_OLDEST = 'drop_oldest'
+BLOCK = 'block'
+
+
+class FrameRingBuffer:
+    """Fixed number of preallocated frame slots shared by one producer and one consumer thread."""
+    def __init__(self, shape, dtype=np.uint8, size=4, drop_policy=DROP_OLDEST):
+        """
+        Args:
+            shape: Shape of a single frame, e.g. (480, 640, 4)
+            dtype: Frame dtype
+            size: Number of slots
+            drop_policy: 'drop_oldest' overwrites the oldest unread frame when full,
+                'block' makes the producer wait for the consumer
+        """
+        if drop_policy not in (DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        if size < 1:
+            raise ValueError("Ring buffer needs at least one slot")
+        self.size = size
+        self.drop_policy = drop_policy
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = np.empty((size,) + self.shape, dtype=self.dtype)
+        self.timestamps = [0.0] * size
+
+        self._cond = threading.Condition()
+        self._write_seq = 0  # Sequence number of the next frame to be written
+        self._read_seq = 0  # Sequence number of the oldest unread frame
+        self.closed = False
+
+        self.frames_written = 0
+        self.dropped_frames = 0  # Overwritten before being read, or rejected while blocking
+        self.skipped_frames = 0  # Superseded by a newer frame in read_latest()
+
+    def put(self, frame, timestamp, timeout=None):
+        """Copy a frame into the next slot.
+        Returns:
+            bool: False if the frame was rejected (buffer closed or block timeout)
+        """
+        with self._cond:
+            if self.closed:
+                return False
+            if self._write_seq - self._read_seq >= self.size:
+                if self.drop_policy == BLOCK:
+                    has_space = self._cond.wait_for(
+                        lambda: self.closed or self._write_seq - self._read_seq < self.size,
+                        timeout
+                    )
+                    if not has_space or self.closed:
+                        self.dropped_frames += 1
+                        return False
+                else:
+                    self._read_seq += 1
+                    self.dropped_frames += 1
+
+            idx = self._write_seq % self.size
+            np.copyto(self.slots[idx], frame)
+            self.timestamps[idx] = timestamp
+            self._write_seq += 1
+            self.frames_written += 1
+            self._cond.notify_all()
+            return True
+
+    def read_latest(self, out=None):
+        """Non-blocking read of the newest frame. Older unread frames are marked as consumed.
+        Args:
+            out: Optional array to copy the frame into
+        Returns:
+            CapturedFrame, or (None, -1, None) if nothing has been written yet
+        """
+        with self._cond:
+            if self._write_seq == 0:
+                return CapturedFrame(None, -1, None)
+            seq = self._write_seq - 1
+            unread = self._write_seq - self._read_seq
+            if unread > 1:
+                self.skipped_frames += unread - 1
+            self._read_seq = self._write_seq
+            frame = self._copy_slot(seq, out)
+            self._cond.notify_all()
+            return CapturedFrame(frame, seq, self.timestamps[seq % self.size])
+
+    def read_next(self, timeout=None, out=None):
+        """FIFO read of the oldest unread frame, waiting up to timeout seconds for one."""
+        with self._cond:
+            available = self._cond.wait_for(
+                lambda: self.closed or self._write_seq > self._read_seq, timeout
+            )
+            if not available or self._write_seq == self._read_seq:
+                return CapturedFrame(None, -1, None)
+            seq = self._read_seq
+            self._read_seq += 1
+            frame = self._copy_slot(seq, out)
+            self._cond.notify_all()
+            return CapturedFrame(frame, seq, self.timestamps[seq % self.size])
+
+    def read_seq(self, seq, timeout=None, out=None):
+        """Read the frame with a given sequence number, waiting up to timeout seconds for it.
+        Frames up to seq are marked as consumed.
+        Returns:
+            CapturedFrame, frame is None if seq was already overwritten or did not arrive in time
+        """
+        with self._cond:
+            available = self._cond.wait_for(lambda: self.closed or self._write_seq > seq, timeout)
+            if not available or self._write_seq <= seq or self._write_seq - seq > self.size:
+                return CapturedFrame(None, -1, None)
+            if seq + 1 > self._read_seq:
+                self.skipped_frames += max(0, seq - self._read_seq)
+                self._read_seq = seq + 1
+            frame = self._copy_slot(seq, out)
+            self._cond.notify_all()
+            return CapturedFrame(frame, seq, self.timestamps[seq % self.size])
+
+    def wait_for_newer(self, seq, timeout=None):
+        """Block until a frame with a sequence number greater than seq exists."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self.closed or self._write_seq - 1 > seq, timeout
+            ) and not self.closed
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def unread_count(self):
+        with self._cond:
+            return self._write_seq - self._read_seq
+
+    def stats(self):
+        with self._cond:
+            return {
+                'written': self.frames_written,
+                'dropped': self.dropped_frames,
+                'skipped': self.skipped_frames,
+                'unread': self._write_seq - self._read_seq,
+            }
+
+    def _copy_slot(self, seq, out):
+        slot = self.slots[seq % self.size]
+        if out is None:
+            return slot.copy()
+        np.copyto(out, slot)
+        return out
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 21:48:12
+@Path: /control/backends.py
+"""
+
+
+import random
+import subprocess
+import time
+from collections import namedtuple
+
+from utils.config import ACTUATOR_CONFIG
+
+# time: when the command was issued (perf_counter), latency: simulated round trip in seconds
+PwmCommand = namedtuple('PwmCommand', ['time', 'pin', 'duty', 'latency'])
+
+
+def ensure_pigpiod_running():
+    import pigpio
+    try:
+        result = subprocess.run(['pgrep', 'pigpiod'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            print("[INFO] pigpiod is not running. Starting it now...")
+            subprocess.run(['sudo', 'pigpiod'], check=True)
+            time.sleep(0.5)
+        else:
+            print("[INFO] pigpiod is already running.")
+
+        pi = pigpio.pi()
+        if not pi.connected:
+            raise RuntimeError("Unable to connect to pigpiod after starting it.")
+        pi.stop()
+    except Exception as e:
+        raise RuntimeError(f"Error ensuring pigpiod is running: {e}")
+
+
+def connect_pigpio():
+    """pigpio.pi connected to the local daemon, started first if needed."""
+    # Imported here: pigpio is only needed when driving the real car
+    import pigpio
+    ensure_pigpiod_running()
+    return pigpio.pi()
+
+
+class SimulatedPigpio:
+    """pigpio.pi stand-in for machines without the daemon.
+
+    Keeps the PWM settings per pin and records every set_PWM_dutycycle as a PwmCommand.
+    Each call sleeps latency plus a uniform random 0..jitter seconds, like a round trip to
+    pigpiod, so command rates and control-loop timing can be measured on any machine.
+    """
+    def __init__(self, latency=0.0, jitter=0.0, seed=None, clock=time.perf_counter, sleep=time.sleep):
+        """
+        Args:
+            latency: Seconds every call takes
+            jitter: Upper bound of the random extra delay per call, in seconds
+            seed: Seed for the jitter
+            clock: Timestamps of the recorded commands
+            sleep: Called with the delay of every call
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = random.Random(seed)
+        self.connected = True
+        self.frequency = {}
+        self.range = {}
+        self.duty = {}
+        self.commands = []  # PwmCommand per set_PWM_dutycycle call
+        self.calls = 0
+
+    def set_PWM_frequency(self, pin, frequency):
+        self._round_trip()
+        self.frequency[pin] = frequency
+
+    def set_PWM_range(self, pin, value):
+        self._round_trip()
+        self.range[pin] = value
+
+    def set_PWM_dutycycle(self, pin, duty):
+        issued = self.clock()
+        delay = self._round_trip()
+        self.duty[pin] = duty
+        self.commands.append(PwmCommand(issued, pin, duty, delay))
+
+    def stop(self):
+        self.connected = False
+
+    def command_rate(self, pin=None):
+        """Duty cycle commands per second between the first and the last one."""
+        times = [command.time for command in self.commands if pin is None or command.pin == pin]
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def summary(self):
+        pins = sorted({command.pin for command in self.commands})
+        per_pin = ", ".join(f"pin {pin}: {sum(c.pin == pin for c in self.commands)}" for pin in pins)
+        return (f"{len(self.commands)} duty commands ({self.command_rate():.1f}/s; {per_pin or 'none'}), "
+                f"{self.calls} calls, simulated latency {self.latency * 1000:.2f} ms + "
+                f"0..{self.jitter * 1000:.2f} ms jitter")
+
+    def _round_trip(self):
+        self.calls += 1
+        delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            self.sleep(delay)
+        return delay
+
+
+def create_backend(name=ACTUATOR_CONFIG['BACKEND']):
+    """Actuator backend by name: 'pigpio' for the car, 'simulated' for anywhere else."""
+    if name == 'pigpio':
+        return connect_pigpio()
+    if name == 'simulated':
+        return SimulatedPigpio(ACTUATOR_CONFIG['SIM_LATENCY'], ACTUATOR_CONFIG['SIM_JITTER'])
+    raise ValueError(f"Unknown actuator backend: {name}")
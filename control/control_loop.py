@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 22:24:50
+@Path: /control/control_loop.py
+"""
+
+
+import logging
+import threading
+import time
+
+from utils.config import CONTROL_LOOP_CONFIG
+from utils.metrics import LatencyHistogram
+from utils.pipeline import LatestValue
+
+
+def steering_target(decision):
+    """Steering percent (-100 left .. 100 right) a decision asks for."""
+    if decision['direction'] == 'left':
+        return -min(decision['strength'], 100)
+    if decision['direction'] == 'right':
+        return min(decision['strength'], 100)
+    return 0
+
+
+class ControlLoop:
+    """Applies the latest decision to the vehicle at a fixed rate on its own thread.
+
+    Perception publishes decisions with submit() at whatever rate it manages; every tick
+    the loop moves the steering toward the newest target by at most max_steering_rate
+    percent per second, so the servo follows a ramp instead of jumping once per perception
+    cycle. A stop is applied by submit() itself, without waiting for a tick, and so is a
+    stop after stale_timeout seconds without a new decision. All vehicle commands go
+    through one lock.
+    """
+    def __init__(self, vehicle, rate=CONTROL_LOOP_CONFIG['RATE'],
+                 max_steering_rate=CONTROL_LOOP_CONFIG['MAX_STEERING_RATE'],
+                 stale_timeout=CONTROL_LOOP_CONFIG['STALE_TIMEOUT'], clock=time.perf_counter):
+        """
+        Args:
+            vehicle: VehicleController or NullVehicle
+            rate: Ticks per second
+            max_steering_rate: Steering change per second in percent, None to jump to the target
+            stale_timeout: Stop when no decision arrived for this many seconds, None to never
+            clock: Monotonic time in seconds
+        """
+        self.vehicle = vehicle
+        self.period = 1.0 / rate
+        self.max_steering_rate = max_steering_rate
+        self.stale_timeout = stale_timeout
+        self.clock = clock
+        self.latest = LatestValue()  # (decision, submit time)
+        self.logger = logging.getLogger('ControlLoop')
+
+        self.steering = 0.0  # Percent currently applied
+        self.stopped = True
+        self.ticks = 0
+        self.overruns = 0  # Ticks started more than one period late
+        self.stale_stops = 0
+        self.lateness = LatencyHistogram()
+        self.error = None
+        self._last_tick = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='ControlLoop', daemon=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        self._thread.start()
+
+    def close(self, timeout=1.0):
+        """Stop ticking. The vehicle is left as it is; the caller stops it."""
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def submit(self, decision):
+        """Publish a new decision; a stop is applied right away."""
+        self.latest.put((decision, self.clock()))
+        if decision['action'] == 'stop':
+            with self._lock:
+                self._apply_stop()
+
+    def step(self, now=None):
+        """One tick: move toward the latest decision. Called by the thread every period."""
+        now = self.clock() if now is None else now
+        dt = self.period if self._last_tick is None else now - self._last_tick
+        self._last_tick = now
+        self.ticks += 1
+        with self._lock:
+            # Read under the lock: a stop submitted after the read would otherwise be
+            # overridden by the older decision right after it was applied
+            item = self.latest.get()
+            if item is None:
+                return
+            decision, submitted = item
+            if self.stale_timeout is not None and now - submitted > self.stale_timeout:
+                if not self.stopped:
+                    self.stale_stops += 1
+                    self.logger.warning(f"No decision for {now - submitted:.2f}s, stopping")
+                self._apply_stop()
+                return
+            if decision['action'] == 'stop':
+                self._apply_stop()
+                return
+            target = steering_target(decision)
+            if self.max_steering_rate is None:
+                self.steering = target
+            else:
+                max_change = self.max_steering_rate * dt
+                self.steering += max(-max_change, min(target - self.steering, max_change))
+            with self.vehicle.batch():
+                self.vehicle.drive_forward()
+                self.vehicle.set_steering_percent(self.steering)
+            self.stopped = False
+
+    def stats(self):
+        lateness = self.lateness.summary()
+        return {
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'stale_stops': self.stale_stops,
+            'late_p50_ms': lateness['p50_ms'],
+            'late_p99_ms': lateness['p99_ms'],
+            'late_max_ms': lateness['max_ms'],
+        }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"{stats['ticks']} ticks at {1 / self.period:.0f} Hz, {stats['overruns']} overruns, "
+                f"{stats['stale_stops']} stale-decision stops, tick lateness p50 {stats['late_p50_ms']:.2f} ms / "
+                f"p99 {stats['late_p99_ms']:.2f} ms / max {stats['late_max_ms']:.2f} ms")
+
+    def _apply_stop(self):
+        # Caller holds the lock. Throttle to neutral; the steering stays where it is.
+        self.vehicle.drive_neutral()
+        self.stopped = True
+
+    def _run(self):
+        next_tick = self.clock()
+        try:
+            while not self._stop_event.is_set():
+                now = self.clock()
+                late = now - next_tick
+                self.lateness.record(max(late, 0.0))
+                if late > self.period:
+                    # Fell behind: skip the missed ticks instead of bursting through them
+                    self.overruns += 1
+                    next_tick = now
+                self.step(now)
+                next_tick += self.period
+                self._stop_event.wait(max(0.0, next_tick - self.clock()))
+        except Exception as e:
+            self.error = e
+            self.logger.error(f"Control loop failed: {e}, stopping")
+            with self._lock:
+                self._apply_stop()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 18:31:40
+@Path: /control/null_vehicle.py
+"""
+
+
+from collections import Counter
+from contextlib import contextmanager
+
+
+class NullVehicle:
+    """Same interface as VehicleController, without hardware. For replays and offline runs.
+
+    Commands only update steering_percent / throttle and are counted per method, nothing
+    is sent to pigpio.
+    """
+    def __init__(self):
+        self.steering_percent = 0
+        self.throttle = 'neutral'
+        self.commands = Counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def set_steering_percent(self, percent):
+        self.commands['steering'] += 1
+        self.steering_percent = max(-100, min(percent, 100))
+
+    def drive_forward(self):
+        self._set_throttle('forward')
+
+    def drive_backward(self):
+        self._set_throttle('backward')
+
+    def drive_neutral(self):
+        self._set_throttle('neutral')
+
+    def set_throttle_ms(self, ms):
+        self._set_throttle(ms)
+
+    def adjust_steering(self, direction, strength=100):
+        if direction == 'left':
+            self.set_steering_percent(-strength)
+        elif direction == 'right':
+            self.set_steering_percent(strength)
+        else:
+            self.steering_center()
+
+    def steering_center(self):
+        self.set_steering_percent(0)
+
+    def stop(self):
+        self.commands['stop'] += 1
+        self.steering_percent = 0
+        self.throttle = 'off'
+
+    @contextmanager
+    def batch(self):
+        yield self
+
+    def summary(self):
+        return ", ".join(f"{count} {name}" for name, count in sorted(self.commands.items())) or "no commands"
+
+    def _set_throttle(self, throttle):
+        self.commands['throttle'] += 1
+        self.throttle = throttle
@@ -6,43 +6,49 @@
 """
 
 
-import subprocess
 import time
+from contextlib import contextmanager
 
-import pigpio
-
+from control.backends import create_backend
 from utils.config import GPIO_CONFIG, PWM_CONFIG, SPEED_CONFIG, STEERING_CONFIG
-
-print(SPEED_CONFIG)
-print(STEERING_CONFIG)
-
-def ensure_pigpiod_running():
-    try:
-        result = subprocess.run(['pgrep', 'pigpiod'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        if result.returncode != 0:
-            print("[INFO] pigpiod is not running. Starting it now...")
-            subprocess.run(['sudo', 'pigpiod'], check=True)
-            time.sleep(0.5)
-        else:
-            print("[INFO] pigpiod is already running.")
-
-        pi = pigpio.pi()
-        if not pi.connected:
-            raise RuntimeError("Unable to connect to pigpiod after starting it.")
-        pi.stop()
-    except Exception as e:
-        raise RuntimeError(f"Error ensuring pigpiod is running: {e}")
+from utils.telemetry import DEBUG, get_telemetry
 
 
 class VehicleController:
-    def __init__(self):
-        ensure_pigpiod_running()
+    """Steering servo and ESC on pigpio PWM, through a pigpio.pi compatible backend.
+
+    Every set_PWM_dutycycle is a socket round trip to pigpiod, so the controller remembers
+    the last duty applied per pin and skips writes that would not change it. Inside
+    `with controller.batch():` writes are only staged and the last value per pin is sent when
+    the block ends: the servo and ESC sample the duty once per PWM period, so intermediate
+    values set within one control cycle would never reach them anyway. stop() is never
+    deferred or skipped.
+    """
+    def __init__(self, telemetry=None, backend=None):
+        """
+        Args:
+            telemetry: Telemetry channel for status messages, the process-wide one by default
+            backend: Connected pigpio.pi or SimulatedPigpio; by default create_backend() for
+                ACTUATOR_CONFIG['BACKEND']
+        """
+        self.telemetry = telemetry or get_telemetry()
         self.STEER_PIN = GPIO_CONFIG['STEER_PIN']
         self.THROTTLE_PIN = GPIO_CONFIG['THROTTLE_PIN']
-        self.pi = pigpio.pi()
-        if not self.pi.connected:
+        self.backend = backend if backend is not None else create_backend()
+        if not self.backend.connected:
             raise RuntimeError("pigpio daemon not connected.")
 
+        self.applied = {}  # pin -> last duty sent to pigpiod
+        self.pending = {}  # pin -> duty staged inside batch()
+        self._batching = False
+        self.writes = 0  # Daemon round trips
+        self.write_time = 0.0
+        self.max_write_time = 0.0
+        self.skipped = 0  # Writes that would not have changed the duty
+        self.coalesced = 0  # Staged values replaced by a later one in the same batch
+        self.started = time.perf_counter()
+        self._last_stats = (0, self.started)
+
         self.setup_gpio()
         self.steering_center()
         self.drive_neutral()
@@ -52,13 +58,13 @@ class VehicleController:
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.stop()
-        if self.pi.connected:
-            self.pi.stop()
+        if self.backend.connected:
+            self.backend.stop()
 
     def setup_gpio(self):
         for pin in [self.STEER_PIN, self.THROTTLE_PIN]:
-            self.pi.set_PWM_frequency(pin, PWM_CONFIG['FREQUENCY'])
-            self.pi.set_PWM_range(pin, PWM_CONFIG['RANGE'])
+            self.backend.set_PWM_frequency(pin, PWM_CONFIG['FREQUENCY'])
+            self.backend.set_PWM_range(pin, PWM_CONFIG['RANGE'])
 
     def set_steering_percent(self, percent):
         """Control steering, percent: -100 (left) to +100 (right)"""
@@ -66,8 +72,9 @@ class VehicleController:
         mid = STEERING_CONFIG['CENTER_DUTY']
         diff = STEERING_CONFIG['MAX_DUTY_DIFF']
         duty = mid + int(diff * (percent / 100))
-        print(f"Pin: {self.STEER_PIN}, Throttle: {duty}")
-        self.pi.set_PWM_dutycycle(self.STEER_PIN, duty)
+        self.telemetry.publish('steering_pwm', "Pin: {pin}, Steering duty: {duty}", DEBUG,
+                               pin=self.STEER_PIN, duty=duty)
+        self.set_duty(self.STEER_PIN, duty)
     
     def drive_forward(self):
         ms = SPEED_CONFIG['FORWARD_MS']
@@ -85,8 +92,9 @@ class VehicleController:
         duty_ratio = ms / period_ms
         pwm_value = duty_ratio * PWM_CONFIG['RANGE']
         # pwm_value: backward: 81, forward: 66, neutral: 75.
-        print(f"Pin: {GPIO_CONFIG['THROTTLE_PIN']}, Throttle: {pwm_value}")
-        self.pi.set_PWM_dutycycle(GPIO_CONFIG['THROTTLE_PIN'], pwm_value)
+        self.telemetry.publish('throttle_pwm', "Pin: {pin}, Throttle: {duty}", DEBUG,
+                               pin=GPIO_CONFIG['THROTTLE_PIN'], duty=pwm_value)
+        self.set_duty(self.THROTTLE_PIN, pwm_value)
 
     def adjust_steering(self, direction, strength=100):
         if direction == 'left':
@@ -100,5 +108,66 @@ class VehicleController:
         self.set_steering_percent(0)
 
     def stop(self):
-        self.pi.set_PWM_dutycycle(self.STEER_PIN, 0)
-        self.pi.set_PWM_dutycycle(self.THROTTLE_PIN, 0)
\ No newline at end of file
+        # Immediate: drops staged values and always reaches the daemon
+        self.pending.clear()
+        for pin in (self.STEER_PIN, self.THROTTLE_PIN):
+            self._write(pin, 0)
+
+    def set_duty(self, pin, duty):
+        """Send a duty cycle unless it is already applied; inside batch() only stage it."""
+        if pin in self.pending:
+            self.coalesced += 1
+        elif self.applied.get(pin) == duty:
+            self.skipped += 1
+            return
+        self.pending[pin] = duty
+        if not self._batching:
+            self.flush()
+
+    def flush(self):
+        """Send the staged duty cycles that differ from the applied ones."""
+        pending, self.pending = self.pending, {}
+        for pin, duty in pending.items():
+            if self.applied.get(pin) == duty:
+                self.skipped += 1
+            else:
+                self._write(pin, duty)
+
+    @contextmanager
+    def batch(self):
+        """Coalesce the commands of one control cycle into at most one write per pin."""
+        self._batching = True
+        try:
+            yield self
+        finally:
+            self._batching = False
+            self.flush()
+
+    def stats(self):
+        """Round trips to pigpiod: totals, rate since the previous stats() call, and latency."""
+        now = time.perf_counter()
+        last_writes, last_time = self._last_stats
+        self._last_stats = (self.writes, now)
+        return {
+            'writes': self.writes,
+            'writes_per_sec': (self.writes - last_writes) / (now - last_time) if now > last_time else 0.0,
+            'skipped': self.skipped,
+            'coalesced': self.coalesced,
+            'write_ms': self.write_time / self.writes * 1000 if self.writes else 0.0,
+            'max_write_ms': self.max_write_time * 1000,
+        }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"{stats['writes']} pigpio writes ({stats['writes_per_sec']:.1f}/s), "
+                f"{stats['skipped']} unchanged skipped, {stats['coalesced']} coalesced, "
+                f"{stats['write_ms']:.2f} ms mean / {stats['max_write_ms']:.2f} ms max")
+
+    def _write(self, pin, duty):
+        start = time.perf_counter()
+        self.backend.set_PWM_dutycycle(pin, duty)
+        elapsed = time.perf_counter() - start
+        self.applied[pin] = duty
+        self.writes += 1
+        self.write_time += elapsed
+        self.max_write_time = max(self.max_write_time, elapsed)
\ No newline at end of file
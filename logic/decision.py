@@ -7,8 +7,11 @@
 
 
 import time
+from collections import namedtuple
 from enum import Enum
 
+from utils.telemetry import get_telemetry
+
 
 class VehicleState(Enum):
     NORMAL = "normal"
@@ -16,44 +19,91 @@ class VehicleState(Enum):
     TURNING = "turning"
     DESTINATION = "destination"
 
+# Events make_decision() derives from its inputs and the clock
+STOP_SIGNAL = 'stop_signal'  # Stable stop sign, or a red/yellow light
+CLEAR = 'clear'
+WAITING = 'waiting'  # Stopped for less than stop_duration
+STOP_ELAPSED = 'stop_elapsed'
+
+# (state, event) -> (next state, action, telemetry message on a state change)
+TRANSITIONS = {
+    (VehicleState.NORMAL, STOP_SIGNAL): (VehicleState.STOPPED, 'stop', "Stop sign detected, initiating stop."),
+    (VehicleState.NORMAL, CLEAR): (VehicleState.NORMAL, 'forward', None),
+    (VehicleState.STOPPED, WAITING): (VehicleState.STOPPED, 'stop', None),
+    (VehicleState.STOPPED, STOP_ELAPSED): (VehicleState.NORMAL, 'forward', "Stop duration elapsed, proceeding."),
+}
+
+# time: clock() when it happened
+Transition = namedtuple('Transition', ['time', 'previous', 'event', 'state'])
+
+
 class DecisionMaker:
-    def __init__(self):
+    """Table-driven state machine from perception to driving actions.
+
+    Every call turns the inputs into one event (see TRANSITIONS) for the current state. Time
+    only comes from clock, so with a simulated or recorded clock a run takes as long as its
+    frames do while the stop durations stay the same. State changes are published to
+    telemetry and passed to on_transition.
+    """
+    def __init__(self, clock=time.monotonic, telemetry=None, stop_duration=3.0, on_transition=None):
+        """
+        Args:
+            clock: Returns the current time in seconds. Replays pass the recorded frame time
+                so the stop duration does not depend on how fast frames are replayed.
+            telemetry: Telemetry channel for status messages, the process-wide one by default
+            stop_duration: Seconds to stay stopped after a stop sign or light
+            on_transition: Optional callable(Transition), called on every state change
+        """
+        self.clock = clock
+        self.telemetry = telemetry or get_telemetry()
+        self.stop_duration = stop_duration
+        self.on_transition = on_transition
+        self.reset()
+
+    def reset(self):
         self.current_state = VehicleState.NORMAL
         self.last_steering = 0
         self.stop_start_time = None # Time when the stop sign was detected
-        self.waiting_for_stop_to_complete = False # Flag to indicate if waiting for stop sign duration
+        self.transitions = 0
+
+    @property
+    def waiting_for_stop_to_complete(self):
+        return self.current_state == VehicleState.STOPPED
 
     def make_decision(self, lane_data, is_stop_sign, light_data):
         """
         Make a decision based on lane data, stop sign detection, and traffic light status.
         """
-        # If the vehicle is waiting for a stop sign to complete, check if 3 seconds have passed
-        if self.waiting_for_stop_to_complete:
-            if time.time() - self.stop_start_time >= 3:
-                print("Stop sign duration exceeded 3 seconds, proceeding.")
-                self.waiting_for_stop_to_complete = False
-                self.current_state = VehicleState.NORMAL
-                steering = lane_data if lane_data is not None else self.last_steering
-                self.last_steering = steering
-                return self._build_decision('forward', steering)
-            print("Still waiting for stop sign duration to complete.")
-            self.current_state = VehicleState.STOPPED
+        now = self.clock()
+        event = self._event(now, is_stop_sign, light_data)
+        state, action, message = TRANSITIONS[(self.current_state, event)]
+        if state != self.current_state:
+            self._transition(now, event, state, message)
+        if action == 'stop':
             return self._build_decision('stop', 0)
-
-        # Stop if a stop sign is detected or if the light is red/yellow
-        if is_stop_sign or light_data in ['red', 'yellow']:
-            self.stop_start_time = time.time()
-            self.waiting_for_stop_to_complete = True
-            self.current_state = VehicleState.STOPPED
-            print("Stop sign detected, initiating stop.")
-            return self._build_decision('stop', 0)
-
-        # Drive forward if no stop sign or light detected
-        self.current_state = VehicleState.NORMAL
         steering = lane_data if lane_data is not None else self.last_steering
         self.last_steering = steering
         return self._build_decision('forward', steering)
-    
+
+    def _event(self, now, is_stop_sign, light_data):
+        if self.current_state == VehicleState.STOPPED:
+            # A stop is always held for its full duration, whatever is seen meanwhile
+            return STOP_ELAPSED if now - self.stop_start_time >= self.stop_duration else WAITING
+        if is_stop_sign or light_data in ['red', 'yellow']:
+            return STOP_SIGNAL
+        return CLEAR
+
+    def _transition(self, now, event, state, message):
+        previous = self.current_state
+        self.current_state = state
+        self.transitions += 1
+        if state == VehicleState.STOPPED:
+            self.stop_start_time = now
+        self.telemetry.publish(f'{previous.value}->{state.value}', "{text} ({previous} -> {state} on {event})",
+                               text=message, previous=previous.value, state=state.value, event=event)
+        if self.on_transition is not None:
+            self.on_transition(Transition(now, previous, event, state))
+
     def _build_decision(self, action, steering_angle):
         direction, strength = self._map_steering(steering_angle)
         return {
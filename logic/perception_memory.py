@@ -1,25 +1,235 @@
-from collections import Counter, deque
+from collections import deque
+
+import numpy as np
+
+from utils.config import PERCEPTION_MEMORY_CONFIG
 
 
 class PerceptionTracker:
-    def __init__(self, history_size=5):
-        self.history = deque(maxlen=history_size)
+    """Votes over the recent values of one perception output.
+
+    Counts per value are kept up to date as entries enter and leave the history, so the
+    queries do not rescan it. The history holds the last history_size updates or, with a
+    window in seconds, the updates whose capture timestamp is within window of the newest.
+    Each update carries a confidence that weighted votes add up instead of counting 1.
+    With require_track, votes also need a confirmed track, so they come from one object
+    the detector keeps finding rather than from per-frame booleans.
+    """
+    def __init__(self, history_size=PERCEPTION_MEMORY_CONFIG['HISTORY_SIZE'],
+                 window=PERCEPTION_MEMORY_CONFIG['WINDOW'], require_track=False):
+        """
+        Args:
+            history_size: Most updates kept; None for no limit (window only)
+            window: Keep updates from the last window seconds of capture time, None for no limit
+            require_track: most_common() and recently_true() only pass while track_confirmed()
+                with min_hits=min_count, for detectors that report SignTracks
+        """
+        if history_size is None and window is None:
+            raise ValueError("PerceptionTracker needs a history_size or a window")
+        self.history_size = history_size
+        self.window = window
+        self.history = deque()  # (value, confidence, timestamp)
+        self.counts = {}  # value -> [count, summed confidence, sequence number of the last update]
+        self.true_count = 0
+        self.true_weight = 0.0
+        self.track = None
+        self.require_track = require_track
+        self._seq = 0
+
+    def update(self, value, track=None, timestamp=None, confidence=1.0):
+        """
+        Args:
+            value: Per-frame perception value
+            track: Optional SignTrack of the detection. When the track id changes, the history
+                of the previous object is discarded so votes only count the same object.
+                None means the detector is not tracking anything (any more).
+            timestamp: Capture time in seconds, needed for a time window
+            confidence: Weight of this value in weighted votes
+        """
+        if track is None:
+            # A dropped track cannot stay confirmed; the next track starts a new history
+            self.track = None
+        else:
+            if self.track is None or track.id != self.track.id:
+                self.clear()
+            self.track = track
+        if timestamp is not None:
+            self.expire(timestamp)
+        if self.history_size is not None and len(self.history) >= self.history_size:
+            self._pop()
 
-    def update(self, value):
-        self.history.append(value)
+        self._seq += 1
+        self.history.append((value, confidence, timestamp))
+        entry = self.counts.get(value)
+        if entry is None:
+            self.counts[value] = [1, confidence, self._seq]
+        else:
+            entry[0] += 1
+            entry[1] += confidence
+            entry[2] = self._seq
+        if value:
+            self.true_count += 1
+            self.true_weight += confidence
 
-    def most_common(self, min_count=3):
+    def expire(self, now):
+        """Drop the updates captured more than window seconds before now."""
+        if self.window is None:
+            return
+        while self.history and self.history[0][2] is not None and self.history[0][2] <= now - self.window:
+            self._pop()
+
+    def clear(self):
+        self.history.clear()
+        self.counts.clear()
+        self.true_count = 0
+        self.true_weight = 0.0
+
+    def state(self):
+        """History and current track as plain values, for run logs."""
+        track = None
+        if self.track is not None:
+            track = {'id': self.track.id, 'hits': self.track.hits, 'misses': self.track.misses}
+        return {'history': [value for value, _, _ in self.history], 'track': track}
+
+    def track_confirmed(self, min_hits=3):
+        """Returns True if the current track was found at least min_hits times and not missed last time."""
+        return self.track is not None and self.track.hits >= min_hits and self.track.misses == 0
+
+    def most_common(self, min_count=3, min_weight=None):
         """
-        Returns the most common value in the history that appears at least min_count times.
+        Returns the value with the highest summed confidence in the history (the most recently
+        seen one on a tie) if it is truthy, appears at least min_count times and, if given,
+        its confidence adds up to min_weight (and, with require_track, the track is confirmed).
         """
-        counter = Counter(self.history)
-        if not counter:
+        if self.require_track and not self.track_confirmed(min_count):
             return None
-        value, count = counter.most_common(1)[0]
-        if value and count >= min_count:
-            return value
-        return None
-
-    def recently_true(self, min_count=3):
-        """Returns True if True appears at least min_count times in the history."""
-        return sum(1 for v in self.history if v) >= min_count
+        best = None
+        best_key = None
+        for value, (count, weight, last) in self.counts.items():
+            if best_key is None or (weight, last) > best_key:
+                best, best_key = value, (weight, last)
+        if not best or self.counts[best][0] < min_count:
+            return None
+        if min_weight is not None and self.counts[best][1] < min_weight:
+            return None
+        return best
+
+    def recently_true(self, min_count=3, min_weight=None):
+        """Returns True if a truthy value appears at least min_count times in the history
+        (and, if given, their confidence adds up to min_weight)."""
+        if self.require_track and not self.track_confirmed(min_count):
+            return False
+        if self.true_count < min_count:
+            return False
+        return min_weight is None or self.true_weight >= min_weight
+
+    def _pop(self):
+        value, confidence, _ = self.history.popleft()
+        entry = self.counts[value]
+        entry[0] -= 1
+        entry[1] -= confidence
+        if entry[0] == 0:
+            del self.counts[value]
+        if value:
+            self.true_count -= 1
+            self.true_weight -= confidence
+            if self.true_count == 0:
+                self.true_weight = 0.0  # No float drift left over from the running sum
+
+
+class MultiChannelTracker:
+    """Votes over several labeled detection channels (e.g. stop, red, green, left, right) at once.
+
+    The history is a ring buffer of per-channel confidences (0 = not detected) with a capture
+    timestamp per row; per-channel counts and summed confidences are updated as rows enter
+    and leave, so every query is O(channels).
+    """
+    def __init__(self, channels, history_size=PERCEPTION_MEMORY_CONFIG['MULTI_HISTORY_SIZE'],
+                 window=PERCEPTION_MEMORY_CONFIG['WINDOW']):
+        """
+        Args:
+            channels: Channel labels
+            history_size: Rows kept (ring buffer capacity)
+            window: Also drop rows captured more than window seconds before the newest, None for no limit
+        """
+        self.channels = tuple(channels)
+        self.index = {channel: i for i, channel in enumerate(self.channels)}
+        self.window = window
+        self.confidences = np.zeros((history_size, len(self.channels)), dtype=np.float32)
+        self.timestamps = np.zeros(history_size, dtype=np.float64)
+        self.counts = np.zeros(len(self.channels), dtype=np.int64)
+        self.weights = np.zeros(len(self.channels), dtype=np.float64)
+        self.head = 0  # Oldest row
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def update(self, detections, timestamp=None):
+        """
+        Args:
+            detections: {channel: confidence or True} for the channels detected in this frame
+            timestamp: Capture time in seconds, needed for a time window
+        """
+        if timestamp is not None:
+            self.expire(timestamp)
+        capacity = len(self.timestamps)
+        if self.size == capacity:
+            self._pop()
+        row = (self.head + self.size) % capacity
+        values = self.confidences[row]
+        values[:] = 0
+        for channel, confidence in detections.items():
+            if confidence:
+                values[self.index[channel]] = float(confidence)
+        self.timestamps[row] = np.nan if timestamp is None else timestamp
+        self.counts += values > 0
+        self.weights += values
+        self.size += 1
+
+    def expire(self, now):
+        """Drop the rows captured more than window seconds before now."""
+        if self.window is None:
+            return
+        # NaN timestamps (rows without one) never compare as expired
+        while self.size and self.timestamps[self.head] <= now - self.window:
+            self._pop()
+
+    def clear(self, channel=None):
+        """Forget one channel (e.g. when its tracked object changes), or everything."""
+        if channel is None:
+            self.size = 0
+            self.counts[:] = 0
+            self.weights[:] = 0
+            return
+        i = self.index[channel]
+        self.confidences[:, i] = 0
+        self.counts[i] = 0
+        self.weights[i] = 0
+
+    def count(self, channel):
+        return int(self.counts[self.index[channel]])
+
+    def weight(self, channel):
+        return float(self.weights[self.index[channel]])
+
+    def recently_true(self, channel, min_count=3, min_weight=None):
+        i = self.index[channel]
+        if self.counts[i] < min_count:
+            return False
+        return min_weight is None or self.weights[i] >= min_weight
+
+    def most_common(self, channels=None, min_count=3, min_weight=None):
+        """The channel (among channels, default all) with the highest summed confidence that was
+        detected at least min_count times and, if given, reaches min_weight; None otherwise."""
+        candidates = self.channels if channels is None else channels
+        best = max(candidates, key=lambda channel: self.weights[self.index[channel]])
+        return best if self.recently_true(best, min_count, min_weight) else None
+
+    def _pop(self):
+        values = self.confidences[self.head]
+        self.counts -= values > 0
+        self.weights -= values
+        self.head = (self.head + 1) % len(self.timestamps)
+        self.size -= 1
+        self.weights[self.counts == 0] = 0  # No float drift left over from the running sums
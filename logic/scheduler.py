@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 13:41:52
+@Path: /logic/scheduler.py
+"""
+
+
+from collections import Counter, namedtuple
+
+from utils.config import SCHEDULER_CONFIG
+
+# run: whether the detector runs on this frame, interval: current cadence in frames,
+# reason: why the cadence is what it is ('base', 'far_sign', 'idle_throttle', 'over_budget', ...)
+ScheduleDecision = namedtuple('ScheduleDecision', ['run', 'interval', 'reason'])
+
+
+class DetectorSchedule:
+    """Cadence and latency budget of one detector."""
+    def __init__(self, name, interval, max_interval, budget_ms, active_interval=None, idle_throttle=False):
+        self.name = name
+        self.idle_throttle = idle_throttle
+        self.base_interval = interval
+        self.active_interval = active_interval if active_interval is not None else interval
+        self.max_interval = max(max_interval, interval)
+        self.budget_ms = budget_ms
+
+        self.interval = interval
+        self.reason = 'base'
+        self.state_interval = interval
+        self.state_reason = 'base'
+        self.latency_penalty = 0
+        self.latency_ema_ms = None
+        self.last_run_frame = None
+        self.runs_without_detection = 0
+
+        self.runs = 0
+        self.skips = 0
+        self.reasons = Counter()
+
+    def is_due(self, frame_index):
+        return self.last_run_frame is None or frame_index - self.last_run_frame >= self.interval
+
+    def refresh(self):
+        """Combine the state-driven cadence with the latency penalty."""
+        self.interval = min(self.max_interval, self.state_interval + self.latency_penalty)
+        self.reason = 'over_budget' if self.latency_penalty > 0 else self.state_reason
+
+
+class DetectionScheduler:
+    """Decides per frame which detectors run, replacing a single fixed detection interval.
+
+    Each detector has its own cadence. The cadence shortens while the detector is seeing
+    something (a far stop sign, a traffic light) and lengthens when it has found nothing for a
+    while or when its measured latency exceeds its budget.
+    """
+    def __init__(self, config=SCHEDULER_CONFIG, adapt_to_latency=True):
+        """
+        Args:
+            config: Per-detector INTERVAL/ACTIVE_INTERVAL/MAX_INTERVAL/BUDGET_MS/IDLE_THROTTLE settings
+            adapt_to_latency: Lengthen cadences of detectors running over budget. Disable for
+                deterministic runs, since measured latency depends on the machine.
+        """
+        self.idle_runs = config['IDLE_RUNS']
+        self.latency_alpha = config['LATENCY_EMA']
+        self.adapt_to_latency = adapt_to_latency
+        self.schedules = {
+            name: DetectorSchedule(
+                name,
+                interval=settings['INTERVAL'],
+                max_interval=settings['MAX_INTERVAL'],
+                budget_ms=settings['BUDGET_MS'],
+                active_interval=settings.get('ACTIVE_INTERVAL'),
+                idle_throttle=settings.get('IDLE_THROTTLE', False),
+            )
+            for name, settings in config['DETECTORS'].items()
+        }
+
+    def plan(self, frame_index):
+        """Returns dict: detector name -> ScheduleDecision for this frame."""
+        decisions = {}
+        for name, schedule in self.schedules.items():
+            run = schedule.is_due(frame_index)
+            if run:
+                schedule.last_run_frame = frame_index
+                schedule.runs += 1
+                schedule.reasons[schedule.reason] += 1
+            else:
+                schedule.skips += 1
+            decisions[name] = ScheduleDecision(run, schedule.interval, schedule.reason)
+        return decisions
+
+    def record_latency(self, name, seconds):
+        schedule = self.schedules[name]
+        latency_ms = seconds * 1000
+        if schedule.latency_ema_ms is None:
+            schedule.latency_ema_ms = latency_ms
+        else:
+            schedule.latency_ema_ms += self.latency_alpha * (latency_ms - schedule.latency_ema_ms)
+
+        if self.adapt_to_latency:
+            if schedule.latency_ema_ms > schedule.budget_ms:
+                schedule.latency_penalty = min(schedule.latency_penalty + 1,
+                                               schedule.max_interval - schedule.base_interval)
+            elif schedule.latency_ema_ms < schedule.budget_ms / 2 and schedule.latency_penalty > 0:
+                schedule.latency_penalty -= 1
+        schedule.refresh()
+
+    def observe(self, name, detected, reason='detected'):
+        """Update a detector's cadence from what its last run saw.
+        Args:
+            name: Detector name
+            detected: Whether the last run found its object
+            reason: Reason reported while the active cadence applies (e.g. 'far_sign')
+        """
+        schedule = self.schedules[name]
+        if detected:
+            schedule.runs_without_detection = 0
+            schedule.state_interval = schedule.active_interval
+            schedule.state_reason = reason
+        else:
+            schedule.runs_without_detection += 1
+            idle = schedule.runs_without_detection - self.idle_runs
+            # Keep the active cadence for a few runs after losing the object, then back off
+            if idle >= 0:
+                if schedule.idle_throttle:
+                    # Double the interval for every further idle_runs empty runs
+                    steps = idle // self.idle_runs + 1
+                    schedule.state_interval = min(schedule.max_interval, schedule.base_interval * 2 ** steps)
+                    schedule.state_reason = 'idle_throttle'
+                else:
+                    schedule.state_interval = schedule.base_interval
+                    schedule.state_reason = 'base'
+        schedule.refresh()
+
+    def stats(self):
+        return {
+            name: {
+                'runs': schedule.runs,
+                'skips': schedule.skips,
+                'interval': schedule.interval,
+                'reason': schedule.reason,
+                'latency_ms': schedule.latency_ema_ms,
+                'run_reasons': dict(schedule.reasons),
+            }
+            for name, schedule in self.schedules.items()
+        }
+
+    def summary(self):
+        return ", ".join(
+            f"{name}: {s['runs']} runs / {s['skips']} skips (interval {s['interval']}, {s['reason']})"
+            for name, s in self.stats().items()
+        )
@@ -6,20 +6,41 @@
 """
 
 
+import functools
 import logging
 import os
+import threading
 import time
 from datetime import datetime
 
 import cv2
 
+from camera.frame_buffer import StreamFrames
+from control.control_loop import ControlLoop
+from control.null_vehicle import NullVehicle
 from control.vehicle_control import VehicleController
 from logic.decision import DecisionMaker
 from logic.perception_memory import PerceptionTracker
+from logic.scheduler import DetectionScheduler
+from perception.birdseye import BirdsEyeLaneDetector
+from perception.executor import PerceptionExecutor, PerceptionTask
+from perception.frame_context import FrameContext, FrameContextStats
 from perception.lane_detection import LaneDetector
+from perception.sign_cascades import CASCADES, SignCascades
+from perception.sliding_window_lane import SlidingWindowLaneDetector
 from perception.traffic_light_detection import TrafficLightDetector
 from perception.traffic_sign_detection import TrafficSignDetector
+from utils.buffer_pool import BufferPool
 from utils.config import *
+from utils.metrics import HttpExporter, JsonLinesExporter, MetricsRegistry
+from utils.pipeline import LatestValue, PipelineStage, StageQueue
+from utils.run_log import RunRecorder
+from utils.telemetry import DEBUG, get_telemetry
+from utils.video_writer import AsyncVideoWriter
+
+# Timed stages, in loop order, for the periodic metrics log line
+METRIC_STAGES = ('capture', 'convert', 'lane', 'stop_sign', 'light', 'decision', 'actuation',
+                 'overlay', 'write', 'end_to_end', 'cycle')
 
 
 def save_frame(frame, directory="debug_frames"):
@@ -29,16 +50,49 @@ def save_frame(frame, directory="debug_frames"):
     cv2.imwrite(filename, frame)
     print(f"[INFO] Saved frame to {filename}")
 
+def scale_coords(coords, scale):
+    """Scale alternating x, y coordinates (a bbox or a line) by scale = (sx, sy)."""
+    return tuple(int(round(value * scale[i % 2])) for i, value in enumerate(coords))
+
 class AutoDriver:
-    def __init__(self, debug=False, video_path=None):
+    def __init__(self, debug=False, video_path=None, pipelined=PIPELINE_CONFIG['ENABLED'], replay=None,
+                 vehicle=None, record_path=None, record_frames=RUN_LOG_CONFIG['FRAMES']):
+        """
+        Args:
+            debug: Draw perception overlays on the recorded video
+            video_path: Read frames from a video file instead of the camera
+            pipelined: Run capture, perception, control and output on separate threads
+            replay: RunLogCapture to drive the loop from a run log. Replays are deterministic:
+                detectors run serially, the scheduler ignores measured latency, decisions use
+                the recorded frame time, and no video is encoded.
+            vehicle: Vehicle controller to use; VehicleController on ACTUATOR_CONFIG['BACKEND'] by default,
+                NullVehicle for replays
+            record_path: Directory for a run log of frames, perception and decisions
+                (serial loop only); RUN_LOG_CONFIG['ENABLED'] records into output/ by default
+            record_frames: Store raw frames in the run log, not only the per-frame records
+        """
         self.debug = debug
+        self.replay = replay
+        self.deterministic = replay is not None
+        self.pipelined = pipelined and not self.deterministic
         self.video_path = video_path
-        self.use_video = video_path is not None
+        self.use_video = video_path is not None or replay is not None
+        self.record_path = record_path
+        self.record_frames = record_frames
+        if self.record_path is None and RUN_LOG_CONFIG['ENABLED'] and not self.deterministic:
+            self.record_path = f"output/run_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S-%f')}"
+        if self.record_path and self.pipelined:
+            raise ValueError("Run logs are recorded by the serial loop, disable pipelined mode")
+        # Perception on the camera's lores stream, the full-resolution main stream only for recording
+        self.dual_stream = CAPTURE_CONFIG['DUAL_STREAM'] and not self.use_video
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger('AutoDriver')
+        self.telemetry = get_telemetry()
 
         self.frame_counter = 0
-        self.detection_interval = 5  # Detect every N frames (originally 10, reduced for faster detection)
+        # Per-detector cadence, replaces a fixed detection interval
+        self.scheduler = DetectionScheduler(adapt_to_latency=not self.deterministic)
+        self.last_lane_result = (0, [])
         self.last_stop_sign_result = (False, False, None)
         self.last_light_result = (None, None)
 
@@ -46,12 +100,26 @@ class AutoDriver:
             self.camera = None
             self.video_cap = None
             self.vehicle = None
-            self.lane_detector = LaneDetector()
-            self.stop_sign_detector = TrafficSignDetector('stop')
-            self.light_detector = TrafficLightDetector()
-            self.decision_maker = DecisionMaker()
-            self.stop_sign_tracker = PerceptionTracker()
-            self.light_color_tracker = PerceptionTracker()
+            self.vehicle_ctx = vehicle
+            self.video_writer = None
+            self.recorder = None
+            self.control_loop = None
+            if LANE_CONFIG['ENGINE'] == 'sliding_window':
+                self.lane_detector = SlidingWindowLaneDetector()
+            elif LANE_CONFIG['ENGINE'] == 'birdseye':
+                self.lane_detector = BirdsEyeLaneDetector()
+            else:
+                self.lane_detector = LaneDetector()
+            # Stop sign and light cascades, on one shared pyramid with SIGN_SCALE_CONFIG['SHARED_PYRAMID']
+            self.sign_cascades = SignCascades()
+            self.decision_maker = DecisionMaker(clock=replay.clock) if replay else DecisionMaker()
+            # With tracking, a stop sign or light is only confirmed once its track is
+            self.stop_sign_tracker = PerceptionTracker(require_track=TRACKING_CONFIG['ENABLED'])
+            self.light_color_tracker = PerceptionTracker(require_track=TRACKING_CONFIG['ENABLED'])
+            self.perception_executor = self._create_perception_executor()
+            self.frame_context_stats = FrameContextStats()
+            self.buffers = BufferPool(BUFFER_POOL_CONFIG['ENABLED'])
+            self.metrics = self._create_metrics()
 
         except Exception as e:
             self.logger.error(f"Initialization error: {str(e)}")
@@ -59,33 +127,56 @@ class AutoDriver:
 
     def __enter__(self):
         try:
+            # Start detector workers before any capture threads exist
+            if self.perception_executor:
+                self.perception_executor.start()
+
             if self.use_video:
-                self.video_cap = cv2.VideoCapture(self.video_path)
+                self.video_cap = self.replay or cv2.VideoCapture(self.video_path)
                 if not self.video_cap.isOpened():
                     raise IOError(f"Cannot open video file: {self.video_path}")
                 self.frame_source = self.video_cap
                 self.fps = self.video_cap.get(cv2.CAP_PROP_FPS) or 30
                 self.width = int(self.video_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
                 self.height = int(self.video_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                self.capture_shape = (self.height, self.width, 3)
             else:
                 from camera.camera_stream import CameraStream
-                self.camera_ctx = CameraStream()
+                if self.dual_stream:
+                    self.camera_ctx = CameraStream(CAPTURE_CONFIG['MAIN_SIZE'], threaded=CAPTURE_CONFIG['THREADED'],
+                                                   lores_size=CAPTURE_CONFIG['LORES_SIZE'])
+                else:
+                    self.camera_ctx = CameraStream(threaded=CAPTURE_CONFIG['THREADED'])
                 self.camera = self.camera_ctx.__enter__()
                 self.frame_source = self.camera
                 self.fps = 30  # Default camera frame rate
                 self.width = self.camera.width
                 self.height = self.camera.height
+                self.capture_shape = (self.height, self.width, 4)  # XRGB8888
+
+            if not self.deterministic:
+                fourcc = cv2.VideoWriter_fourcc(*'avc1')
+                os.makedirs("output", exist_ok=True)
+                timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S-%f")
+                filename = f"output/autodrive_result_{timestamp}.mp4"
+                # Offline videos keep every frame, live runs drop frames rather than stall the loop
+                drop_policy = 'block' if self.use_video else RECORDING_CONFIG['DROP_POLICY']
+                self.video_writer = AsyncVideoWriter(
+                    cv2.VideoWriter(filename, fourcc, self.fps, (self.width, self.height)),
+                    RECORDING_CONFIG['QUEUE_SIZE'], drop_policy, threaded=RECORDING_CONFIG['ASYNC']
+                )
+                self.logger.info(f"VideoWriter initialized: {self.width}x{self.height} @ {self.fps}fps")
 
-            fourcc = cv2.VideoWriter_fourcc(*'avc1')
-            os.makedirs("output", exist_ok=True)
-            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S-%f")
-            filename = f"output/autodrive_result_{timestamp}.mp4"
-            self.video_writer = cv2.VideoWriter(filename, fourcc, self.fps, (self.width, self.height))
-
-            self.vehicle_ctx = VehicleController()
+            if self.vehicle_ctx is None:
+                if self.deterministic:
+                    self.vehicle_ctx = NullVehicle()
+                else:
+                    self.vehicle_ctx = VehicleController()
             self.vehicle = self.vehicle_ctx.__enter__()
-
-            self.logger.info(f"VideoWriter initialized: {self.width}x{self.height} @ {self.fps}fps")
+            # Replays apply every decision in step with its frame
+            if CONTROL_LOOP_CONFIG['ENABLED'] and not self.deterministic:
+                self.control_loop = ControlLoop(self.vehicle)
+                self.control_loop.start()
 
             return self
 
@@ -96,6 +187,10 @@ class AutoDriver:
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         try:
+            if self.perception_executor:
+                self.perception_executor.close()
+            if self.control_loop:
+                self.control_loop.close()
             if self.vehicle:
                 self.vehicle_ctx.__exit__(exc_type, exc_val, exc_tb)
             if not self.use_video and self.camera:
@@ -104,161 +199,524 @@ class AutoDriver:
                 self.video_cap.release()
             if self.video_writer:
                 self.video_writer.release()
+            if self.recorder:
+                self.recorder.close()
+            self.metrics.close()
         except Exception as e:
             self.logger.error(f"Error during cleanup: {str(e)}")
             raise
 
+    def _create_perception_executor(self):
+        """Stop sign and traffic light cascades are independent, so they can run in parallel.
+        Each gets its own task even with SIGN_SCALE_CONFIG['SHARED_PYRAMID'], which only the
+        serial loop uses: one shared task would run both cascades one after the other."""
+        # Deadlines make parallel results timing dependent, replays run the cascades in order
+        if PERCEPTION_EXECUTOR_CONFIG['MODE'] == 'serial' or self.deterministic:
+            return None
+        return PerceptionExecutor([
+            PerceptionTask('stop_sign', functools.partial(TrafficSignDetector, 'stop'), 'detect_tracked'),
+            PerceptionTask('light', TrafficLightDetector, 'detect_tracked'),
+        ], mode=PERCEPTION_EXECUTOR_CONFIG['MODE'])
+
+    def _create_metrics(self):
+        exporters = []
+        if METRICS_CONFIG['EXPORT_PATH']:
+            exporters.append(JsonLinesExporter(METRICS_CONFIG['EXPORT_PATH']))
+        if METRICS_CONFIG['HTTP_PORT'] is not None:
+            exporters.append(HttpExporter(METRICS_CONFIG['HTTP_PORT']))
+            self.logger.info(f"Serving metrics on http://127.0.0.1:{exporters[-1].port}/")
+        return MetricsRegistry(METRICS_CONFIG['ENABLED'], METRICS_CONFIG['SNAPSHOT_INTERVAL'], exporters)
+
     def start(self):
         self.logger.info("Starting autonomous driving system")
         self.logger.info(f"debug mode: {self.debug}")
+        if self.pipelined:
+            self._start_pipelined()
+            return
         try:
             while True:
-                start_time = time.time()
-                if self.use_video:
-                    ret, frame = self.frame_source.read()
-                    if not ret:
-                        self.logger.info("End of video or frame error.")
-                        break
-                else:
-                    frame = self.frame_source.capture_frame()
-                    if frame is None:
-                        self.logger.warning("Failed to capture frame")
-                        continue
+                self._publish_metrics()
+                start_time = time.perf_counter()
+                ret, frame, timestamp = self._read_frame()
+                if not ret:
+                    break
+                if frame is None:
+                    continue
 
                 self.frame_counter += 1
+                self.metrics.count('frames')
+                frame = self._prepare_frame(frame)
 
-                if frame.shape[2] == 4:
-                    self.logger.debug("Converting BGRA frame to BGR at input stage")
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
-                elif frame.shape[2] == 1:
-                    frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
-
-                # Detect every detection_interval frames, skip others
-                if self.frame_counter % self.detection_interval != 0:
+                # Only run the detectors that are due on this frame
+                schedule = self._plan()
+                if not any(decision.run for decision in schedule.values()):
                     # Still write the original frame (optional)
-                    if self.video_writer:
-                        self.video_writer.write(frame)
+                    self._record(frame, timestamp, schedule)
+                    self._write_frame(frame)
                     continue
 
-                if self.use_video:
-                    current_time_ms = self.frame_source.get(cv2.CAP_PROP_POS_MSEC)
-                    minutes = int(current_time_ms // 60000)
-                    seconds = int((current_time_ms % 60000) // 1000)
-                    self.logger.info(f"[Video Time] {minutes:02d}:{seconds:02d}")
-
-                t0 = time.time()
-                steering_angle, lane_lines = self.lane_detector.detect(frame)
-                t1 = time.time()
-                is_stop_sign, is_stop_sign_close, stop_bbox = self.stop_sign_detector.detect(frame)
-                t2 = time.time()
-                light_color, light_box = self.light_detector.detect_by_sign_and_color(frame)
-                t3 = time.time()
-
-                # Update historical perception data
-                self.stop_sign_tracker.update(is_stop_sign_close)
-                self.light_color_tracker.update(light_color)
-
-                # Determine stable states
-                is_stop_sign_stable = self.stop_sign_tracker.recently_true(min_count=3)
-                stable_light = self.light_color_tracker.most_common(min_count=2)
-
-                if self.debug:
-                    self.logger.info(
-                        f"[Perception] Lane angle: {steering_angle:.2f}, "
-                        f"is_stop_sign: {is_stop_sign}, is_stop_sign_stable: {is_stop_sign_stable}, "
-                        f"stop_sign_close: {is_stop_sign_close}, stop_bbox: {stop_bbox}, "
-                        f"light: {light_color}, stable light: {stable_light}, light_box: {light_box}"
-                    )
-
-                # Decision-making process
-                decision = self.decision_maker.make_decision(
-                    steering_angle, is_stop_sign_stable, stable_light
-                )
-                print(f"Decision: {decision}")
-                t4 = time.time()
-                self.logger.info(
-                    f"[Profiling] Lane: {t1-t0:.3f}s, StopSign: {t2-t1:.3f}s, Light: {t3-t2:.3f}s, Other: {t4-t3:.3f}s"
-                )
-                # Execute control actions based on the decision
-                if decision['action'] == 'stop':
-                    self.vehicle.drive_neutral()
-                    print("Stopping vehicle")
-                else:
-                    print("Driving vehicle")
-                    print(f"Steering: {decision['steering']:.2f} → {decision['direction']} ({decision['strength']}%)")
-                    # self.vehicle.drive_neutral()
-                    self.vehicle.drive_forward()
-                    self.vehicle.adjust_steering(decision['direction'], decision['strength'])
-
-                # Visualization & output video frame
-                if self.debug:
-                    display_frame = frame.copy()
-                    # Draw perception info
-                    cv2.putText(display_frame, f"Steering: {steering_angle:.2f}", (10, 60),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-                    if is_stop_sign:
-                        s_x, s_y, s_w, s_h = stop_bbox
-                        cv2.rectangle(display_frame, (s_x, s_y), (s_x+s_w, s_y+s_h), (0, 100, 255), 2)
-                    cv2.putText(display_frame, f"Stop Sign: {stop_bbox}, Close: {is_stop_sign_close}, Close&Stable: {is_stop_sign_stable}", (10, 120),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-                    if light_box:
-                        l_x, l_y, l_w, l_h = light_box
-                        cv2.rectangle(display_frame, (l_x, l_y), (l_x+l_w, l_y+l_h), (255, 255, 0), 2)
-                    cv2.putText(display_frame, f"Traffic Light: {light_color}, Stable Light: {stable_light}", (10, 140),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-                    cv2.putText(display_frame, f"Action: {decision['action']}", (10, 180),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                    cv2.putText(display_frame, f"Direction: {decision['direction']}", (10, 220),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                    cv2.putText(display_frame, f"Strength: {decision['strength']}%", (10, 260), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-                    # ✅ Draw detected lane lines
-                    for (x1, y1, x2, y2) in lane_lines:
-                        cv2.line(display_frame, (x1, y1), (x2, y2), (0, 255, 255), 3)
-
-                    # Write the video frame
-                    if self.video_writer:
-                        self.video_writer.write(display_frame)                    
-
-                    # # Save key frames
-                    # if is_stop_sign_stable or stable_light:
-                    #     save_frame(display_frame)
-
-                
-                end_time = time.time()
-                duration = end_time - start_time
-                self.logger.info(f"[Timing] Decision cycle time: {duration:.3f}s")
+                perception = self._perceive(frame, schedule, timestamp)
+                decision = self._decide(perception)
+                self._actuate(decision)
+                # From reading the frame to the commands being sent
+                self.metrics.record('end_to_end', time.perf_counter() - start_time)
+                self._record(frame, timestamp, schedule, perception, decision)
+                self._write_frame(frame, perception, decision)
+                self.metrics.record('cycle', time.perf_counter() - start_time)
 
         except KeyboardInterrupt:
             self.logger.info("Manual stop triggered")
         except Exception as e:
             self.logger.error(f"Runtime error: {str(e)}")
         finally:
-            self.logger.info("Shutting down system...")
-            try:
-                self.vehicle.stop()
-                self.vehicle.steering_center()
-            except Exception as e:
-                self.logger.warning(f"Error during vehicle shutdown: {e}")
-
-            try:
-                if self.video_writer:
-                    self.video_writer.release()
-                    self.logger.info("VideoWriter released successfully.")
-            except Exception as e:
-                self.logger.error(f"Error releasing VideoWriter: {e}")
-
-            if self.debug:
-                cv2.destroyAllWindows()
-
-            self.logger.info("System shutdown complete.")
-
-def run(debug=False, video_path=None):
-    with AutoDriver(debug=debug, video_path=video_path) as driver:
+            self._shutdown()
+
+    def _start_pipelined(self):
+        """Run capture, perception, decision/control and output as separate threads.
+
+        Capture feeds perception through a bounded queue. Perception publishes its newest
+        result to control through a single-slot mailbox, so control never waits behind the
+        video writer, and hands frames to the output stage through a second bounded queue.
+        """
+        stop_event = threading.Event()
+        capture_policy = 'block' if self.use_video else 'drop_oldest'
+        self.perception_queue = StageQueue(PIPELINE_CONFIG['QUEUE_SIZE'], capture_policy)
+        self.output_queue = StageQueue(PIPELINE_CONFIG['OUTPUT_QUEUE_SIZE'], capture_policy)
+        self.latest_perception = LatestValue()
+        self.latest_decision = LatestValue()
+
+        self.stages = [
+            PipelineStage('capture', self._capture_stage,
+                          outputs=[self.perception_queue], stop_event=stop_event),
+            PipelineStage('perception', self._perception_stage, source=self.perception_queue,
+                          outputs=[self.latest_perception, self.output_queue], stop_event=stop_event),
+            PipelineStage('control', self._control_stage, source=self.latest_perception,
+                          stop_event=stop_event),
+            PipelineStage('output', self._output_stage, source=self.output_queue,
+                          stop_event=stop_event),
+        ]
+        try:
+            for stage in self.stages:
+                stage.start()
+            while any(stage.is_alive() for stage in self.stages):
+                self.stages[-1].join(timeout=PIPELINE_CONFIG['STATS_INTERVAL'])
+                self._log_pipeline_stats()
+                self._publish_metrics()
+        except KeyboardInterrupt:
+            self.logger.info("Manual stop triggered")
+        finally:
+            stop_event.set()
+            for stage in self.stages:
+                stage.join(timeout=2)
+                if stage.error:
+                    self.logger.error(f"Runtime error in {stage.name} stage: {stage.error}")
+            self._shutdown()
+
+    def _capture_stage(self):
+        start_time = time.perf_counter()
+        ret, frame, timestamp = self._read_frame()
+        if not ret:
+            return False
+        if frame is None:
+            return True
+        self.metrics.count('frames')
+        # Stamped here: the other stages run behind the capture thread
+        if not self.perception_queue.put((self._prepare_frame(frame), timestamp, start_time)):
+            self.metrics.count('frames_dropped')
+        return not self.perception_queue.closed
+
+    def _perception_stage(self, item):
+        frame, timestamp, start_time = item
+        self.frame_counter += 1
+        perception = None
+        schedule = self._plan()
+        if any(decision.run for decision in schedule.values()):
+            perception = self._perceive(frame, schedule, timestamp)
+            self.latest_perception.put((perception, start_time))
+        if not self.output_queue.put((frame, perception)):
+            self.metrics.count('output_frames_dropped')
+
+    def _control_stage(self, item):
+        perception, start_time = item
+        decision = self._decide(perception)
+        self._actuate(decision)
+        # From reading the frame to the commands being sent, as in the serial loop
+        self.metrics.record('end_to_end', time.perf_counter() - start_time)
+        self.latest_decision.put((perception, decision))
+
+    def _output_stage(self, item):
+        frame, perception = item
+        decision = None
+        decided = self.latest_decision.get()
+        # Control only handles the newest perception; frames whose perception it skipped
+        # or has not reached yet are drawn without a decision
+        if perception is not None and decided is not None and decided[0] is perception:
+            decision = decided[1]
+        self._write_frame(frame, perception, decision)
+
+    def _log_pipeline_stats(self):
+        for stage in self.stages:
+            stats = stage.stats()
+            self.logger.info(
+                f"[Pipeline] {stage.name}: {stats['fps']:.1f} fps, {stats['busy_ms']:.1f} ms/item, "
+                f"queue depth: {stats.get('queue_depth', '-')}, dropped: {stats.get('queue_dropped', '-')}"
+            )
+
+    def _publish_metrics(self):
+        """Log (and export) a metrics snapshot once per METRICS_CONFIG['SNAPSHOT_INTERVAL']."""
+        snapshot = self.metrics.maybe_snapshot()
+        if snapshot:
+            self.logger.info(f"[Metrics] p50/p95/p99/max ms: {MetricsRegistry.format(snapshot, METRIC_STAGES)}")
+            self.logger.info(f"[Vehicle] {self.vehicle.summary()}")
+
+    def _read_frame(self):
+        """Returns (ret, frame, timestamp). ret is False at the end of the stream, frame is None
+        on a capture error. timestamp is the capture time of the frame in seconds."""
+        with self.metrics.timer('capture'):
+            ret, frame, timestamp = self._capture()
+        if ret and frame is None:
+            self.metrics.count('capture_errors')
+        return ret, frame, timestamp
+
+    def _capture(self):
+        # Capture time: the video position, or the sensor / capture thread's monotonic time
+        if self.use_video:
+            ret, frame = self.frame_source.read(self._serial_buffer('capture', self.capture_shape))
+            if not ret:
+                self.logger.info("End of video or frame error.")
+                return False, None, None
+            return True, frame, self.frame_source.get(cv2.CAP_PROP_POS_MSEC) / 1000
+        if self.dual_stream:
+            frame = self.frame_source.capture_frames()
+            timestamp = frame.timestamp if frame is not None else None
+        else:
+            frame, _, timestamp = self.frame_source.capture_next(self._serial_buffer('capture', self.capture_shape))
+        if frame is None:
+            self.logger.warning("Failed to capture frame")
+        return True, frame, timestamp
+
+    def _prepare_frame(self, frame):
+        if isinstance(frame, StreamFrames):
+            # Detectors read the lores frame; main is only converted if it gets recorded
+            return frame
+        with self.metrics.timer('convert'):
+            return self._convert_frame(frame)
+
+    def _convert_frame(self, frame):
+        if frame.shape[2] == 4:
+            self.logger.debug("Converting BGRA frame to BGR at input stage")
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR,
+                                 dst=self._serial_buffer('bgr', frame.shape[:2] + (3,)))
+        elif frame.shape[2] == 1:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        return frame
+
+    def _perceive(self, frame, schedule, timestamp=None):
+        """Run the scheduled detectors on a frame and update the perception trackers.
+        timestamp is the capture time, for trackers that vote over a time window.
+        """
+        if self.use_video and timestamp is not None:
+            minutes = int(timestamp // 60)
+            seconds = int(timestamp % 60)
+            self.logger.info(f"[Video Time] {minutes:02d}:{seconds:02d}")
+
+        if self.debug:
+            self.logger.info("[Scheduler] " + ", ".join(
+                f"{name}: {'run' if d.run else 'skip'} (every {d.interval}, {d.reason})"
+                for name, d in schedule.items()
+            ))
+
+        # Color conversions are computed once and shared by all detectors
+        ctx = self._frame_context(frame, pool=self.buffers)
+        cascades = [name for name in CASCADES if schedule[name].run]
+        timings = {}
+        if self.perception_executor and cascades:
+            # Cascades run on the executor while lane detection runs here
+            self.perception_executor.submit(ctx, names=cascades)
+            self._detect_lane(ctx, schedule, timings)
+            results = self.perception_executor.collect()
+            timings.update({name: self.perception_executor.last_timings[name] for name in results})
+        else:
+            self._detect_lane(ctx, schedule, timings)
+            results = {}
+            if cascades:
+                results, cascade_timings = self.sign_cascades.detect_tracked(ctx, cascades)
+                timings.update(cascade_timings)
+        self._release_context(ctx)
+        for name in cascades:
+            if name not in results:
+                self.metrics.count(f'{name}_late')
+
+        # Update historical perception data. A detector that was skipped or missed the
+        # deadline keeps its last result for display but does not feed the trackers.
+        # With tracking enabled, the trackers only vote over detections of the same object.
+        if 'stop_sign' in results:
+            is_stop_sign, is_stop_sign_close, stop_bbox, stop_track = results['stop_sign']
+            self.last_stop_sign_result = (is_stop_sign, is_stop_sign_close, stop_bbox)
+            self.stop_sign_tracker.update(is_stop_sign_close, track=stop_track, timestamp=timestamp)
+            self.scheduler.observe('stop_sign', is_stop_sign,
+                                   reason='close_sign' if is_stop_sign_close else 'far_sign')
+        if 'light' in results:
+            light_color, light_box, light_track = results['light']
+            self.last_light_result = (light_color, light_box)
+            self.light_color_tracker.update(light_color, track=light_track, timestamp=timestamp)
+            self.scheduler.observe('light', light_track is not None or light_box is not None,
+                                   reason='light_seen')
+        for name, seconds in timings.items():
+            self.scheduler.record_latency(name, seconds)
+            self.metrics.record(name, seconds)
+
+        steering_angle, lane_lines = self.last_lane_result
+        # Bird's-eye warp cost, part of the lane time
+        lane_warp_time = 0.0
+        if isinstance(self.lane_detector, BirdsEyeLaneDetector) and 'lane' in timings:
+            lane_warp_time = self.lane_detector.view.last_warp_time
+        is_stop_sign, is_stop_sign_close, stop_bbox = self.last_stop_sign_result
+        light_color, light_box = self.last_light_result
+
+        # Determine stable states
+        is_stop_sign_stable = self.stop_sign_tracker.recently_true(min_count=3)
+        stable_light = self.light_color_tracker.most_common(min_count=2)
+
+        if self.debug:
+            self.logger.info(
+                f"[Perception] Lane angle: {steering_angle:.2f}, "
+                f"is_stop_sign: {is_stop_sign}, is_stop_sign_stable: {is_stop_sign_stable}, "
+                f"stop_sign_close: {is_stop_sign_close}, stop_bbox: {stop_bbox}, "
+                f"light: {light_color}, stable light: {stable_light}, light_box: {light_box}"
+            )
+
+        return {
+            'steering_angle': steering_angle,
+            'lane_lines': lane_lines,
+            'is_stop_sign': is_stop_sign,
+            'is_stop_sign_close': is_stop_sign_close,
+            'stop_bbox': stop_bbox,
+            'is_stop_sign_stable': is_stop_sign_stable,
+            'light_color': light_color,
+            'light_box': light_box,
+            'stable_light': stable_light,
+            'lane_time': timings.get('lane', 0.0),
+            'lane_warp_time': lane_warp_time,
+            'stop_sign_time': timings.get('stop_sign', 0.0),
+            'light_time': timings.get('light', 0.0),
+        }
+
+    def _record(self, frame, timestamp, schedule, perception=None, decision=None):
+        """Append the frame and what the loop made of it to the run log."""
+        if not self.record_path:
+            return
+        if self.recorder is None:
+            # Dual-stream runs record the lores frame the detectors saw
+            stream = CAPTURE_CONFIG['LORES_FORMAT'].lower() if isinstance(frame, StreamFrames) else 'bgr'
+            self.recorder = RunRecorder(self.record_path, stream, info={
+                'source': self.video_path or ('replay' if self.replay else 'camera'),
+                'fps': self.fps,
+                'output_size': [self.width, self.height],
+                'lane_engine': LANE_CONFIG['ENGINE'],
+                'lane_mode': LANE_CONFIG['MODE'],
+            }, store_frames=self.record_frames)
+            self.logger.info(f"Recording run log to {self.record_path}")
+
+        record = {'schedule': {name: d.run for name, d in schedule.items()}}
+        if perception is not None:
+            record['perception'] = {k: v for k, v in perception.items() if not k.endswith('_time')}
+            record['timings'] = {k: v for k, v in perception.items() if k.endswith('_time')}
+            record['trackers'] = {'stop_sign': self.stop_sign_tracker.state(),
+                                  'light': self.light_color_tracker.state()}
+        if decision is not None:
+            record['decision'] = decision
+        self.recorder.record(self.frame_counter, timestamp,
+                             frame.lores if isinstance(frame, StreamFrames) else frame, record)
+
+    def _frame_context(self, frame, pool=None):
+        if not isinstance(frame, StreamFrames):
+            return FrameContext(frame, stats=self.frame_context_stats, pool=pool)
+        if CAPTURE_CONFIG['LORES_FORMAT'] == 'Y':
+            return FrameContext.from_gray(frame.lores, stats=self.frame_context_stats, pool=pool)
+        return FrameContext.from_yuv420(frame.lores, stats=self.frame_context_stats, pool=pool)
+
+    def _release_context(self, ctx):
+        """Hand the context's buffers back, unless a late detector thread may still read them."""
+        if self._late_detector_running():
+            return
+        ctx.release()
+
+    def _serial_buffer(self, name, shape):
+        """Reused array for the serial loop. Pipelined frames wait in queues, so they get their own.
+        While a late detector thread may still read the previous frame from the named buffer
+        (or compute a derivation from it), the next frame gets a fresh array instead."""
+        if self.pipelined or self._late_detector_running():
+            return None
+        return self.buffers.get(name, shape)
+
+    def _late_detector_running(self):
+        """Whether a thread-executor detector that missed its deadline is still running."""
+        executor = self.perception_executor
+        return bool(executor and executor.mode == 'thread' and executor.in_flight())
+
+    def _plan(self):
+        """Scheduler decisions for the current frame; skipped detectors are counted."""
+        schedule = self.scheduler.plan(self.frame_counter)
+        for name, decision in schedule.items():
+            if not decision.run:
+                self.metrics.count(f'{name}_skipped')
+        return schedule
+
+    def _detect_lane(self, ctx, schedule, timings):
+        if schedule['lane'].run:
+            t0 = time.perf_counter()
+            self.last_lane_result = self.lane_detector.detect(ctx)
+            timings['lane'] = time.perf_counter() - t0
+
+    def _decide(self, perception):
+        # Decision-making process
+        with self.metrics.timer('decision'):
+            decision = self.decision_maker.make_decision(
+                perception['steering_angle'], perception['is_stop_sign_stable'], perception['stable_light']
+            )
+        self.telemetry.publish('decision', "Decision: {decision}", decision=decision)
+        return decision
+
+    def _actuate(self, decision):
+        if decision['action'] == 'stop':
+            self.telemetry.publish('stopping', "Stopping vehicle")
+        else:
+            self.telemetry.publish('driving', "Driving vehicle, steering: {steering:.2f} → {direction} ({strength}%)",
+                                   DEBUG, **decision)
+        with self.metrics.timer('actuation'):
+            if self.control_loop:
+                # The control thread ramps the steering toward it; stops are applied right here
+                self.control_loop.submit(decision)
+            else:
+                # One pigpio write per changed pin and cycle
+                with self.vehicle.batch():
+                    self._send_commands(decision)
+
+    def _send_commands(self, decision):
+        # Execute control actions based on the decision
+        if decision['action'] == 'stop':
+            self.vehicle.drive_neutral()
+        else:
+            # self.vehicle.drive_neutral()
+            self.vehicle.drive_forward()
+            self.vehicle.adjust_steering(decision['direction'], decision['strength'])
+
+    def _render(self, frame, perception, decision=None):
+        """Draw perception and, if given, decision info on the frame (debug mode only)."""
+        if not self.debug:
+            return frame
+
+        display_frame, scale = self._display_frame(frame)
+        # Draw perception info
+        cv2.putText(display_frame, f"Steering: {perception['steering_angle']:.2f}", (10, 60),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+        if perception['is_stop_sign']:
+            s_x, s_y, s_w, s_h = scale_coords(perception['stop_bbox'], scale)
+            cv2.rectangle(display_frame, (s_x, s_y), (s_x+s_w, s_y+s_h), (0, 100, 255), 2)
+        cv2.putText(display_frame, f"Stop Sign: {perception['stop_bbox']}, Close: {perception['is_stop_sign_close']}, "
+                    f"Close&Stable: {perception['is_stop_sign_stable']}", (10, 120),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+        if perception['light_box']:
+            l_x, l_y, l_w, l_h = scale_coords(perception['light_box'], scale)
+            cv2.rectangle(display_frame, (l_x, l_y), (l_x+l_w, l_y+l_h), (255, 255, 0), 2)
+        cv2.putText(display_frame, f"Traffic Light: {perception['light_color']}, Stable Light: {perception['stable_light']}", (10, 140),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+        if decision is not None:
+            cv2.putText(display_frame, f"Action: {decision['action']}", (10, 180),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            cv2.putText(display_frame, f"Direction: {decision['direction']}", (10, 220),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            cv2.putText(display_frame, f"Strength: {decision['strength']}%", (10, 260),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+        # ✅ Draw detected lane lines
+        for line in perception['lane_lines']:
+            x1, y1, x2, y2 = scale_coords(line, scale)
+            cv2.line(display_frame, (x1, y1), (x2, y2), (0, 255, 255), 3)
+
+        # # Save key frames
+        # if perception['is_stop_sign_stable'] or perception['stable_light']:
+        #     save_frame(display_frame)
+        return display_frame
+
+    def _display_frame(self, frame):
+        """BGR image to draw on and record, and the (x, y) scale from perception coordinates to it."""
+        if not isinstance(frame, StreamFrames):
+            # Drawn in place: the video writer renders on its own copy of the frame
+            return frame, (1, 1)
+        lores_height, lores_width = self._frame_context(frame).shape[:2]
+        scale = (self.width / lores_width, self.height / lores_height)
+        if frame.main is not None:
+            return cv2.cvtColor(frame.main, cv2.COLOR_BGRA2BGR), scale
+        # The matching main frame was overwritten, record the upscaled perception frame
+        return cv2.resize(self._frame_context(frame).frame, (self.width, self.height)), scale
+
+    def _write_frame(self, frame, perception=None, decision=None):
+        """Queue a frame for recording. Overlays are drawn later, on the writer thread."""
+        if self.video_writer:
+            with self.metrics.timer('write'):
+                queued = self.video_writer.write(frame, functools.partial(self._recorded_frame,
+                                                                          perception=perception, decision=decision))
+            if not queued:
+                self.metrics.count('video_frames_dropped')
+
+    def _recorded_frame(self, frame, perception=None, decision=None):
+        """BGR image to encode for a queued frame."""
+        with self.metrics.timer('overlay'):
+            if perception is not None:
+                frame = self._render(frame, perception, decision)
+            if isinstance(frame, StreamFrames):
+                frame = self._display_frame(frame)[0]
+        return frame
+
+    def _shutdown(self):
+        self.logger.info("Shutting down system...")
+        if self.control_loop:
+            self.control_loop.close()
+            self.logger.info(f"[ControlLoop] {self.control_loop.summary()}")
+        try:
+            self.vehicle.stop()
+            self.vehicle.steering_center()
+        except Exception as e:
+            self.logger.warning(f"Error during vehicle shutdown: {e}")
+
+        try:
+            if self.video_writer:
+                self.video_writer.release()
+                self.logger.info("VideoWriter released successfully.")
+                self.logger.info(f"[VideoWriter] {self.video_writer.summary()}")
+        except Exception as e:
+            self.logger.error(f"Error releasing VideoWriter: {e}")
+
+        if self.perception_executor:
+            self.perception_executor.close()
+
+        if self.recorder:
+            self.recorder.close()
+            self.logger.info(f"[RunLog] {self.recorder.summary()}")
+
+        self.logger.info(f"[FrameContext] {self.frame_context_stats.summary()}")
+        self.logger.info(f"[BufferPool] {self.buffers.summary()}")
+        self.logger.info(f"[Scheduler] {self.scheduler.summary()}")
+        self.logger.info(f"[Telemetry] {self.telemetry.summary()}")
+        self.logger.info(f"[Vehicle] {self.vehicle.summary()}")
+        if self.metrics.enabled:
+            self.logger.info(f"[Metrics] p50/p95/p99/max ms: "
+                             f"{MetricsRegistry.format(self.metrics.snapshot(window=False), METRIC_STAGES)}")
+        if isinstance(self.lane_detector, BirdsEyeLaneDetector):
+            self.logger.info(f"[BirdsEye] {self.lane_detector.view.summary()}")
+
+        if self.debug:
+            cv2.destroyAllWindows()
+
+        self.logger.info("System shutdown complete.")
+
+def run(debug=False, video_path=None, pipelined=PIPELINE_CONFIG['ENABLED']):
+    with AutoDriver(debug=debug, video_path=video_path, pipelined=pipelined) as driver:
         driver.start()
 
 if __name__ == '__main__':
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 16:02:36
+@Path: /perception/birdseye.py
+"""
+
+
+import json
+import math
+import os
+import time
+
+import cv2
+import numpy as np
+
+from perception.frame_context import FrameContext
+from perception.lane_detection import LaneDetector
+from perception.sliding_window_lane import SlidingWindowLaneDetector
+from utils.config import BIRDSEYE_CONFIG, SLIDING_WINDOW_CONFIG
+
+_INTERPOLATIONS = {'nearest': cv2.INTER_NEAREST, 'linear': cv2.INTER_LINEAR}
+
+
+class BirdsEyeView:
+    """Top-down view of the ground in front of the car.
+
+    The calibration file maps four image points to four ground points (metres, X to the right
+    of the camera axis, Y forward). From that homography the remap tables are built once per
+    frame size, converted to OpenCV's fixed-point format, and only read the rows of the frame
+    that actually see the ground ROI. Output pixels are meters_per_pixel square, row 0 is the
+    far edge of the ROI and the camera axis runs down the middle column.
+    """
+    def __init__(self, calibration_path=BIRDSEYE_CONFIG['CALIBRATION'],
+                 interpolation=BIRDSEYE_CONFIG['INTERPOLATION']):
+        """
+        Args:
+            calibration_path: JSON file with image_size, image_points, ground_points,
+                ground_roi (half_width, near, far in metres) and meters_per_pixel
+            interpolation: 'nearest' or 'linear'
+        """
+        if not os.path.isabs(calibration_path):
+            calibration_path = os.path.join(os.path.dirname(__file__), '..', calibration_path)
+        with open(calibration_path) as f:
+            calibration = json.load(f)
+
+        self.image_size = tuple(calibration['image_size'])
+        self.image_points = np.float32(calibration['image_points'])
+        self.ground_points = np.float32(calibration['ground_points'])
+        roi = calibration['ground_roi']
+        self.half_width = roi['half_width']
+        self.near = roi['near']
+        self.far = roi['far']
+        self.meters_per_pixel = calibration['meters_per_pixel']
+        self.output_size = (int(round(2 * self.half_width / self.meters_per_pixel)),
+                            int(round((self.far - self.near) / self.meters_per_pixel)))
+        self.interpolation = _INTERPOLATIONS[interpolation]
+
+        self._maps = {}
+        self.frames = 0
+        self.last_warp_time = 0.0
+        self.total_warp_time = 0.0
+        self.max_warp_time = 0.0
+
+    def roi_top(self, frame_size):
+        """First image row the warp reads for frames of frame_size (width, height)."""
+        return self._get_maps(frame_size)[2]
+
+    def warp(self, roi, frame_size, dst=None):
+        """Top-down image of the ground ROI.
+        Args:
+            roi: Rows roi_top(frame_size): of the frame (or of a mask computed on the frame)
+            frame_size: (width, height) of the full frame
+            dst: Optional output array of shape output_size[::-1] + roi.shape[2:]
+        """
+        t0 = time.perf_counter()
+        map1, map2, _, _ = self._get_maps(frame_size)
+        top_down = cv2.remap(roi, map1, map2, self.interpolation, dst=dst, borderMode=cv2.BORDER_CONSTANT)
+        elapsed = time.perf_counter() - t0
+
+        self.frames += 1
+        self.last_warp_time = elapsed
+        self.total_warp_time += elapsed
+        self.max_warp_time = max(self.max_warp_time, elapsed)
+        return top_down
+
+    def pixel_to_ground(self, cols, rows):
+        """Top-down pixel coordinates to ground metres (X, Y)."""
+        x = -self.half_width + (np.asarray(cols) + 0.5) * self.meters_per_pixel
+        y = self.far - (np.asarray(rows) + 0.5) * self.meters_per_pixel
+        return x, y
+
+    def ground_to_pixel(self, x, y):
+        """Ground metres to top-down pixel coordinates (col, row)."""
+        cols = (np.asarray(x) + self.half_width) / self.meters_per_pixel - 0.5
+        rows = (self.far - np.asarray(y)) / self.meters_per_pixel - 0.5
+        return cols, rows
+
+    def ground_to_image(self, x, y, frame_size):
+        """Ground metres to image pixel coordinates, shape (N, 2)."""
+        ground_to_image = self._get_maps(frame_size)[3]
+        points = np.stack([x, y], axis=-1).reshape(-1, 1, 2).astype(np.float32)
+        return cv2.perspectiveTransform(points, ground_to_image).reshape(-1, 2)
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'last_ms': self.last_warp_time * 1000,
+            'mean_ms': self.total_warp_time / self.frames * 1000 if self.frames else 0.0,
+            'max_ms': self.max_warp_time * 1000,
+        }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"warp {stats['mean_ms']:.3f} ms mean / {stats['max_ms']:.3f} ms max "
+                f"over {stats['frames']} frames, output {self.output_size[0]}x{self.output_size[1]}")
+
+    def _get_maps(self, frame_size):
+        maps = self._maps.get(frame_size)
+        if maps is None:
+            maps = self._maps[frame_size] = self._build_maps(frame_size)
+        return maps
+
+    def _build_maps(self, frame_size):
+        """Fixed-point remap tables from top-down pixels to rows roi_top: of the frame."""
+        width, height = frame_size
+        # Calibration points scale with the frame if it is not captured at the calibrated size
+        scale = np.float32([width / self.image_size[0], height / self.image_size[1]])
+        ground_to_image = cv2.getPerspectiveTransform(self.ground_points, self.image_points * scale)
+
+        output_width, output_height = self.output_size
+        x, y = self.pixel_to_ground(*np.meshgrid(np.arange(output_width), np.arange(output_height)))
+        image = cv2.perspectiveTransform(
+            np.stack([x, y], axis=-1).reshape(-1, 1, 2).astype(np.float32), ground_to_image)
+        map_x = image[:, 0, 0].reshape(output_height, output_width)
+        map_y = image[:, 0, 1].reshape(output_height, output_width)
+
+        inside = (map_x >= 0) & (map_x <= width - 1) & (map_y >= 0) & (map_y <= height - 1)
+        roi_top = int(map_y[inside].min()) if inside.any() else 0
+        map_y = map_y - roi_top
+        # Pixels outside the frame read the constant border
+        map_x[~inside] = -1
+        map_y[~inside] = -1
+        map1, map2 = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+        return map1, map2, roi_top, ground_to_image
+
+
+class BirdsEyeLaneDetector(SlidingWindowLaneDetector):
+    """Sliding-window lane tracking on the top-down view, with pure-pursuit steering.
+
+    Lines are fitted on the warped line mask, where lane lines are close to vertical and keep
+    their real spacing. The steering angle comes from the curvature of the arc through a
+    target point lookahead metres ahead on the lane center line.
+    """
+    def __init__(self, view=None, config=BIRDSEYE_CONFIG, sliding_config=SLIDING_WINDOW_CONFIG):
+        """
+        Args:
+            view: BirdsEyeView; built from config['CALIBRATION'] if None
+            config: LOOKAHEAD/WHEELBASE/LANE_WIDTH/MAX_LINE_WIDTH in metres
+            sliding_config: Sliding-window settings, fractions apply to the top-down image
+        """
+        super().__init__(sliding_config, roi_start=0.0)
+        self.view = view if view is not None else BirdsEyeView(config['CALIBRATION'], config['INTERPOLATION'])
+        self.lookahead = config['LOOKAHEAD']
+        self.wheelbase = config['WHEELBASE']
+        self.lane_width = config['LANE_WIDTH']
+        kernel_width = max(3, int(config['MAX_LINE_WIDTH'] / self.view.meters_per_pixel)) | 1
+        self.line_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_width, 1))
+        self.curvature = 0.0
+
+    def detect(self, frame):
+        """
+        Args:
+            frame: Image in BGR format, or a FrameContext
+        Returns:
+            float: Smoothed steering angle in degrees
+            list: Lane line pieces (x1, y1, x2, y2) in image coordinates for display
+        """
+        ctx = FrameContext.wrap(frame)
+        height, width = ctx.shape[:2]
+        frame_size = (width, height)
+        roi_top = self.view.roi_top(frame_size)
+
+        # Threshold before warping: one channel to remap instead of three
+        output_width, output_height = self.view.output_size
+        top_down = self.view.warp(LaneDetector._white_mask(ctx.frame[roi_top:, :, :3], self.buffers), frame_size,
+                                  dst=self.buffers.get('top_down', (output_height, output_width)))
+        mask = cv2.morphologyEx(top_down, cv2.MORPH_TOPHAT, self.line_kernel,
+                                dst=self.buffers.get('line_mask', (output_height, output_width)))
+        self._update_fits(mask, output_width, output_height, 0)
+
+        target_x = self._lane_center(self.lookahead)
+        if target_x is None:
+            self.curvature = 0.0
+            steering = 0.0
+        else:
+            # Pure pursuit: arc from the camera through the target point
+            self.curvature = 2 * target_x / (target_x ** 2 + self.lookahead ** 2)
+            steering = math.degrees(math.atan(self.wheelbase * self.curvature))
+            steering = max(-45.0, min(45.0, steering))
+
+        # Smooth processing
+        steering = self.smoothing * self.prev_steering + (1 - self.smoothing) * steering
+        self.prev_steering = steering
+
+        return steering, self._image_lines(frame_size)
+
+    def lane_lines_ground(self, y):
+        """Lateral position (m) of the left and right lines at distance y, None if not found."""
+        _, row = self.view.ground_to_pixel(0.0, y)
+        positions = []
+        for side in ('left', 'right'):
+            if self.fits[side] is None:
+                positions.append(None)
+                continue
+            a, b, c = self.fits[side]
+            x, _ = self.view.pixel_to_ground(a * row * row + b * row + c, row)
+            positions.append(float(x))
+        return tuple(positions)
+
+    def _lane_center(self, y):
+        left_x, right_x = self.lane_lines_ground(y)
+        if left_x is not None and right_x is not None:
+            return (left_x + right_x) / 2
+        if left_x is not None:
+            return left_x + self.lane_width / 2
+        if right_x is not None:
+            return right_x - self.lane_width / 2
+        return None
+
+    def _image_lines(self, frame_size):
+        display_lines = []
+        rows = np.linspace(self.view.output_size[1] - 1, 0, self.n_windows + 1)
+        for side in ('left', 'right'):
+            if self.fits[side] is None:
+                continue
+            a, b, c = self.fits[side]
+            x, y = self.view.pixel_to_ground(a * rows * rows + b * rows + c, rows)
+            points = np.rint(self.view.ground_to_image(x, y, frame_size)).astype(int)
+            for (x1, y1), (x2, y2) in zip(points[:-1], points[1:]):
+                display_lines.append((int(x1), int(y1), int(x2), int(y2)))
+        return display_lines
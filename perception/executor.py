@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 11:20:44
+@Path: /perception/executor.py
+"""
+
+
+import multiprocessing
+import signal
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from multiprocessing import connection, resource_tracker, shared_memory
+
+import numpy as np
+
+from perception.frame_context import FrameContext
+from utils.config import PERCEPTION_EXECUTOR_CONFIG
+
+# factory must be picklable (a class or functools.partial) so process workers can build their own detector
+PerceptionTask = namedtuple('PerceptionTask', ['name', 'factory', 'method'])
+
+
+class PerceptionExecutor:
+    """Fans a frame out to independent detectors in parallel and joins the results with a deadline.
+
+    mode='thread' runs every detector on a thread pool (OpenCV releases the GIL inside
+    detectMultiScale). mode='process' runs each detector in its own worker process; frames are
+    handed over through multiprocessing.shared_memory so only a small header is pickled.
+    A task whose previous run is still in flight is skipped rather than queued.
+    """
+    def __init__(self, tasks, mode=PERCEPTION_EXECUTOR_CONFIG['MODE'],
+                 deadline=PERCEPTION_EXECUTOR_CONFIG['DEADLINE']):
+        """
+        Args:
+            tasks: List of PerceptionTask
+            mode: 'thread' or 'process'
+            deadline: Default seconds collect() waits after submit()
+        """
+        if mode not in ('thread', 'process'):
+            raise ValueError(f"Unknown executor mode: {mode}")
+        self.tasks = {task.name: task for task in tasks}
+        self.mode = mode
+        self.deadline = deadline
+        self.stats = {name: {'submitted': 0, 'completed': 0, 'late': 0, 'busy': 0, 'errors': 0}
+                      for name in self.tasks}
+        self.last_timings = {}
+        self._seq = 0
+        self._submit_time = None
+        self._pending = set()
+        self._started = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        if self._started:
+            return
+        if self.mode == 'thread':
+            self._pool = ThreadPoolExecutor(max_workers=len(self.tasks),
+                                            thread_name_prefix='Perception')
+            self._detectors = {name: getattr(task.factory(), task.method)
+                               for name, task in self.tasks.items()}
+            self._futures = {}
+        else:
+            # Workers must share the parent's resource tracker, otherwise each one starts its
+            # own and unlinks the shared frame buffers when it exits
+            resource_tracker.ensure_running()
+            self._workers = {name: _ProcessWorker(task) for name, task in self.tasks.items()}
+        self._started = True
+
+    def close(self):
+        if not self._started:
+            return
+        if self.mode == 'thread':
+            self._pool.shutdown(wait=True)
+        else:
+            for worker in self._workers.values():
+                worker.close()
+        self._started = False
+
+    def submit(self, frame, names=None):
+        """Start the selected detectors (default: all) on a frame or FrameContext."""
+        self.start()
+        if self.mode == 'process' and isinstance(frame, FrameContext):
+            # Workers build their own context from the raw frame
+            frame = frame.frame
+        self._seq += 1
+        self._submit_time = time.perf_counter()
+        self._pending = set()
+        for name in names if names is not None else self.tasks:
+            if self._is_busy(name):
+                self.stats[name]['busy'] += 1
+                continue
+            if self.mode == 'thread':
+                self._futures[name] = self._pool.submit(_timed_call, self._detectors[name], frame)
+            else:
+                self._workers[name].send(self._seq, frame)
+            self.stats[name]['submitted'] += 1
+            self._pending.add(name)
+
+    def collect(self, deadline=None):
+        """Wait until every submitted detector finishes or the deadline passes.
+        Returns:
+            dict: task name -> result, for the detectors that finished in time
+        """
+        deadline = self.deadline if deadline is None else deadline
+        end_time = self._submit_time + deadline
+        results = {}
+        while self._pending:
+            remaining = end_time - time.perf_counter()
+            if remaining <= 0:
+                break
+            for name, ok, value, elapsed in self._wait_any(remaining):
+                self._pending.discard(name)
+                if ok:
+                    results[name] = value
+                    self.last_timings[name] = elapsed
+                    self.stats[name]['completed'] += 1
+                else:
+                    self.stats[name]['errors'] += 1
+        for name in self._pending:
+            self.stats[name]['late'] += 1
+        self._pending = set()
+        return results
+
+    def run(self, frame, names=None, deadline=None):
+        self.submit(frame, names)
+        return self.collect(deadline)
+
+    def in_flight(self):
+        """Names of tasks still running on an earlier submit(), e.g. after a missed deadline."""
+        if not self._started:
+            return []
+        return [name for name in self.tasks if self._is_busy(name)]
+
+    def _is_busy(self, name):
+        if self.mode == 'thread':
+            future = self._futures.get(name)
+            return future is not None and not future.done()
+        return self._workers[name].busy()
+
+    def _wait_any(self, timeout):
+        """Yields (name, ok, value, elapsed) for pending tasks that finish within timeout."""
+        if self.mode == 'thread':
+            futures = {self._futures[name]: name for name in self._pending}
+            done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    value, elapsed = future.result()
+                    yield futures[future], True, value, elapsed
+                except Exception as e:
+                    yield futures[future], False, e, None
+            return
+
+        conns = {self._workers[name].conn: name for name in self._pending}
+        for conn in connection.wait(list(conns), timeout=timeout):
+            name = conns[conn]
+            seq, ok, value, elapsed = self._workers[name].receive()
+            if seq == self._seq:
+                yield name, ok, value, elapsed
+
+
+class _ProcessWorker:
+    """Parent-side handle for one detector process and its shared-memory frame buffer."""
+    def __init__(self, task):
+        self.task = task
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_worker_main, args=(task, child_conn), name=f'Perception-{task.name}', daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.shm = None
+        self.frame = None
+        self.in_flight = False
+
+    def send(self, seq, frame):
+        if self.frame is None or self.frame.shape != frame.shape or self.frame.dtype != frame.dtype:
+            self._release_shm()
+            self.shm = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+            self.frame = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self.shm.buf)
+        np.copyto(self.frame, frame)
+        self.conn.send((seq, self.shm.name, frame.shape, frame.dtype.str))
+        self.in_flight = True
+
+    def receive(self):
+        self.in_flight = False
+        return self.conn.recv()
+
+    def busy(self):
+        # Drain a late result from an earlier frame so the worker can take a new one
+        if self.in_flight and self.conn.poll():
+            self.receive()
+        return self.in_flight
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        self._release_shm()
+
+    def _release_shm(self):
+        if self.shm is not None:
+            self.frame = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+def _timed_call(method, frame):
+    start = time.perf_counter()
+    result = method(frame)
+    return result, time.perf_counter() - start
+
+
+def _worker_main(task, conn):
+    # Ctrl+C is handled by the parent, which shuts the workers down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    method = getattr(task.factory(), task.method)
+    shm = None
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        seq, shm_name, shape, dtype = message
+        if shm is None or shm.name != shm_name:
+            if shm is not None:
+                shm.close()
+            shm = shared_memory.SharedMemory(name=shm_name)
+        frame = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        try:
+            result, elapsed = _timed_call(method, frame)
+            conn.send((seq, True, result, elapsed))
+        except Exception as e:
+            conn.send((seq, False, repr(e), None))
+        del frame
+    if shm is not None:
+        shm.close()
+    conn.close()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 12:02:15
+@Path: /perception/frame_context.py
+"""
+
+
+import threading
+
+import cv2
+
+
+class FrameContextStats:
+    """Hit/miss counters per derivation, shared by every FrameContext of a run."""
+    def __init__(self):
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, hit):
+        with self._lock:
+            entry = self.counts.setdefault(name, {'hits': 0, 'misses': 0})
+            entry['hits' if hit else 'misses'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(entry) for name, entry in self.counts.items()}
+
+    def summary(self):
+        return ", ".join(f"{name}: {entry['hits']} hits / {entry['misses']} misses"
+                         for name, entry in sorted(self.snapshot().items()))
+
+
+class FrameContext:
+    """Lazily computed conversions of one BGR frame, shared by all detectors.
+
+    Every derivation (HSV, gray, equalized gray, downscaled copies) is computed at most once,
+    on first use. Detectors accept either a plain BGR image or a FrameContext.
+    A context can also start from a camera's YUV420 or grayscale frame, in which case the gray
+    image is used as is and the BGR frame is only converted if a detector asks for it.
+    With a BufferPool, derivations are written into leased arrays; release() returns them to
+    the pool once no detector reads the context any more.
+    """
+    def __init__(self, frame, stats=None, pool=None):
+        self._frame = frame
+        self.stats = stats if stats is not None else FrameContextStats()
+        self.pool = pool
+        self._leased = []
+        self._cache = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._shape = None
+        self._to_bgr = None
+
+    @classmethod
+    def wrap(cls, frame, pool=None):
+        return frame if isinstance(frame, FrameContext) else cls(frame, pool=pool)
+
+    @classmethod
+    def from_yuv420(cls, yuv, stats=None, pool=None):
+        """Context of a planar YUV420 (I420) frame of shape (height * 3 / 2, width)."""
+        height = yuv.shape[0] * 2 // 3
+        ctx = cls._from_source(yuv[:height], stats, pool)
+        ctx._to_bgr = lambda: cv2.cvtColor(yuv, cv2.COLOR_YUV2BGR_I420, dst=ctx._lease(ctx._shape))
+        return ctx
+
+    @classmethod
+    def from_gray(cls, gray, stats=None, pool=None):
+        """Context of a grayscale frame (e.g. the Y plane alone). BGR is gray replicated."""
+        ctx = cls._from_source(gray, stats, pool)
+        ctx._to_bgr = lambda: cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR, dst=ctx._lease(ctx._shape))
+        return ctx
+
+    @classmethod
+    def _from_source(cls, gray, stats, pool):
+        ctx = cls(None, stats, pool)
+        ctx._cache['gray'] = gray
+        ctx._shape = gray.shape[:2] + (3,)
+        return ctx
+
+    def release(self):
+        """Return leased derivations to the pool. The context must not be used afterwards."""
+        with self._lock:
+            for array in self._leased:
+                self.pool.release(array)
+            self._leased = []
+            self._cache = {}
+
+    @property
+    def frame(self):
+        """BGR frame."""
+        if self._frame is not None:
+            return self._frame
+        return self._get('frame', self._to_bgr)
+
+    @property
+    def shape(self):
+        return self._frame.shape if self._frame is not None else self._shape
+
+    @property
+    def hsv(self):
+        return self._get('hsv', lambda: cv2.cvtColor(self.frame, cv2.COLOR_BGR2HSV,
+                                                     dst=self._lease(self.shape[:2] + (3,))))
+
+    @property
+    def gray(self):
+        return self._get('gray', lambda: cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY,
+                                                      dst=self._lease(self.shape[:2])))
+
+    @property
+    def equalized_gray(self):
+        return self._get('equalized_gray', lambda: cv2.equalizeHist(self.gray, dst=self._lease(self.shape[:2])))
+
+    def downscaled(self, factor, source='frame'):
+        """Image resized by 1/factor. source: 'frame', 'gray' or 'equalized_gray'."""
+        def compute():
+            image = getattr(self, source)
+            height, width = image.shape[:2]
+            size = (max(1, int(round(width / factor))), max(1, int(round(height / factor))))
+            return cv2.resize(image, size, dst=self._lease(size[::-1] + image.shape[2:]),
+                              interpolation=cv2.INTER_AREA)
+        return self._get(f'downscaled_{source}_{factor:g}', compute)
+
+    def hsv_roi(self, bbox):
+        """HSV of a region. Sliced from the full-frame HSV if it was already computed."""
+        x, y, w, h = bbox
+        if 'hsv' in self._cache:
+            self.stats.record('hsv', True)
+            return self._cache['hsv'][y:y+h, x:x+w]
+        self.stats.record('hsv_roi', False)
+        return cv2.cvtColor(self.frame[y:y+h, x:x+w], cv2.COLOR_BGR2HSV)
+
+    def _lease(self, shape):
+        """uint8 array from the pool for a derivation, or None to let OpenCV allocate."""
+        if self.pool is None:
+            return None
+        array = self.pool.acquire(shape)
+        if array is not None:
+            with self._lock:
+                self._leased.append(array)
+        return array
+
+    def _get(self, name, compute):
+        value = self._cache.get(name)
+        if value is not None:
+            self.stats.record(name, True)
+            return value
+        # Detectors may run on several threads; compute each derivation once
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            value = self._cache.get(name)
+            if value is None:
+                value = compute()
+                self._cache[name] = value
+                self.stats.record(name, False)
+            else:
+                self.stats.record(name, True)
+        return value
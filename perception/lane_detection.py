@@ -9,53 +9,57 @@
 import cv2
 import numpy as np
 
+from perception.frame_context import FrameContext
+from utils.buffer_pool import BufferPool
+from utils.config import BUFFER_POOL_CONFIG, LANE_CONFIG
+
+_INTERPOLATIONS = {'linear': cv2.INTER_LINEAR, 'area': cv2.INTER_AREA}
+
 
 class LaneDetector:
-    def __init__(self):
+    def __init__(self, mode=LANE_CONFIG['MODE'], fast_resolution=LANE_CONFIG['FAST_RESOLUTION']):
+        """
+        Args:
+            mode: 'full' thresholds the whole frame in HSV, 'fast' crops the lane ROI first,
+                downsamples it to fast_resolution and thresholds white directly on BGR
+            fast_resolution: (width, height) of the downsampled ROI in fast mode
+        """
+        if mode not in ('full', 'fast'):
+            raise ValueError(f"Unknown lane detection mode: {mode}")
+        self.mode = mode
+        self.fast_resolution = fast_resolution
+        self.fast_interpolation = _INTERPOLATIONS[LANE_CONFIG['FAST_INTERPOLATION']]
+        self.roi_start = LANE_CONFIG['ROI_START']
+        self.length_weighted = LANE_CONFIG['FIT_WEIGHTING'] == 'length'
+        self.outlier_px = LANE_CONFIG['OUTLIER_PX']
+        self.lower_white = np.array([0, 0, 200])
+        self.upper_white = np.array([180, 30, 255])
+        self.buffers = BufferPool(BUFFER_POOL_CONFIG['ENABLED'])
+        self.smoothing = LANE_CONFIG['SMOOTHING']
         self.prev_steering = 0
 
     def detect(self, frame):
-        height, width = frame.shape[:2]
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-
-        lower_white = np.array([0, 0, 200])
-        upper_white = np.array([180, 30, 255])
-        white_mask = cv2.inRange(hsv, lower_white, upper_white)
-
-        # Only take the bottom region
-        pct = 0.6
-        roi = white_mask[int(height * pct):, :]
-        edges = cv2.Canny(roi, 50, 150)
-
-        lines = cv2.HoughLinesP(edges, 1, np.pi/180, 50,
-                                minLineLength=60, maxLineGap=50)
-
-        left_lines = []
-        right_lines = []
-        line_segments = []
-        roi_offset = int(height * pct)
-
-        if lines is not None:
-            for line in lines:
-                x1, y1, x2, y2 = line[0]
-                x1, y1 = x1, y1 + roi_offset
-                x2, y2 = x2, y2 + roi_offset
-                line_segments.append((x1, y1, x2, y2))
-
-                if x2 - x1 == 0:
-                    continue  # Ignore vertical lines
-
-                slope = (y2 - y1) / (x2 - x1)
-                if abs(slope) < 0.5:
-                    continue  # Ignore flat lines
-
-                if slope < 0:
-                    left_lines.append((x1, y1, x2, y2))
-                else:
-                    right_lines.append((x1, y1, x2, y2))
-
-        left_avg = self._average_line(left_lines, height)
-        right_avg = self._average_line(right_lines, height)
+        """
+        Args:
+            frame: Image in BGR format, or a FrameContext
+        Returns:
+            float: Smoothed steering angle in degrees
+            list: Averaged lane lines (x1, y1, x2, y2) for display
+        """
+        ctx = FrameContext.wrap(frame, pool=self.buffers)
+        height, width = ctx.shape[:2]
+        roi_offset = int(height * self.roi_start)
+
+        if self.mode == 'fast':
+            lines = self._find_segments_fast(ctx.frame, roi_offset)
+        else:
+            lines = self._find_segments(ctx.hsv, roi_offset)
+        if ctx is not frame:
+            ctx.release()
+
+        left_lines, right_lines = self._split_lanes(lines)
+        left_avg = self._average_line(left_lines, height, roi_offset)
+        right_avg = self._average_line(right_lines, height, roi_offset)
 
         # Visualize line segments
         display_lines = []
@@ -83,27 +87,140 @@ class LaneDetector:
         steering = deviation / (width // 2) * 45  # Map to ±45°
 
         # Smooth processing
-        steering = 0.8 * self.prev_steering + 0.2 * steering
+        steering = self.smoothing * self.prev_steering + (1 - self.smoothing) * steering
         self.prev_steering = steering
 
         return steering, display_lines
 
-    def _average_line(self, lines, height):
-        if len(lines) == 0:
-            return None
+    def _find_segments(self, hsv, roi_offset):
+        """Hough segments of the white mask in full-frame coordinates, shape (N, 1, 4)."""
+        # Only take the bottom region
+        hsv_roi = hsv[roi_offset:, :]
+        roi_shape = hsv_roi.shape[:2]
+        roi = cv2.inRange(hsv_roi, self.lower_white, self.upper_white,
+                          dst=self.buffers.get('white_mask', roi_shape))
+        edges = cv2.Canny(roi, 50, 150, edges=self.buffers.get('edges', roi_shape))
 
-        x_coords = []
-        y_coords = []
-        for x1, y1, x2, y2 in lines:
-            x_coords += [x1, x2]
-            y_coords += [y1, y2]
+        lines = cv2.HoughLinesP(edges, 1, np.pi/180, 50,
+                                minLineLength=60, maxLineGap=50)
+        if lines is None:
+            return None
+        return lines + np.array([0, roi_offset, 0, roi_offset], dtype=lines.dtype)
+
+    def _find_segments_fast(self, frame, roi_offset):
+        """Same as _find_segments, on a downsampled crop of the lane ROI."""
+        roi = frame[roi_offset:, :, :3]
+        roi_height, roi_width = roi.shape[:2]
+        fast_width, fast_height = self.fast_resolution
+        small = cv2.resize(roi, (fast_width, fast_height), dst=self.buffers.get('small', (fast_height, fast_width, 3)),
+                           interpolation=self.fast_interpolation)
+        white_mask = self._white_mask(small, self.buffers)
+        edges = cv2.Canny(white_mask, 50, 150, edges=self.buffers.get('edges', (fast_height, fast_width)))
+
+        # Hough thresholds are lengths in pixels, so they shrink with the resolution
+        scale_x = fast_width / roi_width
+        scale_y = fast_height / roi_height
+        scale = (scale_x + scale_y) / 2
+        lines = cv2.HoughLinesP(edges, 1, np.pi/180, max(5, int(round(50 * scale))),
+                                minLineLength=max(5, int(round(60 * scale))),
+                                maxLineGap=max(2, int(round(50 * scale))))
+        if lines is None:
+            return None
+        # Back to full-frame coordinates
+        lines = lines * np.array([1 / scale_x, 1 / scale_y, 1 / scale_x, 1 / scale_y])
+        lines += np.array([0, roi_offset, 0, roi_offset])
+        return np.rint(lines).astype(np.int32)
+
+    @staticmethod
+    def _white_mask(bgr, buffers=None):
+        """White (V >= 200, S <= 30 on OpenCV's HSV scale) without an HSV conversion.
+        Intermediates go to buffers (a BufferPool) if given.
+        """
+        shape = bgr.shape[:2]
+        get = buffers.get if buffers is not None else lambda name, shape, dtype=None: None
+        blue, green, red = (cv2.extractChannel(bgr, i, dst=get(f'white_channel_{i}', shape)) for i in range(3))
+        value = cv2.max(cv2.max(blue, green, dst=get('white_value', shape)), red, dst=get('white_value', shape))
+        spread = cv2.min(cv2.min(blue, green, dst=get('white_spread', shape)), red, dst=get('white_spread', shape))
+        spread = cv2.subtract(value, spread, dst=spread)
+        # OpenCV rounds S = 255 * spread / V, so S <= 30 is 510 * spread < 61 * V
+        low_saturation = cv2.compare(
+            cv2.multiply(spread, 510, dst=get('white_spread_32', shape, np.int32), dtype=cv2.CV_32S),
+            cv2.multiply(value, 61, dst=get('white_value_32', shape, np.int32), dtype=cv2.CV_32S),
+            cv2.CMP_LT, dst=get('white_low_saturation', shape))
+        bright = cv2.compare(value, 200, cv2.CMP_GE, dst=get('white_bright', shape))
+        return cv2.bitwise_and(bright, low_saturation, dst=get('white_mask', shape))
+
+    @staticmethod
+    def _split_lanes(lines):
+        """Split Hough output (N, 1, 4) into left and right segments, each (M, 4) float.
+
+        Vertical segments and flat ones (|slope| < 0.5) are dropped. Image y grows downwards,
+        so the left lane line has a negative slope.
+        """
+        if lines is None:
+            empty = np.empty((0, 4))
+            return empty, empty
+        segments = lines.reshape(-1, 4).astype(np.float64)
+        dx = segments[:, 2] - segments[:, 0]
+        dy = segments[:, 3] - segments[:, 1]
+        non_vertical = dx != 0
+        slope = np.divide(dy, dx, out=np.zeros_like(dy), where=non_vertical)
+        steep = non_vertical & (np.abs(slope) >= 0.5)
+        return segments[steep & (slope < 0)], segments[steep & (slope > 0)]
+
+    def _fit_segments(self, segments):
+        """Least-squares fit x = a * y + b through the segment endpoints.
+
+        With length weighting, each segment counts in proportion to its length, so short noise
+        segments barely move the fit. Segments with an endpoint further than outlier_px from
+        the first fit are dropped and the line is fitted again.
+        Returns:
+            (a, b), or None if the endpoints do not constrain the fit
+        """
+        if self.length_weighted:
+            weights = np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1])
+        else:
+            weights = np.ones(len(segments))
+        xs = segments[:, [0, 2]]
+        ys = segments[:, [1, 3]]
+
+        poly = _weighted_fit(xs, ys, weights)
+        if poly is None or not self.outlier_px or len(segments) < 3:
+            return poly
+
+        residuals = np.abs(xs - (poly[0] * ys + poly[1])).max(axis=1)
+        inliers = residuals <= self.outlier_px
+        if inliers.all() or not inliers.any():
+            return poly
+        return _weighted_fit(xs[inliers], ys[inliers], weights[inliers]) or poly
+
+    def _average_line(self, segments, height, roi_offset):
+        if len(segments) == 0:
+            return None
 
-        if len(x_coords) == 0 or len(y_coords) == 0:
+        poly = self._fit_segments(segments)
+        if poly is None:
             return None
 
-        poly = np.polyfit(y_coords, x_coords, deg=1)
+        slope, intercept = poly
         y1 = height
-        y2 = int(height * 0.6)
-        x1 = int(np.polyval(poly, y1))
-        x2 = int(np.polyval(poly, y2))
+        y2 = roi_offset
+        x1 = int(slope * y1 + intercept)
+        x2 = int(slope * y2 + intercept)
         return (x1, y1, x2, y2)
+
+
+def _weighted_fit(xs, ys, weights):
+    """Weighted least squares x = a * y + b over endpoint arrays xs, ys of shape (M, 2)."""
+    w = weights[:, None]
+    total = 2 * weights.sum()
+    if total == 0:
+        return None
+    y_mean = (w * ys).sum() / total
+    x_mean = (w * xs).sum() / total
+    y_centered = ys - y_mean
+    var_y = (w * y_centered * y_centered).sum()
+    if var_y == 0:
+        return None
+    slope = (w * y_centered * (xs - x_mean)).sum() / var_y
+    return slope, x_mean - slope * y_mean
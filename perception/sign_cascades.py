@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 12:06:10
+@Path: /perception/sign_cascades.py
+"""
+
+
+import time
+
+from perception.frame_context import FrameContext
+from perception.traffic_light_detection import TrafficLightDetector
+from perception.traffic_sign_detection import MultiSignDetector, TrafficSignDetector
+from utils.buffer_pool import BufferPool
+from utils.config import BUFFER_POOL_CONFIG, SIGN_SCALE_CONFIG
+
+CASCADES = ('stop_sign', 'light')
+
+
+class SignCascades:
+    """Stop sign and traffic light detection on one frame, sharing the image pyramid.
+
+    detect_tracked() returns what the stop sign and light detectors' detect_tracked() return.
+    When more than one of the requested cascades needs a full-frame scan (always, unless
+    tracking lets a detector search a window around its last bbox), the scans run as one
+    MultiSignDetector pass instead of one detectMultiScale pyramid per cascade. See
+    MultiSignDetector for what its fine_step_scale trades away.
+    """
+    def __init__(self, shared=SIGN_SCALE_CONFIG['SHARED_PYRAMID'],
+                 fine_step_scale=SIGN_SCALE_CONFIG['FINE_STEP_SCALE']):
+        """
+        Args:
+            shared: Share the pyramid; False runs each detector on its own
+            fine_step_scale: Stride setting of the shared pyramid, see MultiSignDetector
+        """
+        self.stop_sign_detector = TrafficSignDetector('stop')
+        self.light_detector = TrafficLightDetector()
+        self.sign_detectors = {'stop_sign': self.stop_sign_detector, 'light': self.light_detector.sign_detector}
+        self.multi_detector = None
+        if shared:
+            self.multi_detector = MultiSignDetector(
+                [detector.sign_type for detector in self.sign_detectors.values()],
+                fine_step_scale=fine_step_scale,
+                detectors={detector.sign_type: detector for detector in self.sign_detectors.values()}
+            )
+        self.buffers = BufferPool(BUFFER_POOL_CONFIG['ENABLED'])
+        self.shared_scans = 0
+
+    def detect_tracked(self, frame, cascades=CASCADES):
+        """
+        Args:
+            frame: Image in BGR format, or a FrameContext
+            cascades: Cascades to run, 'stop_sign' and/or 'light'
+        Returns:
+            (results, timings): name -> detect_tracked() result of that detector, and name ->
+            seconds, including the time its cascade took in a shared scan
+        """
+        ctx = FrameContext.wrap(frame, pool=self.buffers)
+        try:
+            scans, scan_times = self._shared_scans(ctx, cascades)
+            results, timings = {}, {}
+            for name in cascades:
+                t0 = time.perf_counter()
+                if name == 'stop_sign':
+                    results[name] = self.stop_sign_detector.detect_tracked(ctx, scans.get(name))
+                else:
+                    results[name] = self.light_detector.detect_tracked(ctx, scans.get(name))
+                timings[name] = time.perf_counter() - t0 + scan_times.get(name, 0.0)
+        finally:
+            if ctx is not frame:
+                ctx.release()
+        return results, timings
+
+    def _shared_scans(self, ctx, cascades):
+        """Returns ({name: full-frame detections}, {name: seconds}) of a shared pass, if worth one."""
+        due = [name for name in cascades if self.sign_detectors[name].full_scan_due()]
+        if self.multi_detector is None or len(due) < 2:
+            return {}, {}
+        found = self.multi_detector.detect_all(ctx, [self.sign_detectors[name].sign_type for name in due])
+        self.shared_scans += 1
+        timings = self.multi_detector.last_timings
+        return ({name: found[self.sign_detectors[name].sign_type] for name in due},
+                {name: timings[self.sign_detectors[name].sign_type] for name in due})
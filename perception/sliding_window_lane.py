@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 15:31:07
+@Path: /perception/sliding_window_lane.py
+"""
+
+
+import cv2
+import numpy as np
+
+from perception.frame_context import FrameContext
+from perception.lane_detection import LaneDetector
+from utils.buffer_pool import BufferPool
+from utils.config import BUFFER_POOL_CONFIG, LANE_CONFIG, SLIDING_WINDOW_CONFIG
+
+
+class SlidingWindowLaneDetector:
+    """Lane engine that follows the lane lines from frame to frame.
+
+    The first frame (and any frame where the lines were lost) seeds one sliding window per line
+    at the peaks of the white mask's column histogram and walks them up the ROI. Later frames
+    only collect white pixels within a margin around the previous fit, and fall back to the
+    full search when too few of the ROI's horizontal bands still contain the line.
+    Each line is fitted as x = a * y^2 + b * y + c in full-frame coordinates.
+    """
+    def __init__(self, config=SLIDING_WINDOW_CONFIG, roi_start=LANE_CONFIG['ROI_START']):
+        """
+        Args:
+            config: N_WINDOWS/WINDOW_MARGIN/SEARCH_MARGIN/MIN_PIXELS/MIN_FIT_PIXELS/MIN_CONFIDENCE/
+                LANE_OFFSET/MAX_LINE_WIDTH settings; widths, margins and offsets are fractions of
+                the frame width
+            roi_start: Lane ROI starts at this fraction of the frame height
+        """
+        self.n_windows = config['N_WINDOWS']
+        self.window_margin = config['WINDOW_MARGIN']
+        self.search_margin = config['SEARCH_MARGIN']
+        self.min_pixels = config['MIN_PIXELS']
+        self.min_fit_pixels = config['MIN_FIT_PIXELS']
+        self.min_confidence = config['MIN_CONFIDENCE']
+        self.lane_offset = config['LANE_OFFSET']
+        self.max_line_width = config['MAX_LINE_WIDTH']
+        self.roi_start = roi_start
+        self.buffers = BufferPool(BUFFER_POOL_CONFIG['ENABLED'])
+
+        self.fits = {'left': None, 'right': None}
+        self.confidence = {'left': 0.0, 'right': 0.0}
+        self.smoothing = LANE_CONFIG['SMOOTHING']
+        self.prev_steering = 0
+        self.full_searches = 0
+        self.prior_searches = 0
+        self.fallbacks = 0
+
+    def detect(self, frame):
+        """
+        Args:
+            frame: Image in BGR format, or a FrameContext
+        Returns:
+            float: Smoothed steering angle in degrees
+            list: Lane line pieces (x1, y1, x2, y2) for display, n_windows per detected line
+        """
+        ctx = FrameContext.wrap(frame)
+        height, width = ctx.shape[:2]
+        roi_offset = int(height * self.roi_start)
+        mask = self._line_mask(ctx.frame[roi_offset:, :, :3], width)
+        self._update_fits(mask, width, height, roi_offset)
+
+        # Lane center at the top of the ROI, like LaneDetector
+        center_x = width // 2
+        lane_center = center_x
+        left_x = self._evaluate('left', roi_offset)
+        right_x = self._evaluate('right', roi_offset)
+        if left_x is not None and right_x is not None:
+            lane_center = (left_x + right_x) // 2
+        elif left_x is not None:
+            lane_center = left_x + int(self.lane_offset * width)
+        elif right_x is not None:
+            lane_center = right_x - int(self.lane_offset * width)
+
+        deviation = lane_center - center_x
+        steering = deviation / (width // 2) * 45  # Map to ±45°
+
+        # Smooth processing
+        steering = self.smoothing * self.prev_steering + (1 - self.smoothing) * steering
+        self.prev_steering = steering
+
+        return steering, self._display_lines(height, roi_offset)
+
+    def reset(self):
+        """Forget the previous fits; the next frame runs a full search."""
+        self.fits = {'left': None, 'right': None}
+        self.confidence = {'left': 0.0, 'right': 0.0}
+
+    def _update_fits(self, mask, width, height, roi_offset):
+        """Refit both lines on a line mask covering rows roi_offset..height of the image."""
+        ys, xs = np.nonzero(mask)
+        ys = ys + roi_offset
+
+        for side in ('left', 'right'):
+            fit = None
+            if self.fits[side] is not None:
+                self.prior_searches += 1
+                fit = self._search_around_prior(side, xs, ys, width, height, roi_offset)
+                if fit is None:
+                    self.fallbacks += 1
+            if fit is None:
+                self.full_searches += 1
+                fit = self._search_windows(side, mask, xs, ys, width, height, roi_offset)
+            self.fits[side] = fit
+
+    def _line_mask(self, roi, width):
+        """White pixels in horizontal runs narrower than max_line_width.
+
+        Hough works on edges, but the histogram counts mask pixels, so large white areas
+        (sky, walls, the floor beside the track) would outweigh the lines. The top-hat keeps
+        only what a horizontal opening of max_line_width removes.
+        """
+        mask = LaneDetector._white_mask(roi, self.buffers)
+        kernel_width = max(3, int(self.max_line_width * width)) | 1
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_width, 1))
+        return cv2.morphologyEx(mask, cv2.MORPH_TOPHAT, kernel, dst=self.buffers.get('line_mask', mask.shape))
+
+    def _search_windows(self, side, mask, xs, ys, width, height, roi_offset):
+        """Full search: histogram peak of the lower half of the ROI, then sliding windows upwards."""
+        margin = self.window_margin * width
+        histogram = np.count_nonzero(mask[mask.shape[0] // 2:], axis=0)
+        # Slanted lines spread over many columns; count the pixels a window around each column sees
+        histogram = np.convolve(histogram, np.ones(max(1, int(margin))), mode='same')
+        midpoint = width // 2
+        half = histogram[:midpoint] if side == 'left' else histogram[midpoint:]
+        if half.size == 0 or half.max() < self.min_pixels:
+            self.confidence[side] = 0.0
+            return None
+        x_current = int(np.argmax(half)) + (0 if side == 'left' else midpoint)
+
+        window_height = (height - roi_offset) / self.n_windows
+        selected = np.zeros(xs.shape, dtype=bool)
+        for window in range(self.n_windows):
+            y_high = height - window * window_height
+            y_low = y_high - window_height
+            in_window = ((ys >= y_low) & (ys < y_high) &
+                         (xs >= x_current - margin) & (xs < x_current + margin))
+            selected |= in_window
+            if np.count_nonzero(in_window) >= self.min_pixels:
+                x_current = int(xs[in_window].mean())
+        return self._fit(side, xs[selected], ys[selected], height, roi_offset)
+
+    def _search_around_prior(self, side, xs, ys, width, height, roi_offset):
+        """Pixels within search_margin of the previous fit. None when confidence is too low."""
+        a, b, c = self.fits[side]
+        near = np.abs(xs - (a * ys * ys + b * ys + c)) < self.search_margin * width
+        fit = self._fit(side, xs[near], ys[near], height, roi_offset)
+        return fit if self.confidence[side] >= self.min_confidence else None
+
+    def _fit(self, side, xs, ys, height, roi_offset):
+        """Quadratic fit of the selected pixels; updates the side's confidence.
+
+        Confidence is the fraction of the n_windows horizontal bands of the ROI that hold at
+        least min_pixels of the line, so a line seen over its whole length scores 1.
+        """
+        if xs.size < self.min_fit_pixels:
+            self.confidence[side] = 0.0
+            return None
+        bands = ((ys - roi_offset) * self.n_windows // (height - roi_offset)).clip(0, self.n_windows - 1)
+        self.confidence[side] = np.count_nonzero(
+            np.bincount(bands, minlength=self.n_windows) >= self.min_pixels) / self.n_windows
+        # A line covering a single band cannot constrain the curvature
+        degree = 2 if self.confidence[side] * self.n_windows >= 3 else 1
+        poly = np.polyfit(ys, xs, deg=degree)
+        return tuple(poly) if degree == 2 else (0.0, poly[0], poly[1])
+
+    def _evaluate(self, side, y):
+        if self.fits[side] is None:
+            return None
+        a, b, c = self.fits[side]
+        return int(a * y * y + b * y + c)
+
+    def _display_lines(self, height, roi_offset):
+        display_lines = []
+        y_points = np.linspace(height, roi_offset, self.n_windows + 1).astype(int)
+        for side in ('left', 'right'):
+            if self.fits[side] is None:
+                continue
+            x_points = [self._evaluate(side, y) for y in y_points]
+            for i in range(self.n_windows):
+                display_lines.append((x_points[i], int(y_points[i]), x_points[i + 1], int(y_points[i + 1])))
+        return display_lines
@@ -10,7 +10,10 @@ import cv2
 import numpy as np
 from PIL import Image
 
+from perception.frame_context import FrameContext
 from perception.traffic_sign_detection import TrafficSignDetector
+from utils.buffer_pool import BufferPool
+from utils.config import BUFFER_POOL_CONFIG
 
 
 class TrafficLightDetector:
@@ -20,25 +23,30 @@ class TrafficLightDetector:
                          ([160, 100, 100], [180, 255, 255])]
         self.yellow_range = ([20, 100, 100], [30, 255, 255])
         self.green_range = ([40, 100, 100], [80, 255, 255])
+        self.buffers = BufferPool(BUFFER_POOL_CONFIG['ENABLED'])
 
 
 
-    def detect_by_sign_and_color(self, image):
+    def detect_by_sign_and_color(self, image, full_scan=None):
         """
         Using Haar cascade to detect suspected traffic lights, then analyze the color of that area
         to determine the light color.
+        Args:
+            image: Image in BGR format, or a FrameContext
+            full_scan: Light cascade detections already found on this frame, see TrafficSignDetector.detect
         Returns: (color, bbox)"""
-        found, _, bbox = self.sign_detector.detect(image)
-        if not found or not bbox:
-            return None, None
-        
-        x, y, w, h = bbox
-        roi = image[y:y+h, x:x+w]
-        
-        hsv_roi = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
-        red_mask = self._detect_color(hsv_roi, self.red_range)
-        yellow_mask = self._detect_color(hsv_roi, [self.yellow_range])
-        green_mask = self._detect_color(hsv_roi, [self.green_range])
+        ctx = FrameContext.wrap(image, pool=self.buffers)
+        try:
+            found, _, bbox = self.sign_detector.detect(ctx, full_scan)
+            if not found or not bbox:
+                return None, None
+            hsv_roi = ctx.hsv_roi(bbox)
+            red_mask = self._detect_color(hsv_roi, self.red_range, 'red')
+            yellow_mask = self._detect_color(hsv_roi, [self.yellow_range], 'yellow')
+            green_mask = self._detect_color(hsv_roi, [self.green_range], 'green')
+        finally:
+            if ctx is not image:
+                ctx.release()
         
         masks = {"red": red_mask, "yellow": yellow_mask, "green": green_mask}
         max_area = 0
@@ -57,13 +65,24 @@ class TrafficLightDetector:
         else:
             return None, None
 
-    def _detect_color(self, hsv, ranges):
-        """Detect specific color ranges"""
-        mask = np.zeros(hsv.shape[:2], dtype=np.uint8)
+    def detect_tracked(self, image, full_scan=None):
+        """Same as detect_by_sign_and_color(), plus the SignTrack of the light housing (or None)."""
+        color, bbox = self.detect_by_sign_and_color(image, full_scan)
+        return color, bbox, self.sign_detector.track
+
+    def _detect_color(self, hsv, ranges, name='color'):
+        """Detect specific color ranges. The mask is written into the buffer called name."""
+        shape = hsv.shape[:2]
+        mask = self.buffers.get(f'{name}_mask', shape)
+        if mask is None:
+            mask = np.zeros(shape, dtype=np.uint8)
+        else:
+            mask.fill(0)
+        range_mask = self.buffers.get('range_mask', shape)
         for lower, upper in ranges:
             if isinstance(lower, (list, tuple)):
-                color_mask = cv2.inRange(hsv, np.array(lower), np.array(upper))
-                mask = cv2.bitwise_or(mask, color_mask)
+                color_mask = cv2.inRange(hsv, np.array(lower), np.array(upper), dst=range_mask)
+                mask = cv2.bitwise_or(mask, color_mask, dst=mask)
         return mask
 
     def draw_detection(self, image, color, bbox):
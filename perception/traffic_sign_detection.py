@@ -6,18 +6,55 @@
 """
 
 
+import itertools
 import os
+import time
+from collections import namedtuple
 
 import cv2
+import numpy as np
 
-from utils.config import MIN_STOP_SIGN_WIDTH
+from perception.frame_context import FrameContext
+from utils.buffer_pool import BufferPool
+from utils.config import BUFFER_POOL_CONFIG, MIN_STOP_SIGN_WIDTH, SIGN_SCALE_CONFIG, TRACKING_CONFIG
+
+# id: unique per tracked object of a detector, age: detections since the track started,
+# hits: detections that found the object, misses: consecutive detections that did not
+SignTrack = namedtuple('SignTrack', ['id', 'bbox', 'age', 'hits', 'misses'])
+
+# Pyramid of a full-frame scan, see SIGN_SCALE_CONFIG. Sizes are (w, h) in frame pixels.
+ScalePolicy = namedtuple('ScalePolicy', ['scale_factor', 'min_size', 'max_size', 'downscale',
+                                         'near_only', 'near_margin'])
+
+
+def scale_policy(sign_type, config=SIGN_SCALE_CONFIG):
+    """ScalePolicy of a sign type: its SIGN_SCALE_CONFIG entry over the defaults."""
+    settings = dict(config['DEFAULT'], **config['DETECTORS'].get(sign_type, {}))
+    return ScalePolicy(
+        scale_factor=settings['SCALE_FACTOR'],
+        min_size=tuple(settings['MIN_SIZE']),
+        max_size=tuple(settings['MAX_SIZE']) if settings['MAX_SIZE'] else None,
+        downscale=settings['DOWNSCALE'],
+        near_only=settings['NEAR_ONLY'],
+        near_margin=settings['NEAR_MARGIN'],
+    )
 
 
 class TrafficSignDetector:
-    def __init__(self, sign_type='stop'):
+    def __init__(self, sign_type='stop', tracked=TRACKING_CONFIG['ENABLED'],
+                 redetect_interval=TRACKING_CONFIG['REDETECT_INTERVAL'],
+                 search_margin=TRACKING_CONFIG['SEARCH_MARGIN'],
+                 scale_tolerance=TRACKING_CONFIG['SCALE_TOLERANCE'],
+                 max_misses=TRACKING_CONFIG['MAX_MISSES'], policy=None):
         """
         Args:
             sign_type: Type of sign ('stop', 'left', 'right')
+            tracked: Once a sign is found, search only a window around it on the next detections
+            redetect_interval: Full-frame scan at least every N detections in tracked mode
+            search_margin: Search window expansion around the previous bbox, relative to its size
+            scale_tolerance: Allowed relative size change between two detections
+            max_misses: Consecutive misses before the track is dropped
+            policy: ScalePolicy of the full-frame scans, scale_policy(sign_type) by default
         """
         # Mapping of sign types to model files
         self.model_files = {
@@ -35,28 +72,159 @@ class TrafficSignDetector:
         if self.classifier.empty():
             raise ValueError(f"Error: Cascade classifier for {sign_type} failed to load")
 
-    def detect(self, frame):
+        self.policy = policy or scale_policy(sign_type)
+        self.tracked = tracked
+        self.redetect_interval = redetect_interval
+        self.search_margin = search_margin
+        self.scale_tolerance = scale_tolerance
+        self.max_misses = max_misses
+        self.track = None
+        # Per detector, so a replay numbers its tracks the same way as the recorded run
+        self._track_ids = itertools.count(1)
+        self.buffers = BufferPool(BUFFER_POOL_CONFIG['ENABLED'])
+        self.full_scans = 0
+        self.window_scans = 0
+        self._since_full_scan = 0
+
+    def detect(self, frame, full_scan=None):
         """Detect traffic signs in the image
         Args:
-            frame: Image in BGR format
+            frame: Image in BGR format, or a FrameContext
+            full_scan: Detections of a full-frame scan already run on this frame (e.g. by a
+                MultiSignDetector), used instead of scanning again
         Returns:
             bool: Whether a sign is detected
             list: Detected sign position [x, y, w, h]
         """
-        # Convert to grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Histogram equalization to improve contrast
-        gray = cv2.equalizeHist(gray)
-        
+        # Grayscale + histogram equalization to improve contrast, shared through the FrameContext
+        ctx = FrameContext.wrap(frame, pool=self.buffers)
+        try:
+            return self._detect_gray(ctx.equalized_gray, full_scan)
+        finally:
+            if ctx is not frame:
+                ctx.release()
+
+    def _detect_gray(self, gray, full_scan=None):
+        if not self.tracked:
+            return self._build_result(self._detect_full(gray, full_scan))
+
+        signs = []
+        if not self.full_scan_due():
+            signs = self._detect_in_window(gray, self.track.bbox)
+        if len(signs) == 0:
+            # Scheduled re-detection, no track yet, or the object left the search window
+            signs = self._detect_full(gray, full_scan)
+        signs = self._update_track(signs)
+        return self._build_result(signs)
+
+    def detect_tracked(self, frame, full_scan=None):
+        """Same as detect(), plus the current SignTrack (None when not tracking anything)."""
+        is_sign, is_close, bbox = self.detect(frame, full_scan)
+        return is_sign, is_close, bbox, self.track
+
+    def full_scan_due(self):
+        """Whether the next detection starts with a full-frame scan rather than a window search."""
+        return not self.tracked or self.track is None or self._since_full_scan >= self.redetect_interval
+
+    def reset_track(self):
+        self.track = None
+        self._since_full_scan = 0
+
+    def _detect_full(self, gray, full_scan=None):
+        self.full_scans += 1
+        self._since_full_scan = 0
+        if full_scan is not None:
+            return full_scan
+        policy = self.policy
+        min_size, max_size = self.scan_sizes()
+        if policy.downscale != 1.0:
+            height, width = gray.shape[:2]
+            size = (int(round(width * policy.downscale)), int(round(height * policy.downscale)))
+            gray = cv2.resize(gray, size, dst=self.buffers.get('downscaled', size[::-1]),
+                              interpolation=cv2.INTER_AREA)
+            # The cascade cannot find anything smaller than its window
+            win_w, win_h = self.classifier.getOriginalWindowSize()
+            min_size = (max(win_w, int(min_size[0] * policy.downscale)), max(win_h, int(min_size[1] * policy.downscale)))
+            if max_size is not None:
+                max_size = (int(max_size[0] * policy.downscale) + 1, int(max_size[1] * policy.downscale) + 1)
+        options = {'maxSize': max_size} if max_size is not None else {}
         # Detect traffic signs
         signs = self.classifier.detectMultiScale(
             gray,
-            scaleFactor=1.1,
+            scaleFactor=policy.scale_factor,
+            minNeighbors=5,
+            minSize=min_size,
+            flags=cv2.CASCADE_SCALE_IMAGE,
+            **options
+        )
+        if policy.downscale != 1.0 and len(signs) > 0:
+            signs = np.round(signs / policy.downscale).astype(signs.dtype)
+        return signs
+
+    def scan_sizes(self):
+        """(min_size, max_size) of a full-frame scan in frame pixels, after the near-only cut."""
+        min_w, min_h = self.policy.min_size
+        if self.policy.near_only:
+            # Smallest sign that may still become close, with the cascade's aspect ratio
+            win_w, win_h = self.classifier.getOriginalWindowSize()
+            near_w = int(MIN_STOP_SIGN_WIDTH * self.policy.near_margin)
+            min_w, min_h = max(min_w, near_w), max(min_h, int(near_w * win_h / win_w))
+        return (min_w, min_h), self.policy.max_size
+
+    def _detect_in_window(self, gray, bbox):
+        """Search an expanded window around bbox, limited to sizes close to the bbox size."""
+        self.window_scans += 1
+        self._since_full_scan += 1
+        x, y, w, h = bbox
+        height, width = gray.shape[:2]
+        margin_x, margin_y = int(w * self.search_margin), int(h * self.search_margin)
+        x0, y0 = max(0, x - margin_x), max(0, y - margin_y)
+        x1, y1 = min(width, x + w + margin_x), min(height, y + h + margin_y)
+
+        min_size = (max(30, int(w * (1 - self.scale_tolerance))), max(30, int(h * (1 - self.scale_tolerance))))
+        max_size = (int(w * (1 + self.scale_tolerance)) + 1, int(h * (1 + self.scale_tolerance)) + 1)
+        window = gray[y0:y1, x0:x1]
+        if window.shape[1] < min_size[0] or window.shape[0] < min_size[1]:
+            return []
+        signs = self.classifier.detectMultiScale(
+            window,
+            scaleFactor=self.policy.scale_factor,
             minNeighbors=5,
-            minSize=(30, 30),
+            minSize=min_size,
+            maxSize=max_size,
             flags=cv2.CASCADE_SCALE_IMAGE
         )
+        if len(signs) == 0:
+            return []
+        return signs + np.array([x0, y0, 0, 0], dtype=signs.dtype)
+
+    def _update_track(self, signs):
+        """Match detections to the current track and return them with the matched one first."""
+        track = self.track
+        if len(signs) == 0:
+            if track is not None:
+                misses = track.misses + 1
+                self.track = None if misses >= self.max_misses else \
+                    track._replace(age=track.age + 1, misses=misses)
+            return signs
+
+        best = 0
+        if track is not None:
+            overlaps = [_iou(sign, track.bbox) for sign in signs]
+            best = int(np.argmax(overlaps))
+            if overlaps[best] <= 0:
+                track = None
+        bbox = [int(v) for v in signs[best]]
+        if track is None:
+            self.track = SignTrack(next(self._track_ids), bbox, 1, 1, 0)
+        else:
+            self.track = track._replace(bbox=bbox, age=track.age + 1, hits=track.hits + 1, misses=0)
+        if best:
+            signs = np.concatenate([signs[best:best + 1], signs[:best], signs[best + 1:]])
+        return signs
+
+    @staticmethod
+    def _build_result(signs):
         is_sign = False
         is_close = False
 
@@ -84,4 +252,155 @@ class TrafficSignDetector:
             cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
             cv2.putText(frame, f'{self.sign_type.title()} Sign', (x, y-10), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-        return frame
\ No newline at end of file
+        return frame
+
+def _iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / float(union) if union > 0 else 0.0
+
+
+class MultiSignDetector:
+    """Runs several sign cascades over one shared image pyramid.
+
+    cv2.CascadeClassifier.detectMultiScale builds its own pyramid on every call. Here the
+    equalized grayscale image is resized once per scale and every cascade whose window size
+    at that scale is within its ScalePolicy limits is evaluated on the level, then the raw
+    hits are grouped with cv2.groupRectangles like detectMultiScale does.
+
+    Levels, strides and hit coordinates follow detectMultiScale, so with fine_step_scale=2.0
+    (and no DOWNSCALE policy) the detections are the same as those of each cascade's own
+    detectMultiScale. That only saves the resizes, which are cheap next to the cascades.
+    A larger fine_step_scale keeps the 2 pixel stride on levels that detectMultiScale scans
+    at 1 pixel, which roughly halves the cost of the coarse levels but moves or loses
+    detections of signs larger than about twice the cascade window. DOWNSCALE policies are
+    approximated by skipping the levels finer than the downscaled frame.
+    """
+    def __init__(self, sign_types=('stop', 'light', 'left', 'right'),
+                 scale_factor=SIGN_SCALE_CONFIG['DEFAULT']['SCALE_FACTOR'], min_neighbors=5,
+                 fine_step_scale=SIGN_SCALE_CONFIG['FINE_STEP_SCALE'], detectors=None):
+        """
+        Args:
+            sign_types: Sign types to detect, keys of TrafficSignDetector.model_files
+            scale_factor: Ratio between consecutive pyramid levels, shared by all cascades
+            min_neighbors: Minimum number of raw hits for a detection
+            fine_step_scale: Levels scaled down by at least this (and at least 2x) are scanned
+                with detectMultiScale's 1 pixel stride, the others with 2 pixels. 2.0 reproduces
+                detectMultiScale; None keeps the 2 pixel stride everywhere
+            detectors: Optional {sign type: TrafficSignDetector} whose cascades and scale
+                policies are used instead of loading new ones
+        """
+        detectors = detectors or {}
+        self.detectors = {sign_type: detectors.get(sign_type) or TrafficSignDetector(sign_type, tracked=False)
+                          for sign_type in sign_types}
+        self.window_sizes = {sign_type: detector.classifier.getOriginalWindowSize()
+                             for sign_type, detector in self.detectors.items()}
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.fine_step_scale = fine_step_scale
+        # Seconds spent on each sign type by the last detect_all(), with the level resizes
+        # split between the cascades scanning the level
+        self.last_timings = {}
+
+    def detect(self, frame, sign_types=None):
+        """Detect all configured sign types in one pass
+        Args:
+            frame: Image in BGR format, or a FrameContext
+            sign_types: Subset of the configured sign types to detect, default all
+        Returns:
+            dict: sign type -> (is_sign, is_close, bbox), as returned by TrafficSignDetector.detect
+        """
+        return {sign_type: TrafficSignDetector._build_result(signs)
+                for sign_type, signs in self.detect_all(frame, sign_types).items()}
+
+    def detect_all(self, frame, sign_types=None):
+        """Returns dict: sign type -> array of every grouped detection [x, y, w, h]."""
+        gray = FrameContext.wrap(frame).equalized_gray
+        sign_types = list(self.detectors if sign_types is None else sign_types)
+        height, width = gray.shape[:2]
+        limits = {sign_type: self._size_limits(sign_type, (width, height)) for sign_type in sign_types}
+        candidates = {sign_type: [] for sign_type in sign_types}
+        self.last_timings = {sign_type: 0.0 for sign_type in sign_types}
+
+        # Same scales as detectMultiScale: the factor accumulates in double precision, windows
+        # are rounded from it and levels from its single precision value
+        factor = 1.0
+        while True:
+            due, scanning = [], False
+            for sign_type in sign_types:
+                win_w, win_h = self.window_sizes[sign_type]
+                size = (int(round(win_w * factor)), int(round(win_h * factor)))
+                (min_w, min_h), (max_w, max_h) = limits[sign_type]
+                if size[0] > max_w or size[1] > max_h:
+                    continue
+                scanning = True
+                if size[0] >= min_w and size[1] >= min_h:
+                    due.append(sign_type)
+            if not scanning:
+                break
+            if due:
+                self._scan_level(gray, np.float32(factor), due, candidates)
+            factor *= self.scale_factor
+
+        results = {}
+        for sign_type, rects in candidates.items():
+            t0 = time.perf_counter()
+            if rects:
+                grouped, _ = cv2.groupRectangles(rects, self.min_neighbors, 0.2)
+                grouped = np.asarray(grouped).reshape(-1, 4)
+                # detectMultiScale clips its detections to the frame after grouping
+                grouped[:, 2] = np.minimum(grouped[:, 2], width - grouped[:, 0])
+                grouped[:, 3] = np.minimum(grouped[:, 3], height - grouped[:, 1])
+                results[sign_type] = grouped
+            else:
+                results[sign_type] = np.empty((0, 4), dtype=np.int32)
+            self.last_timings[sign_type] += time.perf_counter() - t0
+        return results
+
+    def _scan_level(self, gray, factor, sign_types, candidates):
+        height, width = gray.shape[:2]
+        # detectMultiScale scans with a 2 pixel stride below 2x downscaling and 1 pixel from there
+        fine_step = self.fine_step_scale is not None and factor >= max(2.0, self.fine_step_scale)
+        level = None
+        if not fine_step:
+            t0 = time.perf_counter()
+            level_size = (int(np.rint(np.float32(width) / factor)), int(np.rint(np.float32(height) / factor)))
+            level = gray if level_size == (width, height) else \
+                cv2.resize(gray, level_size, interpolation=cv2.INTER_LINEAR_EXACT)
+            share = (time.perf_counter() - t0) / len(sign_types)
+        for sign_type in sign_types:
+            t0 = time.perf_counter()
+            classifier = self.detectors[sign_type].classifier
+            win_w, win_h = self.window_sizes[sign_type]
+            # In single precision like detectMultiScale, or the rounding differs
+            size = (int(np.rint(np.float32(win_w) * factor)), int(np.rint(np.float32(win_h) * factor)))
+            if fine_step:
+                # A 1 pixel stride needs detectMultiScale's own scale for this level
+                hits = classifier.detectMultiScale(gray, scaleFactor=self.scale_factor, minNeighbors=0,
+                                                   minSize=size, maxSize=size)
+                # Its hits come back clipped to the frame, but are grouped unclipped
+                candidates[sign_type].extend([int(x), int(y), size[0], size[1]] for x, y, _, _ in hits)
+            else:
+                hits = classifier.detectMultiScale(level, scaleFactor=self.scale_factor, minNeighbors=0,
+                                                   minSize=(win_w, win_h), maxSize=(win_w, win_h))
+                candidates[sign_type].extend(
+                    [int(np.rint(np.float32(x) * factor)), int(np.rint(np.float32(y) * factor)), size[0], size[1]]
+                    for x, y, _, _ in hits
+                )
+                self.last_timings[sign_type] += share
+            self.last_timings[sign_type] += time.perf_counter() - t0
+
+    def _size_limits(self, sign_type, frame_size):
+        """((min_w, min_h), (max_w, max_h)) window sizes in frame pixels the sign type's ScalePolicy allows."""
+        detector = self.detectors[sign_type]
+        win_w, win_h = self.window_sizes[sign_type]
+        (min_w, min_h), max_size = detector.scan_sizes()
+        downscale = detector.policy.downscale
+        # A frame downscaled before detection starts its pyramid at 1 / downscale
+        min_size = (max(min_w, int(np.ceil(win_w / downscale))), max(min_h, int(np.ceil(win_h / downscale))))
+        max_size = frame_size if max_size is None else (min(max_size[0], frame_size[0]), min(max_size[1], frame_size[1]))
+        return min_size, max_size
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 18:47:21
+@Path: /replay.py
+"""
+
+
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from camera.frame_buffer import StreamFrames
+from main import AutoDriver
+from utils.config import CAPTURE_CONFIG
+from utils.run_log import RunLog, diff_logs
+
+
+class RunLogCapture:
+    """cv2.VideoCapture stand-in that plays back the frames of a run log as fast as they are read."""
+    def __init__(self, log):
+        if log.frames is None:
+            raise ValueError(f"Run log {log.path} has no frames to replay")
+        if log.stream != 'bgr' and log.stream != CAPTURE_CONFIG['LORES_FORMAT'].lower():
+            raise ValueError(f"Run log has {log.stream} frames but CAPTURE_CONFIG['LORES_FORMAT'] "
+                             f"is {CAPTURE_CONFIG['LORES_FORMAT']}")
+        self.log = log
+        self.position = -1  # Index of the last frame read
+
+    def isOpened(self):
+        return True
+
+    def read(self, image=None):
+        """Returns (True, frame) like VideoCapture.read, (False, None) after the last frame."""
+        self.position += 1
+        while self.position < len(self.log) and self.log.index[self.position]['frame'] < 0:
+            self.position += 1
+        if self.position >= len(self.log):
+            return False, None
+        frame = self.log.frame(self.position)
+        if self.log.stream != 'bgr':
+            row = self.log.index[self.position]
+            return True, StreamFrames(None, np.array(frame), int(row['seq']), float(row['timestamp']))
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, np.array(frame)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return self.clock() * 1000
+        if prop == cv2.CAP_PROP_FPS:
+            return self.log.info.get('fps', 30)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.log.info['output_size'][0]
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.log.info['output_size'][1]
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self.log)
+        return 0
+
+    def clock(self):
+        """Recorded capture time of the current frame, the replay's notion of now."""
+        return float(self.log.index[max(self.position, 0)]['timestamp'])
+
+    def release(self):
+        pass
+
+
+def replay(log_path, output_path, record_frames=False, debug=False):
+    """Run AutoDriver on a recorded run and record what it does into output_path.
+    Returns:
+        (RunLog of the replay, elapsed seconds)
+    """
+    capture = RunLogCapture(RunLog(log_path))
+    t0 = time.perf_counter()
+    with AutoDriver(debug=debug, replay=capture, record_path=output_path, record_frames=record_frames) as driver:
+        driver.start()
+    return RunLog(output_path), time.perf_counter() - t0
+
+
+def print_differences(differences, frames, limit=20):
+    changed_frames = sorted({frame for frame, *_ in differences})
+    print(f"{len(changed_frames)} of {frames} frames differ ({len(differences)} values)")
+    for frame, section, key, a, b in differences[:limit]:
+        print(f"  frame {frame} {section}.{key}: {a!r} -> {b!r}")
+    if len(differences) > limit:
+        print(f"  ... {len(differences) - limit} more")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded run through AutoDriver and diff the results")
+    parser.add_argument('log', help="Run log directory recorded with RUN_LOG_CONFIG['ENABLED'] or record_path")
+    parser.add_argument('--output', help="Run log directory for the replay (default: output/replay_<time>)")
+    parser.add_argument('--against', help="Diff the replay against this run log instead of the recorded run")
+    parser.add_argument('--frames', action='store_true', help="Also store the frames in the replay log")
+    parser.add_argument('--debug', action='store_true')
+    parser.add_argument('--quiet', action='store_true', help="Hide per-frame logging and prints")
+    args = parser.parse_args()
+
+    output_path = args.output or os.path.join(
+        'output', f"replay_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S-%f')}")
+    if args.quiet:
+        logging.basicConfig(level=logging.WARNING)
+    with open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull if args.quiet else sys.stdout):
+        result, elapsed = replay(args.log, output_path, args.frames, args.debug)
+
+    print(f"Replayed {len(result)} frames in {elapsed:.2f}s ({len(result) / elapsed:.1f} fps) into {output_path}")
+    reference = RunLog(args.against or args.log)
+    differences = diff_logs(reference, result)
+    print_differences(differences, min(len(reference), len(result)))
+    return 1 if differences else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_control import write_test_video
+from control.null_vehicle import NullVehicle
+from main import AutoDriver
+from perception.executor import PerceptionExecutor, PerceptionTask
+from utils.run_log import RunLog
+
+
+def write_numbered_video(path, frame_count, size=(160, 120), fps=10):
+    """Uniform gray frames whose brightness is 8 * frame index, to tell frames apart after decoding."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, size)
+    for i in range(frame_count):
+        writer.write(np.full((size[1], size[0], 3), 8 * i, dtype=np.uint8))
+    writer.release()
+
+
+class LateSignDetector:
+    """Runs past the executor deadline and notes whether its frame changed meanwhile."""
+    frames_changed = []
+
+    def detect_tracked(self, ctx):
+        before = ctx.frame.copy()
+        time.sleep(0.1)
+        LateSignDetector.frames_changed.append(not np.array_equal(before, ctx.frame))
+        return False, False, [], None
+
+
+class NoLightDetector:
+    def detect_tracked(self, ctx):
+        return None, None, None
+
+
+class TestAutoDriver(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.video_path = os.path.join(cls.tmp.name, 'clip.avi')
+        write_test_video(cls.video_path, 30, size=(320, 240), fps=10)
+        cls.numbered_path = os.path.join(cls.tmp.name, 'numbered.avi')
+        write_numbered_video(cls.numbered_path, 30)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_run_log_records_capture_time(self):
+        path = os.path.join(self.tmp.name, 'run')
+        with AutoDriver(video_path=self.video_path, pipelined=False, vehicle=NullVehicle(),
+                        record_path=path, record_frames=False) as driver:
+            driver.start()
+        log = RunLog(path)
+        self.assertEqual(len(log), 30)
+        # Video position of each frame, not the time it was read at
+        for i, entry in enumerate(log):
+            self.assertAlmostEqual(entry.timestamp, i / 10)
+
+    def test_late_detector_keeps_its_frame(self):
+        LateSignDetector.frames_changed.clear()
+        driver = AutoDriver(video_path=self.numbered_path, pipelined=False, vehicle=NullVehicle())
+        driver.perception_executor = PerceptionExecutor([
+            PerceptionTask('stop_sign', LateSignDetector, 'detect_tracked'),
+            PerceptionTask('light', NoLightDetector, 'detect_tracked'),
+        ], mode='thread', deadline=0.01)
+        with driver:
+            driver.start()
+        self.assertGreater(driver.metrics.snapshot(window=False)['counters']['stop_sign_late'], 0)
+        self.assertTrue(LateSignDetector.frames_changed)
+        # The loop read the next frames into fresh arrays instead of the late detector's buffer
+        self.assertFalse(any(LateSignDetector.frames_changed))
+
+    def test_pipelined_perception_gets_capture_time(self):
+        seen = []
+        with AutoDriver(video_path=self.numbered_path, pipelined=True, vehicle=NullVehicle()) as driver:
+            perceive = driver._perceive
+
+            def record(frame, schedule, timestamp=None):
+                seen.append((int(round(frame.mean() / 8)), timestamp))
+                return perceive(frame, schedule, timestamp)
+            driver._perceive = record
+            driver.start()
+        self.assertGreater(len(seen), 5)
+        # The capture thread reads ahead, so the stamp must travel with the frame
+        for index, timestamp in seen:
+            self.assertAlmostEqual(timestamp, index / 10)
+
+    def test_pipelined_overlay_pairs_decision_with_its_perception(self):
+        decided, rendered = {}, []
+        with AutoDriver(video_path=self.video_path, pipelined=True, vehicle=NullVehicle()) as driver:
+            decide, render = driver._decide, driver._render
+
+            def record_decision(perception):
+                decision = decide(perception)
+                decided[id(perception)] = (perception, decision)
+                return decision
+
+            def record_render(frame, perception, decision=None):
+                rendered.append((perception, decision))
+                return render(frame, perception, decision)
+            driver._decide, driver._render = record_decision, record_render
+            driver.start()
+        self.assertEqual(len(rendered), driver.frame_counter)
+        for perception, decision in rendered:
+            if decision is not None:
+                self.assertIs(decided[id(perception)][1], decision)
+
+    def test_pipelined_records_end_to_end(self):
+        with AutoDriver(video_path=self.video_path, pipelined=True, vehicle=NullVehicle()) as driver:
+            driver.start()
+        timers = driver.metrics.snapshot(window=False)['timers']
+        self.assertGreater(timers['end_to_end']['count'], 0)
+        self.assertEqual(timers['end_to_end']['count'], timers['decision']['count'])
+
+
+if __name__ == '__main__':
+    unittest.main()
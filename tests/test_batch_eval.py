@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from batch_eval import evaluate, write_columns
+from perception.lane_detection import LaneDetector
+
+
+class TestBatchEval(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        model_dir = os.path.join(os.path.dirname(__file__), '../models')
+        lane = cv2.resize(cv2.imread(os.path.join(model_dir, 'lane/lane2.png')), (320, 240))
+        stop = cv2.resize(cv2.imread(os.path.join(model_dir, 'stop/stop1.png')), (320, 240))
+        self.frames = []
+        for i in range(10):
+            # Lane frames drifting sideways, then a stop sign
+            frame = stop if i >= 8 else np.roll(lane, 6 * i, axis=1)
+            self.frames.append(frame)
+            cv2.imwrite(os.path.join(self.tmp.name, f'{i:03d}.png'), frame)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_chunked_steering_matches_a_sequential_run(self):
+        detector = LaneDetector()
+        expected = [detector.detect(frame)[0] for frame in self.frames]
+        rows, _ = evaluate(self.tmp.name, workers=1, chunk_size=3, detectors=('lane',))
+        self.assertEqual([row['frame'] for row in rows], list(range(10)))
+        np.testing.assert_allclose([row['steering'] for row in rows], expected, rtol=0, atol=1e-9)
+
+    def test_process_pool_gives_the_same_results(self):
+        def strip_timings(rows):
+            return [{k: v for k, v in row.items() if not k.endswith('_ms')} for row in rows]
+
+        serial, _ = evaluate(self.tmp.name, workers=1, chunk_size=4)
+        parallel, _ = evaluate(self.tmp.name, workers=2, chunk_size=4)
+        self.assertEqual(strip_timings(parallel), strip_timings(serial))
+        self.assertTrue(any(row['is_stop_sign'] for row in serial))
+
+        path = os.path.join(self.tmp.name, 'results.npz')
+        write_columns(serial, path)
+        columns = np.load(path)
+        self.assertEqual(columns['stop_bbox'].shape, (10, 4))
+        self.assertTrue((columns['stop_bbox'][:8] == -1).all())
+        self.assertEqual(columns['steering'].dtype, np.float64)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from benchmarks.bench_perception import build_cases, compare, scale_sweep, stop_scale_policies, summarize, time_case
+
+
+class TestBenchPerception(unittest.TestCase):
+    def test_compare_flags_p50_and_p95_regressions(self):
+        baseline = {
+            'lane': {'p50_ms': 2.0, 'p95_ms': 3.0},
+            'sign': {'p50_ms': 10.0, 'p95_ms': 12.0},
+            'tracker': {'p50_ms': 0.002, 'p95_ms': 0.003},
+        }
+        results = {
+            'lane': {'p50_ms': 2.1, 'p95_ms': 4.0},  # p95 +33%
+            'sign': {'p50_ms': 12.0, 'p95_ms': 12.5},  # p50 +20%
+            'tracker': {'p50_ms': 0.004, 'p95_ms': 0.006},  # +100%, but only microseconds
+            'new_case': {'p50_ms': 1.0, 'p95_ms': 1.0},
+        }
+        self.assertEqual(compare(baseline, results, threshold=0.15),
+                         [('lane', 'p95_ms', 3.0, 4.0), ('sign', 'p50_ms', 10.0, 12.0)])
+        self.assertEqual(compare(baseline, results, threshold=0.5), [])
+
+    def test_cases_cover_every_cascade(self):
+        cases = build_cases(resolutions=['64x48'], contents=['synthetic_road'])
+        names = [case.name for case in cases]
+        for target in ('lane_full', 'lane_fast', 'sign_stop', 'sign_left', 'sign_right', 'sign_light', 'light',
+                       'signs_separate', 'signs_shared', 'cascades_separate', 'cascades_shared'):
+            self.assertIn(f'{target}/synthetic_road/64x48', names)
+        self.assertIn('decision/make_decision', names)
+
+        stats = summarize(time_case(cases[0], iterations=4, warmup=1))
+        self.assertEqual(stats['samples'], 4)
+        self.assertLessEqual(stats['min_ms'], stats['p50_ms'])
+        self.assertLessEqual(stats['p50_ms'], stats['p95_ms'])
+
+    def test_scale_sweep_reports_recall(self):
+        policies = stop_scale_policies()
+        results = scale_sweep({name: policies[name] for name in ('configured', 'near')}, iterations=1, warmup=0)
+        self.assertEqual(results['configured']['recall'], 1.0)
+        self.assertEqual(results['configured']['close_recall'], 1.0)
+        self.assertLess(results['near']['recall'], 1.0)  # Far signs are not searched for
+        self.assertEqual(results['near']['close_recall'], 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
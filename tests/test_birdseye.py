@@ -0,0 +1,92 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from perception.birdseye import BirdsEyeLaneDetector, BirdsEyeView
+from perception.lane_detection import LaneDetector
+
+FRAME_SIZE = (640, 480)
+
+
+def draw_ground_lines(view, offsets, curve=0.0):
+    """Camera frame of white lines at lateral offsets x0 + curve * y^2 (metres) on gray ground."""
+    frame = np.full((FRAME_SIZE[1], FRAME_SIZE[0], 3), 90, dtype=np.uint8)
+    y = np.linspace(0.3, 1.3, 60)
+    for offset in offsets:
+        points = view.ground_to_image(offset + curve * y ** 2, y, FRAME_SIZE)
+        cv2.polylines(frame, [np.rint(points).astype(np.int32)], False, (255, 255, 255), 5)
+    return frame
+
+
+class TestBirdsEyeView(unittest.TestCase):
+    def setUp(self):
+        self.view = BirdsEyeView()
+
+    def test_calibration_points_map_to_ground(self):
+        x, y = self.view.ground_points[:, 0], self.view.ground_points[:, 1]
+        np.testing.assert_allclose(self.view.ground_to_image(x, y, FRAME_SIZE),
+                                   self.view.image_points, atol=1e-3)
+        # Points scale with the frame size
+        np.testing.assert_allclose(self.view.ground_to_image(x, y, (320, 240)),
+                                   self.view.image_points / 2, atol=1e-3)
+
+    def test_warp_reads_only_the_roi(self):
+        frame = draw_ground_lines(self.view, (-0.2, 0.2))
+        mask = LaneDetector._white_mask(frame)
+        roi_top = self.view.roi_top(FRAME_SIZE)
+        self.assertGreater(roi_top, 0)
+
+        top_down = self.view.warp(mask[roi_top:], FRAME_SIZE)
+        self.assertEqual(top_down.shape[::-1], self.view.output_size)
+        # Same image as a full-frame warpPerspective into the top-down pixel grid
+        cols, rows = self.view.ground_to_pixel(self.view.ground_points[:, 0], self.view.ground_points[:, 1])
+        image_to_pixel = cv2.getPerspectiveTransform(self.view.image_points,
+                                                     np.float32(np.stack([cols, rows], axis=1)))
+        expected = cv2.warpPerspective(mask, image_to_pixel, self.view.output_size, flags=cv2.INTER_NEAREST)
+        self.assertLess(np.count_nonzero(top_down != expected), 0.01 * top_down.size)
+
+    def test_warp_cost_is_reported(self):
+        roi = np.zeros((FRAME_SIZE[1] - self.view.roi_top(FRAME_SIZE), FRAME_SIZE[0]), dtype=np.uint8)
+        for _ in range(3):
+            self.view.warp(roi, FRAME_SIZE)
+        stats = self.view.stats()
+        self.assertEqual(stats['frames'], 3)
+        self.assertGreater(stats['mean_ms'], 0)
+        self.assertGreaterEqual(stats['max_ms'], stats['mean_ms'])
+
+
+class TestBirdsEyeLaneDetector(unittest.TestCase):
+    def detect(self, frame, frames=15):
+        detector = BirdsEyeLaneDetector(view=BirdsEyeView())
+        for _ in range(frames):
+            steering, lines = detector.detect(frame)
+        return detector, steering, lines
+
+    def test_centered_straight_lane(self):
+        detector, steering, lines = self.detect(draw_ground_lines(BirdsEyeView(), (-0.2, 0.2)))
+        left_x, right_x = detector.lane_lines_ground(0.6)
+        self.assertAlmostEqual(left_x, -0.2, delta=0.01)
+        self.assertAlmostEqual(right_x, 0.2, delta=0.01)
+        self.assertAlmostEqual(steering, 0, delta=0.5)
+        self.assertEqual(len(lines), 2 * detector.n_windows)
+        # Only the first frame needed the full search
+        self.assertEqual(detector.full_searches, 2)
+
+    def test_offset_and_curved_lanes_steer_towards_the_center(self):
+        detector, steering, _ = self.detect(draw_ground_lines(BirdsEyeView(), (-0.1, 0.3)))
+        self.assertGreater(detector.curvature, 0)
+        self.assertGreater(steering, 0)
+
+        detector, steering, _ = self.detect(draw_ground_lines(BirdsEyeView(), (-0.2, 0.2), curve=-0.3))
+        self.assertLess(detector.curvature, 0)
+        self.assertLess(steering, 0)
+
+    def test_single_line_uses_lane_width(self):
+        detector, steering, _ = self.detect(draw_ground_lines(BirdsEyeView(), (-0.2,)))
+        self.assertIsNone(detector.lane_lines_ground(0.6)[1])
+        self.assertAlmostEqual(steering, 0, delta=0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
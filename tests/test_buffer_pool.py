@@ -0,0 +1,99 @@
+import os
+import tracemalloc
+import unittest
+
+import cv2
+import numpy as np
+
+from perception.frame_context import FrameContext
+from perception.lane_detection import LaneDetector
+from perception.traffic_light_detection import TrafficLightDetector
+from perception.traffic_sign_detection import TrafficSignDetector
+from utils.buffer_pool import BufferPool
+
+# Steady-state bytes a frame may allocate through Python/numpy; one 640x480 gray image is 300 KB
+MAX_FRAME_ALLOCATION = 64 * 1024
+
+
+class TestBufferPool(unittest.TestCase):
+    def test_named_buffers_are_reused(self):
+        pool = BufferPool()
+        first = pool.get('mask', (48, 64))
+        self.assertIs(pool.get('mask', (48, 64)).base, first.base)
+        # A smaller request is served from the same memory
+        smaller = pool.get('mask', (10, 10, 3))
+        self.assertTrue(np.shares_memory(smaller, first))
+        self.assertTrue(smaller.flags['C_CONTIGUOUS'])
+        pool.get('mask', (96, 64))
+        self.assertEqual(pool.stats()['allocations'], 2)
+
+    def test_leased_buffers(self):
+        pool = BufferPool()
+        a = pool.acquire((4, 4, 3))
+        b = pool.acquire((4, 4, 3))
+        self.assertFalse(np.shares_memory(a, b))
+        pool.release(a)
+        self.assertIs(pool.acquire((4, 4, 3)), a)
+
+    def test_disabled_pool_lets_opencv_allocate(self):
+        pool = BufferPool(enabled=False)
+        self.assertIsNone(pool.get('mask', (4, 4)))
+        self.assertIsNone(pool.acquire((4, 4)))
+        self.assertEqual(cv2.cvtColor(np.zeros((4, 4, 3), np.uint8), cv2.COLOR_BGR2GRAY,
+                                      dst=pool.get('gray', (4, 4))).shape, (4, 4))
+
+
+class TestSteadyStateAllocations(unittest.TestCase):
+    def setUp(self):
+        model_dir = os.path.join(os.path.dirname(__file__), '../models')
+        self.frames = [cv2.resize(cv2.imread(os.path.join(model_dir, path)), (640, 480))
+                       for path in ('stop/stop1.png', 'lane/lane2.png')]
+
+    def frame_allocations(self, pool, detectors, frames=10):
+        """Peak bytes allocated while processing one frame, after a warm-up."""
+        def process(frame):
+            ctx = FrameContext(frame, pool=pool)
+            detectors[0].detect(ctx)
+            detectors[1].detect_tracked(ctx)
+            detectors[2].detect_tracked(ctx)
+            ctx.release()
+
+        for i in range(4):
+            process(self.frames[i % 2])
+        tracemalloc.start()
+        try:
+            peaks = []
+            for i in range(frames):
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                process(self.frames[i % 2])
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        finally:
+            tracemalloc.stop()
+        return max(peaks)
+
+    def make_detectors(self, mode, enabled):
+        detectors = [LaneDetector(mode=mode), TrafficSignDetector('stop'), TrafficLightDetector()]
+        for detector in detectors:
+            detector.buffers = BufferPool(enabled)
+        detectors[2].sign_detector.buffers = BufferPool(enabled)
+        return detectors
+
+    def test_per_frame_allocations_stay_bounded(self):
+        for mode in ('full', 'fast'):
+            with self.subTest(mode=mode):
+                pool = BufferPool()
+                peak = self.frame_allocations(pool, self.make_detectors(mode, True))
+                self.assertLess(peak, MAX_FRAME_ALLOCATION)
+                # Every frame-sized array came from the pool
+                allocations = pool.stats()['allocations']
+                self.frame_allocations(pool, self.make_detectors(mode, True))
+                self.assertEqual(pool.stats()['allocations'], allocations)
+
+    def test_without_pool_frames_allocate(self):
+        peak = self.frame_allocations(BufferPool(enabled=False), self.make_detectors('full', False))
+        self.assertGreater(peak, MAX_FRAME_ALLOCATION)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import threading
+import time
+import unittest
+
+from control.control_loop import ControlLoop, steering_target
+from control.null_vehicle import NullVehicle
+
+
+def decision(action='forward', direction='right', strength=100):
+    return {'action': action, 'steering': 0.0, 'direction': direction, 'strength': strength}
+
+
+class TestControlLoop(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.vehicle = NullVehicle()
+        self.loop = ControlLoop(self.vehicle, rate=50, max_steering_rate=400, stale_timeout=1.0,
+                                clock=lambda: self.now)
+
+    def tick(self, count=1):
+        for _ in range(count):
+            self.now += 0.02
+            self.loop.step(self.now)
+
+    def test_steering_ramps_toward_target(self):
+        self.loop.submit(decision(direction='right', strength=100))
+        self.tick(5)
+        # 400 %/s at 50 Hz: 8 percent per tick
+        self.assertAlmostEqual(self.vehicle.steering_percent, 40)
+        self.assertEqual(self.vehicle.throttle, 'forward')
+        self.tick(20)
+        self.assertAlmostEqual(self.vehicle.steering_percent, 100)
+        self.loop.submit(decision(direction='left', strength=30))
+        self.tick(10)
+        self.assertAlmostEqual(self.vehicle.steering_percent, 20)
+        self.tick(10)
+        self.assertAlmostEqual(self.vehicle.steering_percent, -30)
+
+    def test_without_rate_limit_jumps_to_target(self):
+        self.loop.max_steering_rate = None
+        self.loop.submit(decision(direction='left', strength=160))
+        self.tick()
+        self.assertEqual(self.vehicle.steering_percent, -100)
+
+    def test_stop_is_applied_on_submit(self):
+        self.loop.submit(decision())
+        self.tick()
+        self.loop.submit(decision(action='stop', direction='straight', strength=0))
+        self.assertEqual(self.vehicle.throttle, 'neutral')
+        self.tick(3)
+        self.assertEqual(self.vehicle.throttle, 'neutral')
+        self.assertTrue(self.loop.stopped)
+
+    def test_stop_submitted_during_a_tick_wins(self):
+        self.loop.submit(decision())
+        self.tick()
+        get = self.loop.latest.get
+        submitter = threading.Thread(target=self.loop.submit,
+                                     args=(decision(action='stop', direction='straight', strength=0),))
+
+        def get_then_submit_stop():
+            item = get()
+            # The stop arrives right after the tick read the forward decision
+            submitter.start()
+            submitter.join(0.1)
+            return item
+        self.loop.latest.get = get_then_submit_stop
+        self.tick()
+        submitter.join()
+        self.assertEqual(self.vehicle.throttle, 'neutral')
+        self.assertTrue(self.loop.stopped)
+
+    def test_stale_decision_stops(self):
+        self.loop.submit(decision())
+        self.tick()
+        self.now += 1.5
+        self.tick()
+        self.assertEqual(self.vehicle.throttle, 'neutral')
+        self.assertEqual(self.loop.stale_stops, 1)
+        self.tick()
+        self.assertEqual(self.loop.stale_stops, 1)
+
+    def test_steering_target(self):
+        self.assertEqual(steering_target(decision(direction='straight', strength=0)), 0)
+        self.assertEqual(steering_target(decision(direction='left', strength=60)), -60)
+        self.assertEqual(steering_target(decision(direction='right', strength=150)), 100)
+
+
+class TestControlLoopThread(unittest.TestCase):
+    def test_ticks_at_fixed_rate(self):
+        vehicle = NullVehicle()
+        with ControlLoop(vehicle, rate=100) as loop:
+            loop.submit(decision(direction='right', strength=50))
+            time.sleep(0.2)
+        ticks = loop.ticks
+        time.sleep(0.05)
+        self.assertEqual(loop.ticks, ticks)
+        self.assertGreater(ticks, 5)
+        self.assertIsNone(loop.error)
+        self.assertGreater(vehicle.steering_percent, 0)
+        self.assertIn('ticks at 100 Hz', loop.summary())
+
+
+if __name__ == '__main__':
+    unittest.main()
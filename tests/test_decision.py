@@ -1,7 +1,8 @@
 import time
 import unittest
 
-from logic.decision import DecisionMaker, VehicleState
+from logic.decision import STOP_ELAPSED, STOP_SIGNAL, DecisionMaker, VehicleState
+from utils.telemetry import Telemetry
 
 
 class TestDecisionMaker(unittest.TestCase):
@@ -59,5 +60,52 @@ class TestDecisionMaker(unittest.TestCase):
         self.assertEqual(decision['action'], 'stop')
         self.assertEqual(self.decision_maker.current_state, VehicleState.STOPPED)
 
+class TestDecisionStateMachine(unittest.TestCase):
+    """make_decision(steering angle, stable stop sign, stable light) on a simulated clock."""
+    def setUp(self):
+        self.now = 0.0
+        self.transitions = []
+        self.decision_maker = DecisionMaker(clock=lambda: self.now, telemetry=Telemetry(enabled=False),
+                                            on_transition=self.transitions.append)
+
+    def test_stop_is_held_for_the_stop_duration_of_clock_time(self):
+        self.assertEqual(self.decision_maker.make_decision(10, False, None)['action'], 'forward')
+        self.now = 1.0
+        self.assertEqual(self.decision_maker.make_decision(10, True, None)['action'], 'stop')
+        self.assertTrue(self.decision_maker.waiting_for_stop_to_complete)
+        # Stopped for the full duration even when the sign is gone
+        self.now = 3.9
+        self.assertEqual(self.decision_maker.make_decision(10, False, 'green')['action'], 'stop')
+        self.now = 4.0
+        decision = self.decision_maker.make_decision(-20, True, None)
+        self.assertEqual(decision['action'], 'forward')
+        self.assertEqual(decision['steering'], -20)
+        self.assertEqual(self.decision_maker.current_state, VehicleState.NORMAL)
+        self.assertEqual([(t.time, t.previous, t.event, t.state) for t in self.transitions], [
+            (1.0, VehicleState.NORMAL, STOP_SIGNAL, VehicleState.STOPPED),
+            (4.0, VehicleState.STOPPED, STOP_ELAPSED, VehicleState.NORMAL),
+        ])
+
+    def test_red_and_yellow_lights_stop(self):
+        for light in ('red', 'yellow'):
+            self.decision_maker.reset()
+            self.assertEqual(self.decision_maker.make_decision(0, False, light)['action'], 'stop')
+        self.assertEqual(self.decision_maker.make_decision(0, False, 'green')['action'], 'stop')
+
+    def test_course_with_ten_stops_needs_no_wall_clock_time(self):
+        start = time.monotonic()
+        for frame in range(10 * 120):
+            self.now = frame / 30
+            self.decision_maker.make_decision(0, frame % 120 == 0, None)
+        self.assertEqual(len(self.transitions), 20)  # Every stop ends 90 frames later
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_missing_lane_keeps_last_steering(self):
+        self.decision_maker.make_decision(12, False, None)
+        decision = self.decision_maker.make_decision(None, False, None)
+        self.assertEqual(decision['steering'], 12)
+        self.assertEqual((decision['direction'], decision['strength']), ('right', 42))
+
+
 if __name__ == '__main__':
     unittest.main()
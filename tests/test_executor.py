@@ -0,0 +1,59 @@
+import functools
+import os
+import time
+import unittest
+
+import cv2
+
+from perception.executor import PerceptionExecutor, PerceptionTask
+from perception.traffic_light_detection import TrafficLightDetector
+from perception.traffic_sign_detection import TrafficSignDetector
+
+
+class SlowDetector:
+    def detect(self, frame):
+        time.sleep(0.3)
+        return 'slow'
+
+
+class TestPerceptionExecutor(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        image_path = os.path.join(os.path.dirname(__file__), '../models/stop/stop1.png')
+        cls.image = cv2.imread(image_path)
+        cls.expected = TrafficSignDetector('stop').detect(cls.image)
+
+    def make_tasks(self):
+        return [
+            PerceptionTask('stop_sign', functools.partial(TrafficSignDetector, 'stop'), 'detect'),
+            PerceptionTask('light', TrafficLightDetector, 'detect_by_sign_and_color'),
+        ]
+
+    def test_thread_mode_matches_serial(self):
+        with PerceptionExecutor(self.make_tasks(), mode='thread', deadline=5) as executor:
+            results = executor.run(self.image)
+        self.assertEqual(results['stop_sign'], self.expected)
+        self.assertIn('light', results)
+
+    def test_process_mode_matches_serial(self):
+        with PerceptionExecutor(self.make_tasks(), mode='process', deadline=10) as executor:
+            for _ in range(2):
+                results = executor.run(self.image)
+                self.assertEqual(tuple(results['stop_sign']), self.expected)
+        self.assertEqual(executor.stats['stop_sign']['completed'], 2)
+
+    def test_deadline_returns_finished_results(self):
+        tasks = self.make_tasks() + [PerceptionTask('slow', SlowDetector, 'detect')]
+        with PerceptionExecutor(tasks, mode='thread', deadline=5) as executor:
+            executor.run(self.image)  # Warm up
+            results = executor.run(self.image, deadline=0.2)
+            self.assertNotIn('slow', results)
+            self.assertIn('stop_sign', results)
+            # The slow detector is still busy on the next frame and gets skipped
+            executor.run(self.image, deadline=0.01)
+            self.assertGreaterEqual(executor.stats['slow']['late'], 1)
+            self.assertEqual(executor.stats['slow']['busy'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import threading
+import unittest
+
+import numpy as np
+
+from camera.frame_buffer import FrameRingBuffer
+
+
+class TestFrameRingBuffer(unittest.TestCase):
+    def make_frame(self, value):
+        return np.full((4, 6, 3), value, dtype=np.uint8)
+
+    def test_read_latest_returns_newest_frame(self):
+        buffer = FrameRingBuffer((4, 6, 3), size=4)
+        frame, seq, timestamp = buffer.read_latest()
+        self.assertIsNone(frame)
+        self.assertEqual(seq, -1)
+
+        for i in range(3):
+            buffer.put(self.make_frame(i), timestamp=float(i))
+
+        frame, seq, timestamp = buffer.read_latest()
+        self.assertEqual(seq, 2)
+        self.assertEqual(timestamp, 2.0)
+        self.assertTrue(np.all(frame == 2))
+        # Two older frames were never read
+        self.assertEqual(buffer.skipped_frames, 2)
+        self.assertEqual(buffer.unread_count(), 0)
+
+    def test_returned_frame_is_not_overwritten(self):
+        buffer = FrameRingBuffer((4, 6, 3), size=1)
+        buffer.put(self.make_frame(1), timestamp=0.0)
+        frame = buffer.read_latest().frame
+        buffer.put(self.make_frame(9), timestamp=1.0)
+        self.assertTrue(np.all(frame == 1))
+
+    def test_drop_oldest_policy(self):
+        buffer = FrameRingBuffer((4, 6, 3), size=2, drop_policy='drop_oldest')
+        for i in range(5):
+            self.assertTrue(buffer.put(self.make_frame(i), timestamp=float(i)))
+        self.assertEqual(buffer.dropped_frames, 3)
+
+        frame, seq, _ = buffer.read_next(timeout=0)
+        self.assertEqual(seq, 3)
+        self.assertTrue(np.all(frame == 3))
+
+    def test_block_policy(self):
+        buffer = FrameRingBuffer((4, 6, 3), size=2, drop_policy='block')
+        buffer.put(self.make_frame(0), timestamp=0.0)
+        buffer.put(self.make_frame(1), timestamp=1.0)
+        # Full: a put with a short timeout is rejected and counted
+        self.assertFalse(buffer.put(self.make_frame(2), timestamp=2.0, timeout=0.01))
+        self.assertEqual(buffer.dropped_frames, 1)
+
+        # A blocked producer resumes once the consumer reads
+        producer = threading.Thread(target=buffer.put, args=(self.make_frame(3), 3.0))
+        producer.start()
+        self.assertEqual(buffer.read_next(timeout=1).seq, 0)
+        producer.join(timeout=1)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual(buffer.read_latest().seq, 2)
+
+    def test_close_releases_waiters(self):
+        buffer = FrameRingBuffer((4, 6, 3), size=2)
+        waiter = threading.Thread(target=buffer.wait_for_newer, args=(-1,))
+        waiter.start()
+        buffer.close()
+        waiter.join(timeout=1)
+        self.assertFalse(waiter.is_alive())
+
+    def test_read_seq(self):
+        buffer = FrameRingBuffer((4, 6, 3), size=2)
+        for i in range(3):
+            buffer.put(self.make_frame(i), timestamp=float(i))
+        # Seq 0 was overwritten, seq 5 never arrives
+        self.assertIsNone(buffer.read_seq(0, timeout=0).frame)
+        self.assertIsNone(buffer.read_seq(5, timeout=0.01).frame)
+
+        frame, seq, timestamp = buffer.read_seq(1, timeout=0)
+        self.assertEqual((seq, timestamp), (1, 1.0))
+        self.assertTrue(np.all(frame == 1))
+        self.assertEqual(buffer.unread_count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import unittest
+
+import cv2
+import numpy as np
+
+from perception.frame_context import FrameContext, FrameContextStats
+from perception.lane_detection import LaneDetector
+from perception.traffic_light_detection import TrafficLightDetector
+from perception.traffic_sign_detection import TrafficSignDetector
+
+
+class TestFrameContext(unittest.TestCase):
+    def setUp(self):
+        image_path = os.path.join(os.path.dirname(__file__), '../models/stop/stop1.png')
+        self.image = cv2.imread(image_path)
+
+    def test_derivations_are_computed_once(self):
+        stats = FrameContextStats()
+        ctx = FrameContext(self.image, stats=stats)
+        self.assertIs(ctx.equalized_gray, ctx.equalized_gray)
+        self.assertIs(ctx.hsv, ctx.hsv)
+        self.assertIs(ctx.downscaled(2), ctx.downscaled(2))
+
+        counts = stats.snapshot()
+        self.assertEqual(counts['equalized_gray'], {'hits': 1, 'misses': 1})
+        self.assertEqual(counts['gray'], {'hits': 0, 'misses': 1})
+        self.assertEqual(counts['hsv'], {'hits': 1, 'misses': 1})
+        self.assertEqual(ctx.downscaled(2).shape[:2],
+                         (round(self.image.shape[0] / 2), round(self.image.shape[1] / 2)))
+
+    def test_derivations_match_direct_conversion(self):
+        ctx = FrameContext(self.image)
+        gray = cv2.equalizeHist(cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY))
+        np.testing.assert_array_equal(ctx.equalized_gray, gray)
+        np.testing.assert_array_equal(ctx.hsv_roi((10, 20, 30, 40)),
+                                      cv2.cvtColor(self.image[20:60, 10:40], cv2.COLOR_BGR2HSV))
+        ctx.hsv
+        np.testing.assert_array_equal(ctx.hsv_roi((10, 20, 30, 40)),
+                                      cv2.cvtColor(self.image, cv2.COLOR_BGR2HSV)[20:60, 10:40])
+
+    def test_detectors_accept_context(self):
+        stats = FrameContextStats()
+        ctx = FrameContext(self.image, stats=stats)
+        self.assertEqual(LaneDetector().detect(ctx), LaneDetector().detect(self.image))
+        self.assertEqual(TrafficSignDetector('stop').detect(ctx),
+                         TrafficSignDetector('stop').detect(self.image))
+        self.assertEqual(TrafficLightDetector().detect_by_sign_and_color(ctx),
+                         TrafficLightDetector().detect_by_sign_and_color(self.image))
+        # The light detector reused the equalized gray computed for the stop detector
+        self.assertGreaterEqual(stats.snapshot()['equalized_gray']['hits'], 1)
+
+    def test_yuv420_context_uses_y_plane_as_gray(self):
+        frame = cv2.resize(self.image, (640, 480))
+        yuv = cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420)
+        stats = FrameContextStats()
+        ctx = FrameContext.from_yuv420(yuv, stats=stats)
+        self.assertEqual(ctx.shape, (480, 640, 3))
+        self.assertTrue(np.shares_memory(ctx.gray, yuv))
+        TrafficSignDetector('stop').detect(ctx)
+        # The cascade ran on the Y plane without any color conversion
+        self.assertNotIn('frame', stats.snapshot())
+
+        np.testing.assert_array_equal(ctx.frame, cv2.cvtColor(yuv, cv2.COLOR_YUV2BGR_I420))
+        self.assertEqual(stats.snapshot()['frame'], {'hits': 0, 'misses': 1})
+
+    def test_gray_context(self):
+        gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        ctx = FrameContext.from_gray(gray)
+        self.assertIs(ctx.gray, gray)
+        self.assertEqual(ctx.frame.shape, gray.shape + (3,))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -103,5 +103,69 @@ class TestLaneDetector(unittest.TestCase):
         out.release()
         print(f"[✅] Detection video saved to: {output_path}")
 
+class TestFastLaneDetector(unittest.TestCase):
+    def setUp(self):
+        self.test_image_dir = os.path.join(os.path.dirname(__file__), '../models/lane')
+        self.images = [cv2.imread(os.path.join(self.test_image_dir, f))
+                       for f in sorted(os.listdir(self.test_image_dir)) if f.endswith('.png')]
+
+    def test_white_mask_matches_hsv_threshold(self):
+        for image in self.images:
+            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+            expected = cv2.inRange(hsv, np.array([0, 0, 200]), np.array([180, 30, 255]))
+            np.testing.assert_array_equal(LaneDetector._white_mask(image), expected)
+
+    def test_fast_mode_on_full_resolution_frames(self):
+        for image in self.images:
+            frame = cv2.resize(image, (640, 480))
+            steering_angle, lines = LaneDetector(mode='fast', fast_resolution=(160, 60)).detect(frame)
+            self.assertTrue(-45 <= steering_angle <= 45)
+            for x1, y1, x2, y2 in lines:
+                # Lines are mapped back to full-frame coordinates
+                self.assertEqual(y1, 480)
+                self.assertEqual(y2, int(480 * 0.6))
+
+    def test_fast_mode_agrees_with_full_mode(self):
+        frame = cv2.resize(self.images[-1], (640, 480))
+        full = LaneDetector(mode='full').detect(frame)[0]
+        fast = LaneDetector(mode='fast').detect(frame)[0]
+        self.assertLess(abs(full - fast), 3)
+
+
+class TestLaneFit(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        y1 = rng.integers(288, 480, 200)
+        y2 = rng.integers(288, 480, 200)
+        right = np.arange(200) % 2 == 0
+        x1 = np.where(right, 1.2 * y1 - 60, 700 - 1.2 * y1)
+        x2 = np.where(right, 1.2 * y2 - 60, 700 - 1.2 * y2)
+        self.lines = np.rint(np.stack([x1, y1, x2, y2], axis=1)).astype(np.int32).reshape(-1, 1, 4)
+
+    def test_split_lanes(self):
+        lines = np.array([[[0, 10, 10, 0]], [[0, 0, 10, 10]], [[5, 0, 5, 10]], [[0, 0, 10, 1]]])
+        left, right = LaneDetector._split_lanes(lines)
+        np.testing.assert_array_equal(left, [[0, 10, 10, 0]])
+        np.testing.assert_array_equal(right, [[0, 0, 10, 10]])
+        self.assertEqual(LaneDetector._split_lanes(None)[0].shape, (0, 4))
+
+    def test_uniform_fit_matches_polyfit(self):
+        detector = LaneDetector()
+        detector.length_weighted = False
+        detector.outlier_px = 0
+        left, _ = detector._split_lanes(self.lines)
+        poly = np.polyfit(left[:, [1, 3]].ravel(), left[:, [0, 2]].ravel(), deg=1)
+        np.testing.assert_allclose(detector._fit_segments(left), poly)
+
+    def test_outliers_are_rejected(self):
+        lines = self.lines.copy()
+        lines[::5, 0, 0] = 0  # Corrupt one segment in five, on both sides
+        left, right = LaneDetector._split_lanes(lines)
+        left_line = LaneDetector()._average_line(left, 480, 288)
+        right_line = LaneDetector()._average_line(right, 480, 288)
+        np.testing.assert_allclose(left_line, (124, 480, 354, 288), atol=2)
+        np.testing.assert_allclose(right_line, (516, 480, 285, 288), atol=2)
+
+
 if __name__ == '__main__':
     unittest.main()
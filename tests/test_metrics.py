@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+import unittest
+import urllib.request
+
+import numpy as np
+
+from utils.metrics import HttpExporter, JsonLinesExporter, LatencyHistogram, MetricsRegistry
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_quantiles_within_bucket_resolution(self):
+        samples = np.random.default_rng(0).lognormal(np.log(0.005), 0.6, 20000)
+        histogram = LatencyHistogram()
+        for value in samples:
+            histogram.record(value)
+        for q in (0.5, 0.95, 0.99):
+            self.assertAlmostEqual(histogram.quantile(q) / np.quantile(samples, q), 1, delta=0.05)
+        self.assertLessEqual(histogram.quantile(1.0), samples.max())
+        stats = histogram.summary()
+        self.assertEqual(stats['count'], 20000)
+        self.assertAlmostEqual(stats['mean_ms'], samples.mean() * 1000)
+        self.assertAlmostEqual(stats['max_ms'], samples.max() * 1000)
+
+    def test_fixed_memory(self):
+        histogram = LatencyHistogram()
+        size = len(histogram.total.counts)
+        for value in (0.0, 1e-9, 0.01, 1e6):
+            histogram.record(value)
+        self.assertEqual(len(histogram.total.counts), size)
+        self.assertEqual(histogram.total.counts[0], 2)
+        self.assertEqual(histogram.total.counts[-1], 1)
+
+    def test_window_reset_keeps_totals(self):
+        histogram = LatencyHistogram()
+        histogram.record(0.01)
+        histogram.reset_window()
+        histogram.record(0.002)
+        self.assertEqual(histogram.summary(window=True)['count'], 1)
+        self.assertAlmostEqual(histogram.summary(window=True)['max_ms'], 2.0)
+        self.assertEqual(histogram.summary()['count'], 2)
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_timers_and_counters(self):
+        metrics = MetricsRegistry()
+        with metrics.timer('lane'):
+            pass
+        metrics.record('lane', 0.004)
+        metrics.count('light_skipped')
+        metrics.count('light_skipped', 2)
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['timers']['lane']['count'], 2)
+        self.assertEqual(snapshot['counters'], {'light_skipped': 3})
+        # A window snapshot starts a new window, the totals keep counting
+        metrics.count('light_skipped')
+        self.assertEqual(metrics.snapshot()['counters'], {'light_skipped': 1})
+        self.assertEqual(metrics.snapshot()['timers']['lane']['count'], 0)
+        total = metrics.snapshot(window=False)
+        self.assertEqual(total['counters'], {'light_skipped': 4})
+        self.assertEqual(total['timers']['lane']['count'], 2)
+
+    def test_disabled_registry_records_nothing(self):
+        metrics = MetricsRegistry(enabled=False, snapshot_interval=0)
+        with metrics.timer('lane'):
+            pass
+        self.assertIs(metrics.timer('lane'), metrics.timer('light'))
+        metrics.record('lane', 0.1)
+        metrics.count('frames')
+        self.assertEqual(metrics.histograms, {})
+        self.assertEqual(metrics.counters, {})
+        self.assertIsNone(metrics.maybe_snapshot())
+
+    def test_periodic_snapshots_are_exported(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'metrics.jsonl')
+            metrics = MetricsRegistry(snapshot_interval=3600, exporters=[JsonLinesExporter(path)])
+            metrics.count('frames', 5)
+            self.assertIsNone(metrics.maybe_snapshot())
+            metrics.snapshot_interval = 0
+            self.assertEqual(metrics.maybe_snapshot()['counters'], {'frames': 5})
+            metrics.close()
+            metrics.close()
+            with open(path) as f:
+                lines = [json.loads(line) for line in f]
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[-1]['final'])
+        self.assertIn('fps', MetricsRegistry.format(lines[0]))
+
+    def test_http_exporter_serves_latest_snapshot(self):
+        exporter = HttpExporter(port=0)
+        try:
+            metrics = MetricsRegistry(snapshot_interval=0, exporters=[exporter])
+            metrics.record('decision', 0.001)
+            metrics.maybe_snapshot()
+            with urllib.request.urlopen(f"http://127.0.0.1:{exporter.port}/", timeout=5) as response:
+                snapshot = json.load(response)
+            self.assertEqual(snapshot['timers']['decision']['count'], 1)
+        finally:
+            exporter.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import random
+import unittest
+from collections import namedtuple
+
+from logic.perception_memory import MultiChannelTracker, PerceptionTracker
+
+Track = namedtuple('Track', ['id', 'hits', 'misses'])
+
+
+def naive_most_common(history, min_count):
+    """Recount the whole history; ties go to the value seen most recently."""
+    counts = {}
+    for value in history:
+        counts[value] = counts.get(value, 0) + 1
+    best = max(counts, key=lambda v: (counts[v], max(i for i, h in enumerate(history) if h == v)))
+    return best if best and counts[best] >= min_count else None
+
+
+class TestPerceptionTracker(unittest.TestCase):
+    def test_running_counts_match_a_recount(self):
+        rng = random.Random(0)
+        tracker = PerceptionTracker(history_size=5)
+        history = []
+        for _ in range(500):
+            value = rng.choice([None, None, 'red', 'green', 'yellow'])
+            tracker.update(value)
+            history = (history + [value])[-5:]
+            for min_count in (1, 2, 3):
+                self.assertEqual(tracker.most_common(min_count), naive_most_common(history, min_count))
+                self.assertEqual(tracker.recently_true(min_count), sum(1 for v in history if v) >= min_count)
+        self.assertEqual(tracker.state()['history'], history)
+
+    def test_time_window(self):
+        tracker = PerceptionTracker(history_size=None, window=1.0)
+        for t in (0.0, 0.3, 0.6):
+            tracker.update(True, timestamp=t)
+        self.assertTrue(tracker.recently_true(3))
+        tracker.update(False, timestamp=1.2)  # 0.0 leaves the window
+        self.assertFalse(tracker.recently_true(3))
+        self.assertEqual(tracker.state()['history'], [True, True, False])
+        tracker.update(False, timestamp=10.0)
+        self.assertEqual(tracker.state()['history'], [False])
+        self.assertEqual(tracker.counts, {False: [1, 1.0, 5]})
+
+    def test_weighted_votes(self):
+        tracker = PerceptionTracker(history_size=5)
+        tracker.update('red', confidence=0.9)
+        tracker.update('green', confidence=0.2)
+        tracker.update('green', confidence=0.3)
+        self.assertEqual(tracker.most_common(min_count=1), 'red')
+        self.assertIsNone(tracker.most_common(min_count=2))
+        self.assertTrue(tracker.recently_true(3, min_weight=1.4))
+        self.assertFalse(tracker.recently_true(3, min_weight=1.5))
+
+    def test_new_track_resets_votes(self):
+        tracker = PerceptionTracker(history_size=5)
+        for _ in range(3):
+            tracker.update(True, track=Track(1, 3, 0))
+        self.assertTrue(tracker.recently_true(3))
+        tracker.update(True, track=Track(2, 1, 0))
+        self.assertFalse(tracker.recently_true(2))
+        self.assertEqual(tracker.state()['track'], {'id': 2, 'hits': 1, 'misses': 0})
+
+    def test_dropped_track_is_not_confirmed(self):
+        tracker = PerceptionTracker(history_size=5)
+        for hits in (1, 2, 3):
+            tracker.update(True, track=Track(1, hits, 0))
+        self.assertTrue(tracker.track_confirmed())
+        tracker.update(False, track=None)  # The detector dropped the track
+        self.assertFalse(tracker.track_confirmed())
+        self.assertIsNone(tracker.state()['track'])
+        tracker.update(True, track=Track(2, 1, 0))
+        self.assertEqual(tracker.true_count, 1)
+
+    def test_votes_need_a_confirmed_track(self):
+        tracker = PerceptionTracker(history_size=5, require_track=True)
+        for hits in (1, 2, 3):
+            tracker.update('red', track=Track(1, hits, 0))
+        self.assertTrue(tracker.recently_true(3))
+        self.assertEqual(tracker.most_common(min_count=3), 'red')
+        # The object was missed: three votes are still in the history, but the track is not confirmed
+        tracker.update(None, track=Track(1, 3, 1))
+        self.assertFalse(tracker.recently_true(3))
+        self.assertIsNone(tracker.most_common(min_count=2))
+        tracker.update('red', track=Track(1, 4, 0))
+        self.assertTrue(tracker.recently_true(3))
+        # Without tracks nothing is ever confirmed
+        untracked = PerceptionTracker(history_size=5, require_track=True)
+        for _ in range(3):
+            untracked.update('red')
+        self.assertFalse(untracked.recently_true(3))
+
+
+class TestMultiChannelTracker(unittest.TestCase):
+    def test_matches_per_channel_trackers(self):
+        rng = random.Random(1)
+        channels = ('stop', 'red', 'green', 'left', 'right')
+        multi = MultiChannelTracker(channels, history_size=8)
+        singles = {channel: PerceptionTracker(history_size=8) for channel in channels}
+        for _ in range(300):
+            detections = {channel: round(rng.uniform(0.05, 1), 2) for channel in channels if rng.random() < 0.3}
+            multi.update(detections)
+            for channel in channels:
+                singles[channel].update(channel in detections, confidence=detections.get(channel, 1.0))
+            for channel in channels:
+                self.assertEqual(multi.count(channel), singles[channel].true_count)
+                self.assertAlmostEqual(multi.weight(channel), singles[channel].true_weight, places=4)
+        self.assertEqual(len(multi), 8)
+
+    def test_time_window_and_votes(self):
+        multi = MultiChannelTracker(('red', 'yellow', 'green'), history_size=16, window=0.5)
+        for t in (0.0, 0.1, 0.2):
+            multi.update({'red': True}, timestamp=t)
+        multi.update({'green': 0.5}, timestamp=0.3)
+        self.assertEqual(multi.most_common(min_count=3), 'red')
+        self.assertIsNone(multi.most_common(channels=('green', 'yellow'), min_count=1, min_weight=0.6))
+        multi.update({'green': True}, timestamp=0.65)  # 0.0 and 0.1 expire
+        self.assertEqual(multi.count('red'), 1)
+        self.assertIsNone(multi.most_common(min_count=3))
+        self.assertEqual(multi.most_common(min_count=2), 'green')
+
+    def test_clear_one_channel(self):
+        multi = MultiChannelTracker(('stop', 'left'), history_size=4)
+        for _ in range(6):
+            multi.update({'stop': True, 'left': True})
+        multi.clear('stop')
+        self.assertEqual(multi.count('stop'), 0)
+        self.assertEqual(multi.count('left'), 4)
+        multi.update({'stop': True})
+        self.assertEqual(multi.count('stop'), 1)
+        self.assertEqual(multi.count('left'), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import threading
+import unittest
+
+from utils.pipeline import LatestValue, PipelineStage, StageQueue
+
+
+class TestStageQueue(unittest.TestCase):
+    def test_drop_oldest(self):
+        q = StageQueue(maxsize=2, drop_policy='drop_oldest')
+        for i in range(4):
+            q.put(i)
+        self.assertEqual(q.dropped, 2)
+        self.assertEqual(q.take(timeout=0), (True, 2))
+        self.assertEqual(q.take(timeout=0), (True, 3))
+        self.assertEqual(q.take(timeout=0), (False, None))
+
+    def test_block_releases_on_close(self):
+        q = StageQueue(maxsize=1, drop_policy='block')
+        q.put(0)
+        self.assertFalse(q.put(1, timeout=0.01))
+        producer = threading.Thread(target=q.put, args=(2,))
+        producer.start()
+        q.close()
+        producer.join(timeout=1)
+        self.assertFalse(producer.is_alive())
+
+
+class TestLatestValue(unittest.TestCase):
+    def test_take_returns_newest_once(self):
+        latest = LatestValue()
+        latest.put('a')
+        latest.put('b')
+        self.assertEqual(latest.take(timeout=0), (True, 'b'))
+        self.assertEqual(latest.take(timeout=0), (False, None))
+        self.assertEqual(latest.get(), 'b')
+        self.assertEqual(latest.overwritten, 1)
+
+
+class TestPipelineStage(unittest.TestCase):
+    def test_stream_drains_through_stages(self):
+        items = iter(range(20))
+        q = StageQueue(maxsize=2, drop_policy='block')
+        results = []
+
+        def produce():
+            item = next(items, None)
+            if item is None:
+                return False
+            q.put(item)
+
+        source = PipelineStage('source', produce, outputs=[q])
+        sink = PipelineStage('sink', results.append, source=q)
+        source.start()
+        sink.start()
+        source.join(timeout=2)
+        sink.join(timeout=2)
+
+        self.assertEqual(results, list(range(20)))
+        self.assertEqual(sink.stats()['processed'], 20)
+
+    def test_error_stops_pipeline(self):
+        stop_event = threading.Event()
+
+        def fail():
+            raise RuntimeError("boom")
+
+        stage = PipelineStage('failing', fail, stop_event=stop_event)
+        stage.start()
+        stage.join(timeout=2)
+        self.assertTrue(stop_event.is_set())
+        self.assertIsInstance(stage.error, RuntimeError)
+
+
+if __name__ == '__main__':
+    unittest.main()
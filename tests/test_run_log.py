@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from replay import RunLogCapture, replay
+from utils.run_log import RunLog, RunRecorder, diff_logs
+
+
+def record_frames(path, frames, records=None, **kwargs):
+    with RunRecorder(path, info={'fps': 10, 'output_size': [frames[0].shape[1], frames[0].shape[0]]},
+                     **kwargs) as recorder:
+        for i, frame in enumerate(frames):
+            recorder.record(i + 1, i * 0.1, frame, records[i] if records else {'i': i})
+    return RunLog(path)
+
+
+class TestRunLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.frames = [np.full((6, 8, 3), i, dtype=np.uint8) for i in range(5)]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        records = [{'perception': {'stop_bbox': np.int32([1, 2, 3, 4]), 'angle': np.float64(i)}}
+                   for i in range(5)]
+        log = record_frames(self.tmp.name, self.frames, records)
+        self.assertEqual(len(log), 5)
+        self.assertEqual(log.header['frames'], 5)
+        self.assertIsInstance(log.frames, np.memmap)
+        entry = log[3]
+        self.assertEqual(entry.seq, 4)
+        self.assertAlmostEqual(entry.timestamp, 0.3)
+        np.testing.assert_array_equal(entry.frame, self.frames[3])
+        self.assertEqual(entry.record, {'perception': {'stop_bbox': [1, 2, 3, 4], 'angle': 3.0}})
+
+    def test_records_without_frames(self):
+        log = record_frames(self.tmp.name, self.frames, store_frames=False)
+        self.assertIsNone(log.frames)
+        self.assertIsNone(log.frame(0))
+        self.assertEqual(log.record(4), {'i': 4})
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, 'frames.bin')))
+
+    def test_truncated_log_stays_readable(self):
+        record_frames(self.tmp.name, self.frames)
+        frames_path = os.path.join(self.tmp.name, 'frames.bin')
+        with open(frames_path, 'r+b') as f:
+            f.truncate(os.path.getsize(frames_path) - 10)
+        log = RunLog(self.tmp.name)
+        self.assertEqual(len(log), 4)
+        np.testing.assert_array_equal(log.frame(3), self.frames[3])
+
+    def test_diff(self):
+        a = record_frames(os.path.join(self.tmp.name, 'a'), self.frames,
+                          [{'decision': {'action': 'forward', 'steering': 0.0}} for _ in range(5)])
+        records = [{'decision': {'action': 'forward', 'steering': 0.0}} for _ in range(4)]
+        records[2]['decision']['action'] = 'stop'
+        b = record_frames(os.path.join(self.tmp.name, 'b'), self.frames[:4], records)
+        self.assertEqual(diff_logs(a, b), [(2, 'decision', 'action', 'forward', 'stop'),
+                                           (4, 'frames', 'count', 5, 4)])
+        self.assertEqual(diff_logs(a, a), [])
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        model_dir = os.path.join(os.path.dirname(__file__), '../models')
+        images = [cv2.resize(cv2.imread(os.path.join(model_dir, path)), (320, 240))
+                  for path in ('lane/lane2.png', 'stop/stop1.png')]
+        frames = [images[i // 6 % 2] for i in range(24)]
+        self.source = record_frames(os.path.join(self.tmp.name, 'source'), frames)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_capture_plays_back_the_log(self):
+        capture = RunLogCapture(self.source)
+        buffer = np.empty((240, 320, 3), dtype=np.uint8)
+        ret, frame = capture.read(buffer)
+        self.assertTrue(ret)
+        self.assertIs(frame, buffer)
+        self.assertEqual(capture.get(cv2.CAP_PROP_FRAME_WIDTH), 320)
+        for _ in range(23):
+            capture.read()
+        self.assertAlmostEqual(capture.clock(), 2.3)
+        self.assertEqual(capture.read(), (False, None))
+
+    def test_replay_is_deterministic(self):
+        first, _ = replay(self.source.path, os.path.join(self.tmp.name, 'first'))
+        second, _ = replay(self.source.path, os.path.join(self.tmp.name, 'second'))
+        self.assertEqual(len(first), 24)
+        self.assertIsNone(first.frames)
+        self.assertEqual(diff_logs(first, second), [])
+        decided = [first.record(i) for i in range(len(first)) if 'decision' in first.record(i)]
+        self.assertTrue(decided)
+        # The stop sign frames were detected
+        self.assertTrue(any(record['perception']['is_stop_sign'] for record in decided))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+
+from logic.scheduler import DetectionScheduler
+
+CONFIG = {
+    'DETECTORS': {
+        'lane': {'INTERVAL': 1, 'MAX_INTERVAL': 1, 'BUDGET_MS': 10},
+        'stop_sign': {'INTERVAL': 5, 'ACTIVE_INTERVAL': 1, 'MAX_INTERVAL': 10, 'BUDGET_MS': 60},
+        'light': {'INTERVAL': 5, 'ACTIVE_INTERVAL': 2, 'MAX_INTERVAL': 15, 'BUDGET_MS': 60,
+                  'IDLE_THROTTLE': True},
+    },
+    'IDLE_RUNS': 2,
+    'LATENCY_EMA': 1.0,
+}
+
+
+class TestDetectionScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = DetectionScheduler(CONFIG)
+
+    def run_frames(self, name, start, count):
+        return [i for i in range(start, start + count) if self.scheduler.plan(i)[name].run]
+
+    def test_base_cadence(self):
+        self.assertEqual(self.run_frames('lane', 0, 10), list(range(10)))
+        self.scheduler = DetectionScheduler(CONFIG)
+        self.assertEqual(self.run_frames('stop_sign', 0, 11), [0, 5, 10])
+
+    def test_far_sign_boosts_stop_sign_rate(self):
+        self.scheduler.plan(0)
+        self.scheduler.observe('stop_sign', True, reason='far_sign')
+        decision = self.scheduler.plan(1)['stop_sign']
+        self.assertTrue(decision.run)
+        self.assertEqual(decision.reason, 'far_sign')
+
+        # Back to the base cadence after IDLE_RUNS empty runs
+        for _ in range(CONFIG['IDLE_RUNS']):
+            self.scheduler.observe('stop_sign', False)
+        self.assertEqual(self.scheduler.schedules['stop_sign'].interval, 5)
+
+    def test_idle_light_is_throttled(self):
+        for _ in range(CONFIG['IDLE_RUNS']):
+            self.scheduler.observe('light', False)
+        self.assertEqual(self.scheduler.schedules['light'].interval, 10)
+        for _ in range(CONFIG['IDLE_RUNS']):
+            self.scheduler.observe('light', False)
+        self.assertEqual(self.scheduler.schedules['light'].interval, 15)
+        self.assertEqual(self.scheduler.schedules['light'].reason, 'idle_throttle')
+
+        self.scheduler.observe('light', True, reason='light_seen')
+        self.assertEqual(self.scheduler.schedules['light'].interval, 2)
+
+    def test_over_budget_detector_slows_down(self):
+        self.scheduler.record_latency('stop_sign', 0.2)
+        self.scheduler.record_latency('stop_sign', 0.2)
+        schedule = self.scheduler.schedules['stop_sign']
+        self.assertEqual(schedule.interval, 7)
+        self.assertEqual(schedule.reason, 'over_budget')
+
+        self.scheduler.record_latency('stop_sign', 0.01)
+        self.assertEqual(schedule.interval, 6)
+        # Lane detection always runs every frame
+        self.scheduler.record_latency('lane', 1.0)
+        self.assertEqual(self.scheduler.schedules['lane'].interval, 1)
+
+    def test_latency_adaptation_can_be_disabled(self):
+        scheduler = DetectionScheduler(CONFIG, adapt_to_latency=False)
+        scheduler.record_latency('stop_sign', 0.2)
+        self.assertEqual(scheduler.schedules['stop_sign'].interval, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
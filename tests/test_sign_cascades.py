@@ -0,0 +1,48 @@
+import glob
+import os
+import unittest
+
+import cv2
+
+from perception.sign_cascades import SignCascades
+from perception.traffic_light_detection import TrafficLightDetector
+from perception.traffic_sign_detection import TrafficSignDetector
+
+
+class TestSignCascades(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.image_paths = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '../models/*/*.png')))
+        cls.images = [cv2.imread(path) for path in cls.image_paths]
+
+    def test_shared_pyramid_finds_the_same_signs(self):
+        # fine_step_scale=2.0 scans every level like detectMultiScale
+        cascades = SignCascades(shared=True, fine_step_scale=2.0)
+        stop_sign_detector, light_detector = TrafficSignDetector('stop'), TrafficLightDetector()
+        for path, image in zip(self.image_paths, self.images):
+            with self.subTest(image=path):
+                results, timings = cascades.detect_tracked(image)
+                self.assertEqual(results['stop_sign'], stop_sign_detector.detect_tracked(image))
+                self.assertEqual(results['light'], light_detector.detect_tracked(image))
+                self.assertGreater(timings['stop_sign'], 0)
+                self.assertGreater(timings['light'], 0)
+        self.assertEqual(cascades.shared_scans, len(self.images))
+
+    def test_separate_scans_without_sharing(self):
+        cascades = SignCascades(shared=False)
+        results, timings = cascades.detect_tracked(self.images[0])
+        self.assertEqual(set(results), {'stop_sign', 'light'})
+        self.assertEqual(set(timings), {'stop_sign', 'light'})
+        self.assertEqual(cascades.shared_scans, 0)
+
+    def test_single_cascade_scans_on_its_own(self):
+        cascades = SignCascades(shared=True)
+        stop = cv2.imread(os.path.join(os.path.dirname(__file__), '../models/stop/stop1.png'))
+        results, _ = cascades.detect_tracked(stop, cascades=['stop_sign'])
+        self.assertEqual(set(results), {'stop_sign'})
+        self.assertTrue(results['stop_sign'][0])
+        self.assertEqual(cascades.shared_scans, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import unittest
+
+import cv2
+import numpy as np
+
+from perception.lane_detection import LaneDetector
+from perception.sliding_window_lane import SlidingWindowLaneDetector
+
+
+def draw_lane(left_x, right_x, width=640, height=480):
+    """Gray road with two white 6 px lines; left_x/right_x map y to x."""
+    frame = np.full((height, width, 3), 90, dtype=np.uint8)
+    ys = np.arange(height // 2, height)
+    for line_x in (left_x, right_x):
+        points = np.stack([line_x(ys), ys], axis=1).astype(np.int32)
+        cv2.polylines(frame, [points], False, (255, 255, 255), 6)
+    return frame
+
+
+class TestSlidingWindowLaneDetector(unittest.TestCase):
+    def setUp(self):
+        self.frame = draw_lane(lambda y: 250 - 0.4 * (y - 288), lambda y: 420 + 0.4 * (y - 288))
+
+    def test_full_search_then_search_around_prior(self):
+        detector = SlidingWindowLaneDetector()
+        steering, lines = detector.detect(self.frame)
+        self.assertEqual(detector.full_searches, 2)
+        self.assertEqual(len(lines), 2 * detector.n_windows)
+        # Fits follow the drawn lines at the bottom and top of the ROI
+        self.assertAlmostEqual(detector._evaluate('left', 480), 250 - 0.4 * 192, delta=3)
+        self.assertAlmostEqual(detector._evaluate('right', 288), 420, delta=3)
+        # Lane center 335 → slightly right of the image center
+        self.assertGreater(steering, 0)
+
+        shifted = draw_lane(lambda y: 260 - 0.4 * (y - 288), lambda y: 430 + 0.4 * (y - 288))
+        detector.detect(shifted)
+        self.assertEqual(detector.full_searches, 2)
+        self.assertEqual(detector.prior_searches, 2)
+        self.assertAlmostEqual(detector._evaluate('left', 288), 260, delta=3)
+
+    def test_falls_back_to_full_search_when_lines_are_lost(self):
+        detector = SlidingWindowLaneDetector()
+        detector.detect(self.frame)
+        # Lines jump further than the search margin
+        moved = draw_lane(lambda y: 100 - 0.2 * (y - 288), lambda y: 560 + 0.2 * (y - 288))
+        detector.detect(moved)
+        self.assertEqual(detector.fallbacks, 2)
+        self.assertAlmostEqual(detector._evaluate('left', 288), 100, delta=3)
+
+        blank = np.full_like(self.frame, 90)
+        steering, lines = detector.detect(blank)
+        self.assertEqual(lines, [])
+        self.assertIsNone(detector.fits['left'])
+
+    def test_agrees_with_hough_engine(self):
+        image_path = os.path.join(os.path.dirname(__file__), '../models/lane/lane2.png')
+        frame = cv2.resize(cv2.imread(image_path), (640, 480))
+        hough = LaneDetector()
+        sliding = SlidingWindowLaneDetector()
+        for _ in range(10):
+            hough_steering, _ = hough.detect(frame)
+            sliding_steering, lines = sliding.detect(frame)
+        self.assertTrue(lines)
+        # Hough only finds the right line here and guesses the center from it; both turn left
+        self.assertLess(hough_steering, 0)
+        self.assertLess(sliding_steering, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import threading
+import unittest
+
+from logic.decision import DecisionMaker
+from utils.telemetry import DEBUG, INFO, WARNING, Telemetry
+
+
+class Formatted:
+    """Records the thread its message is formatted on."""
+    def __init__(self):
+        self.threads = []
+
+    def __format__(self, spec):
+        self.threads.append(threading.current_thread().name)
+        return 'formatted'
+
+
+class TestTelemetry(unittest.TestCase):
+    def setUp(self):
+        self.lines = []
+
+    def channel(self, **kwargs):
+        return Telemetry(emit=lambda level, text: self.lines.append((level, text)), **kwargs)
+
+    def test_formats_on_the_telemetry_thread(self):
+        telemetry = self.channel()
+        value = Formatted()
+        telemetry.publish('decision', "Decision: {value}", value=value)
+        telemetry.close()
+        self.assertEqual(value.threads, ['Telemetry'])
+        self.assertEqual(self.lines, [(INFO, "[decision] Decision: formatted")])
+
+    def test_repeats_are_rate_limited_and_counted(self):
+        telemetry = self.channel(rate_limit=60)
+        for i in range(5):
+            telemetry.publish('driving', "steering {steering}", steering=i)
+        telemetry.publish('stopping', "Stopping vehicle")
+        telemetry.close()
+        self.assertEqual([text for _, text in self.lines], [
+            "[driving] steering 0",
+            "[stopping] Stopping vehicle",
+            "[driving] steering 4 (x4 in 60s)",
+        ])
+        self.assertEqual(telemetry.stats(), {'published': 6, 'emitted': 3, 'suppressed': 4, 'dropped': 0})
+
+    def test_level_threshold(self):
+        telemetry = self.channel(level=INFO, rate_limit=0)
+        telemetry.publish('pwm', "duty {duty}", DEBUG, duty=Formatted())
+        telemetry.publish('capture_error', "Frame capture error: {error}", WARNING, error='timeout')
+        telemetry.close()
+        self.assertEqual(self.lines, [(WARNING, "[capture_error] Frame capture error: timeout")])
+        self.assertTrue(telemetry.enabled_for(INFO))
+        self.assertFalse(telemetry.enabled_for(DEBUG))
+
+    def test_disabled_channel_does_nothing(self):
+        telemetry = self.channel(enabled=False)
+        value = Formatted()
+        telemetry.publish('decision', "Decision: {value}", WARNING, value=value)
+        telemetry.close()
+        self.assertIsNone(telemetry._thread)
+        self.assertEqual(telemetry.published, 0)
+        self.assertEqual(telemetry.queue.depth(), 0)
+        self.assertEqual(value.threads, [])
+        self.assertEqual(self.lines, [])
+
+    def test_bad_template_is_still_emitted(self):
+        telemetry = self.channel()
+        telemetry.publish('decision', "Decision: {missing}", value=1)
+        telemetry.close()
+        self.assertIn("format error", self.lines[0][1])
+
+    def test_decision_maker_publishes(self):
+        telemetry = self.channel()
+        decision_maker = DecisionMaker(clock=lambda: 0.0, telemetry=telemetry)
+        decision_maker.make_decision(0, True, None)
+        telemetry.close()
+        self.assertEqual(self.lines, [(INFO, "[normal->stopped] Stop sign detected, initiating stop. "
+                                             "(normal -> stopped on stop_signal)")])
+
+
+if __name__ == '__main__':
+    unittest.main()
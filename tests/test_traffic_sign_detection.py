@@ -3,8 +3,10 @@ import os
 import unittest
 
 import cv2
+import numpy as np
 
-from perception.traffic_sign_detection import TrafficSignDetector
+from perception.traffic_sign_detection import MultiSignDetector, TrafficSignDetector, scale_policy
+from utils.config import MIN_STOP_SIGN_WIDTH
 
 
 class TestTrafficSignDetector(unittest.TestCase):
@@ -105,5 +107,132 @@ class TestTrafficSignDetector(unittest.TestCase):
         print(f"Video processed and saved to {output_path}")
 
 
+class TestMultiSignDetector(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.sign_types = ('stop', 'left', 'right')
+        # The 1 pixel stride beyond 2x downscaling reproduces detectMultiScale
+        cls.multi_detector = MultiSignDetector(sign_types=cls.sign_types, fine_step_scale=2.0)
+        cls.test_images = {
+            sign_type: glob.glob(os.path.join(os.path.dirname(__file__), f'../models/{sign_type}/*.png'))
+            for sign_type in cls.sign_types
+        }
+
+    @staticmethod
+    def iou(a, b):
+        ax, ay, aw, ah = a
+        bx, by, bw, bh = b
+        ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+        iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+        inter = ix * iy
+        return inter / float(aw * ah + bw * bh - inter)
+
+    def test_matches_single_cascade_detection(self):
+        multi_detector = MultiSignDetector(sign_types=self.sign_types + ('light',), fine_step_scale=2.0)
+        detectors = {sign_type: TrafficSignDetector(sign_type, tracked=False)
+                     for sign_type in multi_detector.detectors}
+        for image_path in sorted(glob.glob(os.path.join(os.path.dirname(__file__), '../models/*/*.png'))):
+            image = cv2.imread(image_path)
+            results = multi_detector.detect(image)
+            for sign_type, detector in detectors.items():
+                with self.subTest(image=image_path, sign_type=sign_type):
+                    self.assertEqual(results[sign_type], detector.detect(image))
+
+    def test_default_stride_finds_the_same_signs(self):
+        multi_detector = MultiSignDetector(sign_types=self.sign_types)
+        for sign_type in self.sign_types:
+            detector = TrafficSignDetector(sign_type)
+            for image_path in self.test_images[sign_type]:
+                with self.subTest(image=image_path):
+                    image = cv2.imread(image_path)
+                    expected = detector.detect(image)
+                    result = multi_detector.detect(image)[sign_type]
+                    self.assertEqual(result[:2], expected[:2])
+                    if expected[0]:
+                        self.assertGreater(self.iou(result[2], expected[2]), 0.7)
+
+    def test_follows_scale_policies(self):
+        near = TrafficSignDetector('stop', tracked=False,
+                                   policy=scale_policy('stop')._replace(near_only=True))
+        multi_detector = MultiSignDetector(sign_types=('stop',), detectors={'stop': near})
+        far = cv2.imread(os.path.join(os.path.dirname(__file__), '../models/stop/stop3.png'))  # 59 px sign
+        self.assertEqual(len(multi_detector.detect_all(far)['stop']), 0)
+        self.assertEqual(len(MultiSignDetector(sign_types=('stop',)).detect_all(far)['stop']), 1)
+
+    def test_detects_a_subset(self):
+        image = cv2.imread(self.test_images['stop'][0])
+        self.assertEqual(set(self.multi_detector.detect(image, sign_types=['stop'])), {'stop'})
+
+    def test_returns_every_sign_type(self):
+        image = cv2.imread(self.test_images['stop'][0])
+        results = self.multi_detector.detect(image)
+        self.assertEqual(set(results), set(self.sign_types))
+
+
+class TestTrackedSignDetector(unittest.TestCase):
+    def setUp(self):
+        image_path = os.path.join(os.path.dirname(__file__), '../models/stop/stop6.png')
+        self.image = cv2.imread(image_path)
+        self.detector = TrafficSignDetector('stop', tracked=True, redetect_interval=3, max_misses=2)
+
+    def test_track_continuity(self):
+        is_sign, _, bbox, track = self.detector.detect_tracked(self.image)
+        self.assertTrue(is_sign)
+        self.assertEqual(track.bbox, bbox)
+
+        for age in range(2, 6):
+            is_sign, _, bbox, next_track = self.detector.detect_tracked(self.image)
+            self.assertTrue(is_sign)
+            self.assertEqual(next_track.id, track.id)
+            self.assertEqual(next_track.age, age)
+        # One initial scan plus one scheduled re-detection, the rest were window searches
+        self.assertEqual(self.detector.full_scans, 2)
+        self.assertEqual(self.detector.window_scans, 3)
+
+    def test_track_is_dropped_after_misses(self):
+        track = self.detector.detect_tracked(self.image)[3]
+        blank = np.zeros_like(self.image)
+        self.assertEqual(self.detector.detect_tracked(blank)[3].misses, 1)
+        self.assertIsNone(self.detector.detect_tracked(blank)[3])
+
+        new_track = self.detector.detect_tracked(self.image)[3]
+        self.assertNotEqual(new_track.id, track.id)
+
+
+class TestScalePolicy(unittest.TestCase):
+    def setUp(self):
+        stop_dir = os.path.join(os.path.dirname(__file__), '../models/stop')
+        self.far = cv2.imread(os.path.join(stop_dir, 'stop3.png'))  # 59 px sign
+        self.near = cv2.imread(os.path.join(stop_dir, 'stop6.png'))  # 137 px sign
+        self.policy = scale_policy('stop')
+
+    def test_config_overrides_defaults(self):
+        config = {'DEFAULT': {'SCALE_FACTOR': 1.1, 'MIN_SIZE': [30, 30], 'MAX_SIZE': None, 'DOWNSCALE': 1.0,
+                              'NEAR_ONLY': False, 'NEAR_MARGIN': 0.8},
+                  'DETECTORS': {'stop': {'NEAR_ONLY': True, 'MAX_SIZE': [400, 400]}}}
+        policy = scale_policy('stop', config)
+        self.assertTrue(policy.near_only)
+        self.assertEqual((policy.min_size, policy.max_size), ((30, 30), (400, 400)))
+        self.assertEqual(scale_policy('left', config), policy._replace(near_only=False, max_size=None))
+
+    def test_near_only_skips_far_signs(self):
+        detector = TrafficSignDetector('stop', tracked=False, policy=self.policy._replace(near_only=True))
+        self.assertEqual(detector.scan_sizes()[0], (int(MIN_STOP_SIGN_WIDTH * 0.8),) * 2)
+        self.assertFalse(detector.detect(self.far)[0])
+        self.assertTrue(detector.detect(self.near)[1])
+
+    def test_downscale_reports_frame_coordinates(self):
+        expected = TrafficSignDetector('stop', tracked=False, policy=self.policy).detect(self.near)
+        detector = TrafficSignDetector('stop', tracked=False, policy=self.policy._replace(downscale=0.5))
+        is_sign, is_close, bbox = detector.detect(self.near)
+        self.assertTrue(is_sign and is_close)
+        self.assertGreater(TestMultiSignDetector.iou(bbox, expected[2]), 0.8)
+
+    def test_max_size_drops_large_signs(self):
+        detector = TrafficSignDetector('stop', tracked=False, policy=self.policy._replace(max_size=(100, 100)))
+        self.assertFalse(detector.detect(self.near)[0])
+        self.assertTrue(detector.detect(self.far)[0])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+
+from control.backends import SimulatedPigpio, create_backend
+from control.vehicle_control import VehicleController
+from utils.config import GPIO_CONFIG
+from utils.telemetry import Telemetry
+
+STEER = GPIO_CONFIG['STEER_PIN']
+THROTTLE = GPIO_CONFIG['THROTTLE_PIN']
+
+
+class TestVehicleController(unittest.TestCase):
+    def setUp(self):
+        self.pi = SimulatedPigpio()
+        self.car = VehicleController(telemetry=Telemetry(enabled=False), backend=self.pi)
+        # Construction centers the steering and sets neutral throttle
+        self.assertEqual([pin for pin, _ in self.duty_writes()], [STEER, THROTTLE])
+        self.pi.commands.clear()
+
+    def duty_writes(self):
+        return [(command.pin, command.duty) for command in self.pi.commands]
+
+    def test_unchanged_duty_is_not_sent(self):
+        for _ in range(10):
+            self.car.drive_forward()
+            self.car.adjust_steering('right', 50)
+        self.assertEqual(len(self.duty_writes()), 2)
+        self.assertEqual(self.car.skipped, 18)
+        self.car.adjust_steering('left', 50)
+        self.assertEqual(self.duty_writes()[-1][0], STEER)
+        self.assertEqual(len(self.duty_writes()), 3)
+
+    def test_batch_sends_last_value_per_pin(self):
+        with self.car.batch():
+            self.car.steering_center()
+            self.car.adjust_steering('right', 100)
+            self.car.adjust_steering('left', 30)
+            self.car.drive_forward()
+            self.assertEqual(self.duty_writes(), [])
+        self.assertEqual([pin for pin, _ in self.duty_writes()], [STEER, THROTTLE])
+        self.assertEqual(self.duty_writes()[0][1], self.car.applied[STEER])
+        self.assertEqual(self.car.coalesced, 1)  # Centering was a no-op, right was replaced by left
+
+    def test_batch_back_to_applied_value_sends_nothing(self):
+        with self.car.batch():
+            self.car.adjust_steering('right', 100)
+            self.car.steering_center()
+        self.assertEqual(self.duty_writes(), [])
+
+    def test_stop_is_immediate(self):
+        with self.car.batch():
+            self.car.drive_forward()
+            self.car.stop()
+            self.assertEqual(self.duty_writes(), [(STEER, 0), (THROTTLE, 0)])
+        self.assertEqual(len(self.duty_writes()), 2)
+        self.car.stop()
+        self.assertEqual(len(self.duty_writes()), 4)
+
+    def test_stats(self):
+        self.car.drive_forward()
+        self.car.drive_forward()
+        stats = self.car.stats()
+        self.assertEqual(stats['writes'], 3)  # Including the two at construction
+        self.assertEqual(stats['skipped'], 1)
+        self.assertGreater(stats['writes_per_sec'], 0)
+        self.assertIn('pigpio writes', self.car.summary())
+
+
+class TestSimulatedPigpio(unittest.TestCase):
+    def test_records_commands_with_simulated_latency(self):
+        now = [0.0]
+        delays = []
+
+        def sleep(seconds):
+            delays.append(seconds)
+            now[0] += seconds
+
+        pi = SimulatedPigpio(latency=0.001, jitter=0.0005, seed=1, clock=lambda: now[0], sleep=sleep)
+        car = VehicleController(telemetry=Telemetry(enabled=False), backend=pi)
+        car.drive_forward()
+        car.adjust_steering('left', 40)
+        self.assertEqual([command.pin for command in pi.commands], [STEER, THROTTLE, THROTTLE, STEER])
+        self.assertEqual(pi.duty[STEER], car.applied[STEER])
+        self.assertEqual(pi.frequency[STEER], 50)
+        # setup_gpio makes 4 calls, every call waits latency + up to jitter
+        self.assertEqual(len(delays), 8)
+        self.assertTrue(all(0.001 <= delay <= 0.0015 for delay in delays))
+        self.assertEqual(pi.commands[1].time, pi.commands[0].time + pi.commands[0].latency)
+        self.assertAlmostEqual(pi.command_rate(), 3 / (pi.commands[-1].time - pi.commands[0].time))
+        car.__exit__(None, None, None)
+        self.assertFalse(pi.connected)
+
+    def test_create_backend(self):
+        self.assertIsInstance(create_backend('simulated'), SimulatedPigpio)
+        with self.assertRaises(ValueError):
+            create_backend('gpiozero')
+
+
+if __name__ == '__main__':
+    unittest.main()
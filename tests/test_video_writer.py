@@ -0,0 +1,102 @@
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from utils.pipeline import StageQueue
+from utils.video_writer import AsyncVideoWriter
+
+
+class RecordingWriter:
+    """Stands in for cv2.VideoWriter: keeps a copy of every frame, optionally slow."""
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.frames = []
+        self.threads = set()
+        self.released = False
+
+    def write(self, image):
+        time.sleep(self.delay)
+        self.frames.append(image.copy())
+        self.threads.add(threading.current_thread().name)
+
+    def release(self):
+        self.released = True
+
+
+def frame(value):
+    return np.full((4, 6, 3), value, dtype=np.uint8)
+
+
+class TestAsyncVideoWriter(unittest.TestCase):
+    def test_frames_are_copied_and_written_in_order(self):
+        writer = RecordingWriter()
+        with AsyncVideoWriter(writer, queue_size=4, drop_policy='block') as video:
+            buffer = frame(0)
+            for i in range(10):
+                buffer[:] = i  # The caller reuses its buffer at once
+                video.write(buffer)
+        self.assertTrue(writer.released)
+        self.assertEqual([int(f[0, 0, 0]) for f in writer.frames], list(range(10)))
+        self.assertNotIn(threading.current_thread().name, writer.threads)
+        # Slots are recycled rather than allocated per frame
+        self.assertLessEqual(video.slots.stats()['allocations'], 4 + 2)
+
+    def test_render_draws_on_the_writer_thread(self):
+        writer = RecordingWriter()
+        render_threads = []
+
+        def render(image):
+            render_threads.append(threading.current_thread().name)
+            image[0, 0] = 255
+            return image
+
+        source = frame(7)
+        with AsyncVideoWriter(writer) as video:
+            video.write(source, render)
+        self.assertEqual(render_threads, ['Stage-writer'])
+        self.assertEqual(int(writer.frames[0][0, 0, 0]), 255)
+        self.assertEqual(int(source[0, 0, 0]), 7)
+
+    def test_drop_oldest_keeps_the_caller_fast(self):
+        writer = RecordingWriter(delay=0.02)
+        video = AsyncVideoWriter(writer, queue_size=2, drop_policy='drop_oldest')
+        for i in range(20):
+            video.write(frame(i))
+        self.assertLess(video.stats()['max_write_ms'], 20)
+        video.release()
+
+        stats = video.stats()
+        self.assertGreater(stats['dropped'], 0)
+        self.assertEqual(stats['written'] + stats['dropped'], 20)
+        self.assertEqual(stats['depth'], 0)
+        # The newest frame always survives and is flushed on release
+        self.assertEqual(int(writer.frames[-1][0, 0, 0]), 19)
+
+    def test_inline_mode_and_release(self):
+        writer = RecordingWriter()
+        video = AsyncVideoWriter(writer, threaded=False)
+        self.assertTrue(video.write(frame(1)))
+        self.assertEqual(len(writer.frames), 1)
+        self.assertEqual(writer.threads, {threading.current_thread().name})
+        video.release()
+        video.release()
+        self.assertTrue(writer.released)
+        self.assertFalse(video.write(frame(2)))
+        self.assertEqual(len(writer.frames), 1)
+
+
+class TestStageQueueOnDrop(unittest.TestCase):
+    def test_dropped_items_are_reported(self):
+        dropped = []
+        q = StageQueue(maxsize=2, drop_policy='drop_oldest', on_drop=dropped.append)
+        for i in range(4):
+            q.put(i)
+        q.close()
+        q.put(4)
+        self.assertEqual(dropped, [0, 1, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
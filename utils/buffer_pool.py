@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 17:05:12
+@Path: /utils/buffer_pool.py
+"""
+
+
+import threading
+
+import numpy as np
+
+
+class BufferPool:
+    """Preallocated arrays reused from frame to frame, passed to OpenCV as dst=.
+
+    get(name, shape) is for scratch images owned by one component (a detector's masks, the
+    display frame): it returns the same memory every call, growing only when a larger shape
+    is asked for. acquire()/release() lease arrays to short-lived owners such as a
+    FrameContext, which hands them back once no detector reads the frame any more.
+    A disabled pool returns None everywhere, so OpenCV allocates a fresh array as usual.
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._named = {}
+        self._free = {}
+        self._lock = threading.Lock()
+        self.allocations = 0
+        self.reuses = 0
+        self.allocated_bytes = 0
+
+    def get(self, name, shape, dtype=np.uint8):
+        """Contiguous array of shape/dtype backed by the named buffer. Contents are undefined."""
+        if not self.enabled:
+            return None
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        with self._lock:
+            backing = self._named.get(name)
+            if backing is None or backing.nbytes < nbytes:
+                backing = self._named[name] = self._allocate(nbytes)
+            else:
+                self.reuses += 1
+        return backing[:nbytes].view(dtype).reshape(shape)
+
+    def acquire(self, shape, dtype=np.uint8):
+        """Lease an array of exactly shape/dtype until release()."""
+        if not self.enabled:
+            return None
+        key = (tuple(shape), np.dtype(dtype))
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                self.reuses += 1
+                return free.pop()
+            return self._allocate(int(np.prod(shape)) * key[1].itemsize).view(key[1]).reshape(shape)
+
+    def release(self, array):
+        if array is None or not self.enabled:
+            return
+        with self._lock:
+            self._free.setdefault((array.shape, array.dtype), []).append(array)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'allocations': self.allocations,
+                'reuses': self.reuses,
+                'allocated_mb': self.allocated_bytes / 2 ** 20,
+                'free': sum(len(free) for free in self._free.values()),
+            }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"{stats['allocations']} allocations ({stats['allocated_mb']:.1f} MB), "
+                f"{stats['reuses']} reuses")
+
+    def _allocate(self, nbytes):
+        self.allocations += 1
+        self.allocated_bytes += nbytes
+        return np.empty(nbytes, dtype=np.uint8)
@@ -32,4 +32,147 @@ STEERING_CONFIG = {
     'MAX_DUTY_DIFF': 11
 }
 
-MIN_STOP_SIGN_WIDTH = 130 # Minimum width of stop sign to be considered close
\ No newline at end of file
+ACTUATOR_CONFIG = {
+    'BACKEND': 'pigpio', # 'pigpio' drives the car, 'simulated' records commands without hardware
+    'SIM_LATENCY': 0.0005, # Seconds per simulated pigpiod round trip
+    'SIM_JITTER': 0.0002 # Random extra delay per simulated call, up to this many seconds
+}
+
+CONTROL_LOOP_CONFIG = {
+    'ENABLED': False, # Apply decisions from a fixed-rate control thread instead of once per perception cycle
+    'RATE': 50, # Control ticks per second, PWM_CONFIG['FREQUENCY'] is the useful maximum
+    'MAX_STEERING_RATE': 400, # Steering change per second in percent (-100..100), None to jump to the target
+    'STALE_TIMEOUT': 1.0 # Stop when perception has not delivered a decision for this many seconds, None to never
+}
+
+MIN_STOP_SIGN_WIDTH = 130 # Minimum width of stop sign to be considered close
+
+CAPTURE_CONFIG = {
+    'THREADED': True, # Capture on a background thread into a ring buffer
+    'BUFFER_SIZE': 4, # Number of preallocated frame slots
+    'DROP_POLICY': 'drop_oldest', # 'drop_oldest' or 'block'
+    'READ_TIMEOUT': 1.0, # Seconds capture_frame() waits for a new frame
+    'DUAL_STREAM': False, # Perception on the lores stream, the main stream only for recording
+    'MAIN_SIZE': (1280, 960), # Recording resolution in dual-stream mode
+    'LORES_SIZE': (640, 480), # Perception resolution; detector thresholds are tuned for 640x480
+    'LORES_FORMAT': 'YUV420' # 'YUV420', or 'Y' to keep only the luma plane (no color for the light detector)
+}
+
+BUFFER_POOL_CONFIG = {
+    'ENABLED': True # Reuse preallocated frame-sized arrays (dst=) instead of allocating per frame
+}
+
+PIPELINE_CONFIG = {
+    'ENABLED': False, # Run capture, perception, control and output on separate threads
+    'QUEUE_SIZE': 2, # Frames waiting for perception
+    'OUTPUT_QUEUE_SIZE': 8, # Frames waiting for overlay + VideoWriter
+    'STATS_INTERVAL': 5.0 # Seconds between per-stage throughput log lines
+}
+
+RECORDING_CONFIG = {
+    'ASYNC': True, # Encode the output video on a background thread
+    'QUEUE_SIZE': 8, # Frames waiting for the encoder
+    'DROP_POLICY': 'drop_oldest' # When the encoder falls behind on the camera; video files always use 'block'
+}
+
+RUN_LOG_CONFIG = {
+    'ENABLED': False, # Record frames, perception and decisions to output/run_<time>/ for replay.py
+    'FRAMES': True # Store raw frames; without them a log can be diffed but not replayed
+}
+
+METRICS_CONFIG = {
+    'ENABLED': True, # Per-stage latency histograms and skip/drop counters
+    'SNAPSHOT_INTERVAL': 10.0, # Seconds between metrics log lines / exports
+    'EXPORT_PATH': None, # Append every snapshot as a JSON line to this file
+    'HTTP_PORT': None # Serve the latest snapshot as JSON on http://127.0.0.1:<port>/
+}
+
+TELEMETRY_CONFIG = {
+    'ENABLED': True, # Status messages from the control path, formatted and printed on a background thread
+    'LEVEL': 'INFO', # 'DEBUG' adds per-command PWM values and per-frame actuation
+    'RATE_LIMIT': 1.0, # Seconds between two messages of the same kind; repeats are counted
+    'QUEUE_SIZE': 1024 # Messages waiting for the telemetry thread; the oldest is dropped when full
+}
+
+PERCEPTION_MEMORY_CONFIG = {
+    'HISTORY_SIZE': 5, # Detector results the stop sign / light votes are taken over
+    'WINDOW': None, # Seconds of capture time to vote over instead, independent of frame rate and cadence
+    'MULTI_HISTORY_SIZE': 64 # Rows kept by MultiChannelTracker
+}
+
+PERCEPTION_EXECUTOR_CONFIG = {
+    'MODE': 'thread', # 'serial', 'thread' or 'process' for the stop sign / traffic light detectors
+    'DEADLINE': 0.15 # Seconds to wait for the parallel detectors on each frame
+}
+
+TRACKING_CONFIG = {
+    'ENABLED': False, # Search around the previous sign/light bbox instead of the full frame
+    'REDETECT_INTERVAL': 10, # Full-frame scan at least every N detections
+    'SEARCH_MARGIN': 0.5, # Window expansion around the previous bbox, relative to its size
+    'SCALE_TOLERANCE': 0.3, # Allowed size change relative to the previous bbox
+    'MAX_MISSES': 2 # Consecutive misses before a track is dropped
+}
+
+SIGN_SCALE_CONFIG = {
+    # Image pyramid of each sign cascade; DETECTORS entries override DEFAULT per sign type.
+    # SCALE_FACTOR: ratio between pyramid levels, MIN_SIZE/MAX_SIZE: (w, h) in frame pixels (MAX_SIZE None: no limit),
+    # DOWNSCALE: resize the frame by this factor before detection (1.0: full resolution),
+    # NEAR_ONLY: skip the levels for signs narrower than NEAR_MARGIN * MIN_STOP_SIGN_WIDTH, which never cause a stop
+    'DEFAULT': {'SCALE_FACTOR': 1.1, 'MIN_SIZE': (30, 30), 'MAX_SIZE': None, 'DOWNSCALE': 1.0,
+                'NEAR_ONLY': False, 'NEAR_MARGIN': 0.8},
+    'DETECTORS': {
+        'stop': {},
+        'light': {},
+        'left': {},
+        'right': {},
+    },
+    # SHARED_PYRAMID: run the serial loop's full-frame stop sign and light scans on one MultiSignDetector pyramid.
+    # Off by default: faster only with FINE_STEP_SCALE above 2.0, which changes the detections (see MultiSignDetector)
+    'SHARED_PYRAMID': False,
+    'FINE_STEP_SCALE': 4.0 # Shared pyramid levels scaled down by at least this get a 1 pixel stride, 2.0 reproduces detectMultiScale
+}
+
+SCHEDULER_CONFIG = {
+    'DETECTORS': {
+        # INTERVAL: frames between runs, ACTIVE_INTERVAL: while the detector sees something,
+        # MAX_INTERVAL: upper bound when idle or over budget, BUDGET_MS: latency budget
+        'lane': {'INTERVAL': 1, 'MAX_INTERVAL': 1, 'BUDGET_MS': 10},
+        'stop_sign': {'INTERVAL': 5, 'ACTIVE_INTERVAL': 1, 'MAX_INTERVAL': 10, 'BUDGET_MS': 60},
+        'light': {'INTERVAL': 5, 'ACTIVE_INTERVAL': 2, 'MAX_INTERVAL': 15, 'BUDGET_MS': 60,
+                  'IDLE_THROTTLE': True},
+    },
+    'IDLE_RUNS': 3, # Empty runs before a detector falls back from its active cadence
+    'LATENCY_EMA': 0.2 # Smoothing factor for measured detector latency
+}
+
+LANE_CONFIG = {
+    'ENGINE': 'hough', # 'hough': Canny + HoughLinesP every frame, 'sliding_window': track the lines across frames,
+                       # 'birdseye': sliding window on a top-down view with pure-pursuit steering
+    'MODE': 'full', # 'full': HSV threshold on the whole frame, 'fast': downsampled ROI only
+    'FAST_RESOLUTION': (160, 60), # (width, height) of the lane ROI in fast mode
+    'FAST_INTERPOLATION': 'linear', # 'linear', or 'area' (smoother but ~10x slower)
+    'ROI_START': 0.6, # Lane ROI starts at this fraction of the frame height
+    'FIT_WEIGHTING': 'length', # 'length': longer Hough segments weigh more, 'uniform': every endpoint counts once
+    'OUTLIER_PX': 40, # Refit without segments this far (px) from the first fit, 0 disables
+    'SMOOTHING': 0.8 # Weight of the previous angle in the steering EMA of every lane engine
+}
+
+SLIDING_WINDOW_CONFIG = {
+    'N_WINDOWS': 9, # Windows stacked over the lane ROI
+    'WINDOW_MARGIN': 0.08, # Half window width, fraction of the frame width
+    'SEARCH_MARGIN': 0.06, # Search band around the previous fit, fraction of the frame width
+    'MIN_PIXELS': 30, # White pixels needed to recenter a window / count a band as covered
+    'MIN_FIT_PIXELS': 60, # White pixels needed to fit a line
+    'MIN_CONFIDENCE': 0.4, # Fraction of covered bands below which the full search runs again
+    'MAX_LINE_WIDTH': 0.05, # Wider white areas are not lane lines, fraction of the frame width
+    'LANE_OFFSET': 0.16 # Lane center offset from a single visible line, fraction of the frame width
+}
+
+BIRDSEYE_CONFIG = {
+    'CALIBRATION': 'models/birdseye_calibration.json', # Four image points <-> ground points (m), relative to the repo root
+    'INTERPOLATION': 'nearest', # Remap of the lane mask: 'nearest' or 'linear'
+    'LOOKAHEAD': 0.6, # Pure-pursuit target distance (m)
+    'WHEELBASE': 0.26, # Front to rear axle (m)
+    'LANE_WIDTH': 0.4, # Line spacing (m), to place the center from a single visible line
+    'MAX_LINE_WIDTH': 0.06 # Wider white areas on the ground are not lane lines (m)
+}
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 20:31:05
+@Path: /utils/metrics.py
+"""
+
+
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _Distribution:
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, index, value):
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+
+class LatencyHistogram:
+    """Fixed-memory latency histogram with log-spaced buckets.
+
+    Bucket edges grow by `growth` from `low` to `high` seconds, so quantiles are accurate to
+    about (growth - 1) relative error whatever the number of samples. Samples are counted
+    twice: since creation and since the last window reset, for periodic snapshots.
+    """
+    def __init__(self, low=1e-6, high=100.0, growth=1.05):
+        self.low = low
+        self.growth = growth
+        self._scale = 1 / math.log(growth)
+        # Bucket 0 holds samples below low, the last bucket samples above high
+        self.size = int(math.ceil(math.log(high / low) * self._scale)) + 2
+        self.total = _Distribution(self.size)
+        self.window = _Distribution(self.size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        if seconds < self.low:
+            index = 0
+        else:
+            index = min(int(math.log(seconds / self.low) * self._scale) + 1, self.size - 1)
+        with self._lock:
+            self.total.add(index, seconds)
+            self.window.add(index, seconds)
+
+    def quantile(self, q, window=False):
+        """Approximate q-quantile in seconds (geometric middle of its bucket, capped at the max)."""
+        dist = self.window if window else self.total
+        if dist.count == 0:
+            return 0.0
+        rank = q * dist.count
+        seen = 0
+        for index, count in enumerate(dist.counts):
+            seen += count
+            if seen >= rank and count:
+                if index == 0:
+                    return min(self.low, dist.max)
+                return min(self.low * self.growth ** (index - 0.5), dist.max)
+        return dist.max
+
+    def summary(self, window=False):
+        """count, mean and max in ms, plus p50/p95/p99 in ms."""
+        with self._lock:
+            dist = self.window if window else self.total
+            stats = {
+                'count': dist.count,
+                'mean_ms': dist.sum / dist.count * 1000 if dist.count else 0.0,
+                'max_ms': dist.max * 1000,
+            }
+            for q in QUANTILES:
+                stats[f'p{int(q * 100)}_ms'] = self.quantile(q, window) * 1000
+        return stats
+
+    def reset_window(self):
+        with self._lock:
+            self.window = _Distribution(self.size)
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.histogram.record(time.perf_counter() - self.start)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """Per-stage latency histograms and event counters, on the monotonic perf_counter clock.
+
+    with metrics.timer('lane'): ... or metrics.record('lane', seconds) feeds a histogram,
+    metrics.count('video_dropped') a counter. maybe_snapshot() returns (and hands to the
+    exporters) a snapshot of the last interval every snapshot_interval seconds. A disabled
+    registry returns a shared no-op timer and ignores everything else.
+    """
+    def __init__(self, enabled=True, snapshot_interval=10.0, exporters=()):
+        self.enabled = enabled
+        self.snapshot_interval = snapshot_interval
+        self.exporters = list(exporters)
+        self.histograms = {}
+        self.counters = {}
+        self._window_counters = {}
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self._window_start = self.started
+
+    def timer(self, name):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.histogram(name))
+
+    def record(self, name, seconds):
+        if self.enabled:
+            self.histogram(name).record(seconds)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+            self._window_counters[name] = self._window_counters.get(name, 0) + n
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def snapshot(self, window=True):
+        """Stats since the last window snapshot (window=True, which starts a new window) or since start."""
+        now = time.perf_counter()
+        with self._lock:
+            counters = dict(self._window_counters if window else self.counters)
+            if window:
+                self._window_counters = {}
+            start = self._window_start if window else self.started
+            if window:
+                self._window_start = now
+            histograms = list(self.histograms.items())
+        timers = {}
+        for name, histogram in histograms:
+            timers[name] = histogram.summary(window)
+            if window:
+                histogram.reset_window()
+        return {
+            'time': time.time(),
+            'interval_s': now - start,
+            'timers': timers,
+            'counters': counters,
+        }
+
+    def maybe_snapshot(self):
+        """Window snapshot if snapshot_interval has passed since the previous one, else None."""
+        if not self.enabled or time.perf_counter() - self._window_start < self.snapshot_interval:
+            return None
+        snapshot = self.snapshot()
+        for exporter in self.exporters:
+            exporter.export(snapshot)
+        return snapshot
+
+    def close(self):
+        """Export the totals since start and close the exporters. Safe to call twice."""
+        exporters, self.exporters = self.exporters, []
+        if self.enabled and exporters:
+            snapshot = self.snapshot(window=False)
+            snapshot['final'] = True
+            for exporter in exporters:
+                exporter.export(snapshot)
+        for exporter in exporters:
+            exporter.close()
+
+    @staticmethod
+    def format(snapshot, names=None):
+        """One log line: frame rate plus p50/p95/p99/max of each timer in ms."""
+        parts = []
+        frames = snapshot['counters'].get('frames')
+        if frames is not None and snapshot['interval_s'] > 0:
+            parts.append(f"{frames / snapshot['interval_s']:.1f} fps")
+        for name in names or snapshot['timers']:
+            stats = snapshot['timers'].get(name)
+            if stats and stats['count']:
+                parts.append(f"{name} {stats['p50_ms']:.2f}/{stats['p95_ms']:.2f}/"
+                             f"{stats['p99_ms']:.2f}/{stats['max_ms']:.2f}")
+        counters = {k: v for k, v in snapshot['counters'].items() if k != 'frames'}
+        if counters:
+            parts.append(", ".join(f"{k}: {v}" for k, v in sorted(counters.items())))
+        return " | ".join(parts)
+
+
+class JsonLinesExporter:
+    """Appends every snapshot as one JSON line."""
+    def __init__(self, path):
+        self.file = open(path, 'a')
+
+    def export(self, snapshot):
+        self.file.write(json.dumps(snapshot) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class HttpExporter:
+    """Serves the latest snapshot as JSON on http://host:port/ from a background thread."""
+    def __init__(self, port=0, host='127.0.0.1'):
+        exporter = self
+        self.latest = {}
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(exporter.latest).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, name='MetricsHttp', daemon=True)
+        self._thread.start()
+
+    def export(self, snapshot):
+        self.latest = snapshot
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 10:03:27
+@Path: /utils/pipeline.py
+"""
+
+
+import logging
+import queue
+import threading
+import time
+
+DROP_OLDEST = 'drop_oldest'
+BLOCK = 'block'
+
+
+class StageQueue:
+    """Bounded queue between two pipeline stages, with a drop policy and depth/drop counters."""
+    def __init__(self, maxsize=2, drop_policy=DROP_OLDEST, on_drop=None):
+        """
+        Args:
+            on_drop: Optional callable(item), called with every item the queue does not keep
+        """
+        if drop_policy not in (DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.maxsize = maxsize
+        self.drop_policy = drop_policy
+        self.on_drop = on_drop
+        self.closed = False
+        self.put_count = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+
+    def put(self, item, timeout=None):
+        """Returns False if the item (or, for drop_oldest, an older item) was dropped."""
+        if self.closed:
+            self._discard(item)
+            return False
+        if self.drop_policy == BLOCK:
+            # Wait in short slices so that closing the queue releases a blocked producer
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self.closed:
+                wait = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+                try:
+                    self.queue.put(item, timeout=max(wait, 0))
+                    self._count_put()
+                    return True
+                except queue.Full:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        break
+            with self._lock:
+                self.dropped += 1
+            self._discard(item)
+            return False
+
+        accepted = True
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                break
+            except queue.Full:
+                try:
+                    self._discard(self.queue.get_nowait())
+                    with self._lock:
+                        self.dropped += 1
+                    accepted = False
+                except queue.Empty:
+                    pass
+        self._count_put()
+        return accepted
+
+    def take(self, timeout=None):
+        """Returns (True, item), or (False, None) on timeout."""
+        try:
+            return True, self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return False, None
+
+    def close(self):
+        self.closed = True
+
+    def exhausted(self):
+        return self.closed and self.queue.empty()
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def stats(self):
+        return {'depth': self.depth(), 'max_depth': self.max_depth, 'dropped': self.dropped}
+
+    def _discard(self, item):
+        if self.on_drop is not None:
+            self.on_drop(item)
+
+    def _count_put(self):
+        with self._lock:
+            self.put_count += 1
+            self.max_depth = max(self.max_depth, self.queue.qsize())
+
+
+class LatestValue:
+    """Single-slot mailbox: writers overwrite, readers always get the newest value."""
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._value = None
+        self._version = 0
+        self._taken_version = 0
+        self.closed = False
+        self.overwritten = 0
+
+    def put(self, value):
+        with self._cond:
+            if self._version > self._taken_version:
+                self.overwritten += 1
+            self._value = value
+            self._version += 1
+            self._cond.notify_all()
+        return True
+
+    def get(self):
+        """Non-blocking read of the newest value (None if nothing was published)."""
+        with self._cond:
+            return self._value
+
+    def take(self, timeout=None):
+        """Wait for a value that has not been taken yet. Returns (True, value) or (False, None)."""
+        with self._cond:
+            ready = self._cond.wait_for(
+                lambda: self.closed or self._version > self._taken_version, timeout
+            )
+            if not ready or self._version == self._taken_version:
+                return False, None
+            self._taken_version = self._version
+            return True, self._value
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def exhausted(self):
+        with self._cond:
+            return self.closed and self._version == self._taken_version
+
+    def depth(self):
+        with self._cond:
+            return int(self._version > self._taken_version)
+
+    def stats(self):
+        return {'depth': self.depth(), 'max_depth': 1, 'dropped': self.overwritten}
+
+
+class PipelineStage:
+    """Runs `work` on its own thread, fed from a StageQueue/LatestValue or, without a source, in a loop.
+
+    `work` returns False to end the stream. When a stage finishes, its outputs are closed so
+    downstream stages drain and stop as well.
+    """
+    def __init__(self, name, work, source=None, outputs=(), stop_event=None, poll_interval=0.1):
+        self.name = name
+        self.work = work
+        self.source = source
+        self.outputs = list(outputs)
+        self.stop_event = stop_event or threading.Event()
+        self.poll_interval = poll_interval
+        self.logger = logging.getLogger(f'Pipeline.{name}')
+
+        self.processed = 0
+        self.busy_time = 0.0
+        self.error = None
+        self._last_snapshot = (0, 0.0)
+        self._thread = threading.Thread(target=self._run, name=f'Stage-{name}', daemon=True)
+
+    def start(self):
+        self._last_snapshot = (0, time.monotonic())
+        self._thread.start()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def stats(self):
+        """Throughput since the previous stats() call, plus totals and source queue depth."""
+        now = time.monotonic()
+        last_count, last_time = self._last_snapshot
+        processed = self.processed
+        elapsed = now - last_time
+        self._last_snapshot = (processed, now)
+        stats = {
+            'processed': processed,
+            'fps': (processed - last_count) / elapsed if elapsed > 0 else 0.0,
+            'busy_ms': 1000 * self.busy_time / processed if processed else 0.0,
+        }
+        if self.source is not None:
+            stats.update({f'queue_{k}': v for k, v in self.source.stats().items()})
+        return stats
+
+    def _run(self):
+        try:
+            while not self.stop_event.is_set():
+                if self.source is None:
+                    args = ()
+                else:
+                    ok, item = self.source.take(timeout=self.poll_interval)
+                    if not ok:
+                        if self.source.exhausted():
+                            break
+                        continue
+                    args = (item,)
+
+                start = time.perf_counter()
+                keep_going = self.work(*args)
+                self.busy_time += time.perf_counter() - start
+                self.processed += 1
+                if keep_going is False:
+                    break
+        except Exception as e:
+            self.error = e
+            self.logger.error(f"Stage failed: {e}")
+            self.stop_event.set()
+        finally:
+            # Release blocked producers and let downstream stages drain
+            if self.source is not None:
+                self.source.close()
+            for output in self.outputs:
+                output.close()
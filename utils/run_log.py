@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 18:12:57
+@Path: /utils/run_log.py
+"""
+
+
+import json
+import os
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+# A run log is a directory with
+#   run.json       header: frame shape/dtype, stream format ('bgr', 'yuv420', 'y') and run info
+#   frames.bin     raw frames back to back, frame i at i * frame_nbytes
+#   records.jsonl  one JSON record per frame: schedule, perception, trackers, decision, timings
+#   index.bin      one INDEX_DTYPE row per frame pointing into frames.bin and records.jsonl
+# All three data files are append-only, so a log cut short by a crash stays readable.
+INDEX_DTYPE = np.dtype([
+    ('seq', '<i8'),
+    ('timestamp', '<f8'),
+    ('frame', '<i8'),  # Frame slot in frames.bin, -1 if frames are not stored
+    ('record_offset', '<i8'),
+    ('record_size', '<i8'),
+])
+LOG_VERSION = 1
+
+LogEntry = namedtuple('LogEntry', ['seq', 'timestamp', 'frame', 'record'])
+
+
+class RunRecorder:
+    """Appends frames and per-frame records to a run log directory."""
+    def __init__(self, path, stream='bgr', info=None, store_frames=True):
+        """
+        Args:
+            path: Log directory, created if missing
+            stream: Format of the recorded frames, 'bgr', 'yuv420' or 'y'
+            info: Extra JSON-serializable run information for the header
+            store_frames: Write frames.bin; without it only records are kept (e.g. replay results)
+        """
+        self.path = path
+        self.stream = stream
+        self.info = dict(info or {})
+        self.store_frames = store_frames
+        self.frame_shape = None
+        self.frame_dtype = None
+        self.frames = 0
+        self.bytes_written = 0
+        self.closed = False
+
+        os.makedirs(path, exist_ok=True)
+        self._index = open(os.path.join(path, 'index.bin'), 'wb')
+        self._records = open(os.path.join(path, 'records.jsonl'), 'wb')
+        self._frames = open(os.path.join(path, 'frames.bin'), 'wb') if store_frames else None
+        self._row = np.zeros(1, dtype=INDEX_DTYPE)
+        self._record_offset = 0
+        self._write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def record(self, seq, timestamp, frame=None, record=None):
+        """Append one frame.
+        Args:
+            seq: Frame sequence number
+            timestamp: Capture time in seconds
+            frame: Frame array; every frame of a run must have the same shape and dtype
+            record: JSON-serializable dict of what the loop made of the frame
+        """
+        slot = -1
+        if self.store_frames and frame is not None:
+            if self.frame_shape is None:
+                self.frame_shape = frame.shape
+                self.frame_dtype = frame.dtype
+                self._write_header()
+            elif frame.shape != self.frame_shape or frame.dtype != self.frame_dtype:
+                raise ValueError(f"Frame {frame.shape} {frame.dtype} does not match the run's "
+                                 f"{self.frame_shape} {self.frame_dtype}")
+            self._frames.write(np.ascontiguousarray(frame).data)
+            self.bytes_written += frame.nbytes
+            slot = self.frames
+
+        data = json.dumps(record or {}, default=_to_json).encode() + b'\n'
+        self._records.write(data)
+        self._row[0] = (seq, timestamp, slot, self._record_offset, len(data))
+        self._index.write(self._row.data)
+        self._record_offset += len(data)
+        self.bytes_written += len(data) + INDEX_DTYPE.itemsize
+        self.frames += 1
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for f in (self._frames, self._records, self._index):
+            if f is not None:
+                f.close()
+        self._write_header()
+
+    def summary(self):
+        return f"{self.frames} frames, {self.bytes_written / 2 ** 20:.1f} MB in {self.path}"
+
+    def _write_header(self):
+        header = {
+            'version': LOG_VERSION,
+            'created': datetime.now().isoformat(),
+            'stream': self.stream,
+            'frame_shape': list(self.frame_shape) if self.frame_shape is not None else None,
+            'frame_dtype': str(self.frame_dtype) if self.frame_dtype is not None else None,
+            'frames': self.frames,
+            'info': self.info,
+        }
+        with open(os.path.join(self.path, 'run.json'), 'w') as f:
+            json.dump(header, f, indent=2, default=_to_json)
+
+
+class RunLog:
+    """Read-only view of a run log. Index and frames are memory-mapped, records parsed on access."""
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'run.json')) as f:
+            self.header = json.load(f)
+        if self.header['version'] != LOG_VERSION:
+            raise ValueError(f"Unsupported run log version: {self.header['version']}")
+        self.stream = self.header['stream']
+        self.info = self.header['info']
+
+        self.index = _memmap(os.path.join(path, 'index.bin'), INDEX_DTYPE)
+        self._records = _memmap(os.path.join(path, 'records.jsonl'), np.uint8)
+        self.frames = None
+        frames_path = os.path.join(path, 'frames.bin')
+        if self.header['frame_shape'] is not None and os.path.exists(frames_path):
+            shape = tuple(self.header['frame_shape'])
+            dtype = np.dtype(self.header['frame_dtype'])
+            count = os.path.getsize(frames_path) // (int(np.prod(shape)) * dtype.itemsize)
+            if count:
+                self.frames = np.memmap(frames_path, dtype=dtype, mode='r', shape=(count,) + shape)
+        # Stop at the first row whose record or frame was not completely written
+        complete = ((self.index['record_offset'] + self.index['record_size'] <= len(self._records))
+                    & (self.index['frame'] < self._frame_count()))
+        if not complete.all():
+            self.index = self.index[:int(np.argmin(complete))]
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        row = self.index[i]
+        return LogEntry(int(row['seq']), float(row['timestamp']), self.frame(i), self.record(i))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def frame(self, i):
+        """Read-only frame i, or None if the log has no frames."""
+        slot = self.index[i]['frame']
+        return None if slot < 0 else self.frames[slot]
+
+    def record(self, i):
+        row = self.index[i]
+        offset = int(row['record_offset'])
+        return json.loads(self._records[offset:offset + int(row['record_size'])].tobytes())
+
+    def _frame_count(self):
+        return 0 if self.frames is None else len(self.frames)
+
+
+def diff_logs(a, b, sections=('schedule', 'perception', 'trackers', 'decision')):
+    """Frame-by-frame differences between two run logs of the same frames.
+    Returns:
+        list of (frame index, section, key, value in a, value in b). A frame count mismatch
+        is reported as (min length, 'frames', 'count', len(a), len(b)).
+    """
+    differences = []
+    for i in range(min(len(a), len(b))):
+        record_a, record_b = a.record(i), b.record(i)
+        for section in sections:
+            values_a, values_b = record_a.get(section), record_b.get(section)
+            if values_a == values_b:
+                continue
+            if not isinstance(values_a, dict) or not isinstance(values_b, dict):
+                differences.append((i, section, None, values_a, values_b))
+                continue
+            for key in sorted(set(values_a) | set(values_b)):
+                if values_a.get(key) != values_b.get(key):
+                    differences.append((i, section, key, values_a.get(key), values_b.get(key)))
+    if len(a) != len(b):
+        differences.append((min(len(a), len(b)), 'frames', 'count', len(a), len(b)))
+    return differences
+
+
+def _memmap(path, dtype):
+    count = os.path.getsize(path) // np.dtype(dtype).itemsize
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+
+
+def _to_json(value):
+    """json.dumps fallback for numpy scalars and arrays (e.g. bboxes from detectMultiScale)."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Cannot record {type(value).__name__}")
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 21:02:47
+@Path: /utils/telemetry.py
+"""
+
+
+import atexit
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from utils.config import TELEMETRY_CONFIG
+from utils.pipeline import DROP_OLDEST, StageQueue
+
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+OFF = logging.CRITICAL + 10
+
+# message is a str.format() template over fields, formatted on the telemetry thread
+Event = namedtuple('Event', ['time', 'level', 'name', 'message', 'fields'])
+
+
+class Telemetry:
+    """Channel for per-frame status messages that keeps formatting and I/O off the control path.
+
+    publish() checks the level and queues the raw fields; a background thread formats and
+    emits them. Each event name is emitted at most once per rate_limit seconds: repeats in
+    between are counted and the latest one is emitted with the count when the window ends.
+    A disabled channel (or a level below the threshold) returns before touching the fields.
+    """
+    def __init__(self, level=INFO, rate_limit=1.0, queue_size=1024, emit=None, enabled=True):
+        """
+        Args:
+            level: Lowest level that is published
+            rate_limit: Seconds between two emits of the same event name, 0 emits everything
+            queue_size: Events waiting for the telemetry thread; the oldest is dropped when full
+            emit: Optional callable(level, text); logs to the 'Telemetry' logger by default
+        """
+        self.enabled = enabled
+        self.threshold = level if enabled else OFF
+        self.rate_limit = rate_limit
+        self.emit = emit or logging.getLogger('Telemetry').log
+        self.queue = StageQueue(queue_size, DROP_OLDEST)
+        self.published = 0
+        self.emitted = 0
+        self.suppressed = 0
+        self._windows = {}  # name -> [window start, repeats, latest event]
+        self._thread = None
+        if enabled:
+            self._thread = threading.Thread(target=self._run, name='Telemetry', daemon=True)
+            self._thread.start()
+
+    def enabled_for(self, level):
+        return level >= self.threshold
+
+    def publish(self, name, message, level=INFO, **fields):
+        """Queue an event, e.g. publish('decision', "Decision: {action}", action='stop')."""
+        if level < self.threshold:
+            return
+        self.published += 1
+        self.queue.put(Event(time.time(), level, name, message, fields))
+
+    def close(self, timeout=1.0):
+        """Emit what is queued and pending, then stop the thread. Safe to call twice."""
+        self.queue.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {'published': self.published, 'emitted': self.emitted,
+                'suppressed': self.suppressed, 'dropped': self.queue.dropped}
+
+    def summary(self):
+        stats = self.stats()
+        return (f"{stats['published']} events, {stats['emitted']} emitted, "
+                f"{stats['suppressed']} rate-limited, {stats['dropped']} dropped")
+
+    def _run(self):
+        while not self.queue.exhausted():
+            ok, event = self.queue.take(timeout=min(self.rate_limit, 0.5) or 0.5)
+            now = time.monotonic()
+            if ok:
+                self._handle(event, now)
+            self._flush(now)
+        self._flush(None)
+
+    def _handle(self, event, now):
+        window = self._windows.get(event.name)
+        if window is None or now - window[0] >= self.rate_limit:
+            self._flush_window(event.name, window)
+            self._windows[event.name] = [now, 0, None]
+            self._emit(event)
+            return
+        window[1] += 1
+        window[2] = event
+        self.suppressed += 1
+
+    def _flush(self, now):
+        """Emit the latest repeat of every window that has ended (all of them if now is None)."""
+        for name, window in list(self._windows.items()):
+            if now is None or now - window[0] >= self.rate_limit:
+                self._flush_window(name, window)
+                del self._windows[name]
+
+    def _flush_window(self, name, window):
+        if window is not None and window[1]:
+            self._emit(window[2], f" (x{window[1]} in {self.rate_limit:g}s)")
+
+    def _emit(self, event, suffix=''):
+        try:
+            text = event.message.format(**event.fields) if event.fields else event.message
+        except (KeyError, IndexError, ValueError) as e:
+            text = f"{event.message} {event.fields} (format error: {e})"
+        self.emit(event.level, f"[{event.name}] {text}{suffix}")
+        self.emitted += 1
+
+
+_channel = None
+_channel_lock = threading.Lock()
+
+
+def get_telemetry():
+    """Process-wide channel configured from TELEMETRY_CONFIG, created on first use."""
+    global _channel
+    with _channel_lock:
+        if _channel is None:
+            _channel = Telemetry(logging.getLevelName(TELEMETRY_CONFIG['LEVEL']), TELEMETRY_CONFIG['RATE_LIMIT'],
+                                 TELEMETRY_CONFIG['QUEUE_SIZE'], enabled=TELEMETRY_CONFIG['ENABLED'])
+            atexit.register(_channel.close)
+    return _channel
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+@Author: Jieying Li
+@Created Date: 2026-10-18 17:46:09
+@Path: /utils/video_writer.py
+"""
+
+
+import logging
+import time
+
+import numpy as np
+
+from utils.buffer_pool import BufferPool
+from utils.pipeline import DROP_OLDEST, PipelineStage, StageQueue
+
+
+class AsyncVideoWriter:
+    """Front end for cv2.VideoWriter that encodes on a background thread.
+
+    write() copies the frame into a recycled slot, so the caller can reuse its buffers right
+    away, and queues it with an optional render callback. The writer thread calls
+    render(frame) to draw overlays on that private copy, encodes the result and recycles the
+    slot. With 'drop_oldest' a full queue discards the oldest frame and the control loop never
+    waits for the encoder; 'block' keeps every frame. threaded=False encodes inline.
+    """
+    def __init__(self, writer, queue_size=8, drop_policy=DROP_OLDEST, threaded=True):
+        """
+        Args:
+            writer: Opened cv2.VideoWriter (anything with write(image) and release())
+            queue_size: Frames waiting for the encoder
+            drop_policy: 'drop_oldest' or 'block', as for StageQueue
+            threaded: Encode on a background thread
+        """
+        self.writer = writer
+        self.threaded = threaded
+        self.queue = StageQueue(queue_size, drop_policy, on_drop=self._recycle)
+        self.slots = BufferPool()
+        self.logger = logging.getLogger('AsyncVideoWriter')
+
+        self.frames_written = 0
+        self.write_time = 0.0  # Time write() held the caller
+        self.max_write_time = 0.0
+        self.encode_time = 0.0  # Render + encode time per frame
+        self.max_encode_time = 0.0
+        self.writes = 0
+        self.error = None
+        self._released = False
+        self._stage = None
+        if threaded:
+            self._stage = PipelineStage('writer', self._encode, source=self.queue)
+            self._stage.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    def write(self, frame, render=None):
+        """Queue a frame for encoding.
+        Args:
+            frame: BGR image, or any object render turns into one (queued without a copy)
+            render: Optional callable(frame) -> BGR image, run on the writer thread
+        Returns:
+            bool: False if the writer was closed or a frame was dropped to make room
+        """
+        if self._released:
+            return False
+        start = time.perf_counter()
+        if isinstance(frame, np.ndarray):
+            slot = self.slots.acquire(frame.shape, frame.dtype)
+            np.copyto(slot, frame)
+            frame = slot
+        if self.threaded:
+            accepted = self.queue.put((frame, render))
+        else:
+            self._encode((frame, render))
+            accepted = True
+        elapsed = time.perf_counter() - start
+        self.writes += 1
+        self.write_time += elapsed
+        self.max_write_time = max(self.max_write_time, elapsed)
+        return accepted
+
+    def release(self, timeout=None):
+        """Encode the queued frames, then release the underlying writer. Safe to call twice."""
+        if self._released:
+            return
+        self._released = True
+        if self._stage is not None:
+            self.queue.close()
+            self._stage.join(timeout)
+            self.error = self._stage.error
+            if self._stage.is_alive():
+                self.logger.warning(f"Writer still busy after {timeout}s, {self.queue.depth()} frames not flushed")
+                return
+        self.writer.release()
+
+    def stats(self):
+        return {
+            'written': self.frames_written,
+            'dropped': self.queue.dropped,
+            'depth': self.queue.depth(),
+            'max_depth': self.queue.max_depth,
+            'write_ms': self.write_time / self.writes * 1000 if self.writes else 0.0,
+            'max_write_ms': self.max_write_time * 1000,
+            'encode_ms': self.encode_time / self.frames_written * 1000 if self.frames_written else 0.0,
+            'max_encode_ms': self.max_encode_time * 1000,
+        }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"{stats['written']} frames written, {stats['dropped']} dropped, "
+                f"max queue depth {stats['max_depth']}, write() {stats['write_ms']:.2f} ms mean / "
+                f"{stats['max_write_ms']:.2f} ms max, encode {stats['encode_ms']:.2f} ms mean / "
+                f"{stats['max_encode_ms']:.2f} ms max")
+
+    def _encode(self, item):
+        frame, render = item
+        start = time.perf_counter()
+        try:
+            self.writer.write(frame if render is None else render(frame))
+        finally:
+            self._recycle(item)
+        elapsed = time.perf_counter() - start
+        self.frames_written += 1
+        self.encode_time += elapsed
+        self.max_encode_time = max(self.max_encode_time, elapsed)
+
+    def _recycle(self, item):
+        # Every queued array is a slot from self.slots
+        if isinstance(item[0], np.ndarray):
+            self.slots.release(item[0])